@@ -7,6 +7,8 @@ import argparse
 
 from functools import partial
 
+from bi5_reader import write_monthly_parquet
+
 # 設定
 SCRIPT_DIR = Path(__file__).parent
 PARQUET_DIR = (SCRIPT_DIR / "../parquet_data").resolve()
@@ -61,10 +63,9 @@ def aggregate_month(pair, year, month, cleanup=False):
     try:
         # 月次データの結合
         monthly_df = pd.concat(dfs)
-        monthly_df = monthly_df.sort_index()
         
-        # 月次ファイルとして保存
-        monthly_df.to_parquet(output_file, compression='zstd')
+        # 月次ファイルとして保存（時刻順・1日1 row group）
+        write_monthly_parquet(monthly_df, output_file)
         
         # 元の日次ディレクトリを削除
         if cleanup:
@@ -0,0 +1,83 @@
+"""
+bi5デコーダのベンチマーク（struct.unpackループ vs 構造化dtype）
+
+使用方法:
+    python bench_bi5_decoder.py
+    python bench_bi5_decoder.py --ticks 20000 --repeat 20
+"""
+import argparse
+import lzma
+import struct
+import time
+
+import numpy as np
+import pandas as pd
+
+from bi5_reader import TICK_DTYPE, decode_bi5
+
+BASE_TIMESTAMP_MS = 1735689600000  # 2025-01-01 00:00:00 UTC
+
+
+def make_synthetic_hour(num_ticks, seed=0):
+    """1時間分のティックを持つ合成bi5（LZMA圧縮済み）を作成"""
+    rng = np.random.default_rng(seed)
+    records = np.empty(num_ticks, dtype=TICK_DTYPE)
+    records['time_delta'] = np.sort(rng.integers(0, 3600 * 1000, num_ticks))
+    bid = 108000 + np.cumsum(rng.integers(-3, 4, num_ticks))
+    records['bid'] = bid
+    records['ask'] = bid + rng.integers(1, 20, num_ticks)
+    records['ask_volume'] = rng.random(num_ticks).astype(np.float32)
+    records['bid_volume'] = rng.random(num_ticks).astype(np.float32)
+    return lzma.compress(records.tobytes())
+
+
+def decode_bi5_struct(decompressed_data, base_timestamp_ms):
+    """以前の実装（1レコードずつstruct.unpack）"""
+    ticks = []
+    offset = 0
+    record_size = 20
+    num_records = len(decompressed_data) // record_size
+
+    for i in range(num_records):
+        record = decompressed_data[offset:offset + record_size]
+        time_delta_ms, ask, bid, ask_vol, bid_vol = struct.unpack('>iiiff', record)
+        ticks.append({
+            'timestamp': base_timestamp_ms + time_delta_ms,
+            'price': bid / 100000.0
+        })
+        offset += record_size
+
+    return pd.DataFrame(ticks)
+
+
+def bench(func, data, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(data, BASE_TIMESTAMP_MS)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bi5 tick decoders")
+    parser.add_argument("--ticks", type=int, default=10000, help="Ticks in the synthetic hour (default: 10000)")
+    parser.add_argument("--repeat", type=int, default=10, help="Repetitions, best time is reported (default: 10)")
+    args = parser.parse_args()
+
+    decompressed = lzma.decompress(make_synthetic_hour(args.ticks))
+
+    # 両実装の結果が一致することを確認
+    old = decode_bi5_struct(decompressed, BASE_TIMESTAMP_MS)
+    new = decode_bi5(decompressed, BASE_TIMESTAMP_MS)
+    assert (old['timestamp'].to_numpy() == new['timestamp'].to_numpy()).all()
+    assert np.allclose(old['price'].to_numpy(), new['price'].to_numpy())
+
+    print(f"Synthetic bi5 hour: {args.ticks} ticks ({len(decompressed)} bytes decompressed)")
+    for name, func in [("struct loop", decode_bi5_struct), ("numpy dtype", decode_bi5)]:
+        elapsed = bench(func, decompressed, args.repeat)
+        print(f"  {name:<12} {elapsed * 1000:8.2f} ms  {args.ticks / elapsed:14,.0f} records/sec")
+
+
+if __name__ == "__main__":
+    main()
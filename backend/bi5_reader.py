@@ -3,27 +3,154 @@ bi5ファイルを読み込み、1分足OHLCに変換するモジュール
 Parquetファイルが存在する場合はそちらを優先的に読み込む
 """
 import lzma
-import struct
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from instruments import get_instrument
 
 # パス設定
 SCRIPT_DIR = Path(__file__).parent
 DATA_DIR = (SCRIPT_DIR / "../data").resolve()
 PARQUET_DIR = (SCRIPT_DIR / "../parquet_data").resolve()
 
+OHLC_COLUMNS = ['time', 'open', 'high', 'low', 'close']
+
+# 月次Parquetのrow group = 1日分の1分足
+MONTHLY_ROW_GROUP_SIZE = 1440
+
+# 集約済み時間足（分 -> pandasのresampleルール）
+# ペア一覧のスキャンから外れるよう "." で始まるディレクトリに置く
+TF_DIR = PARQUET_DIR / ".tf"
+TIMEFRAMES = {
+    5: '5min',
+    15: '15min',
+    60: '1h',
+    240: '4h',
+    1440: '1440min',
+}
+
+
+# 1レコード = 20バイト: TimeDelta(ms), Ask, Bid, AskVolume, BidVolume (big-endian)
+TICK_DTYPE = np.dtype([
+    ('time_delta', '>i4'),
+    ('ask', '>i4'),
+    ('bid', '>i4'),
+    ('ask_volume', '>f4'),
+    ('bid_volume', '>f4'),
+])
+
+TICK_COLUMNS = ['timestamp', 'price', 'ask', 'bid', 'ask_volume', 'bid_volume']
 
-def read_bi5_file(filepath: Path, base_timestamp_ms: int):
+# bi5の価格は整数のポイント値（price = points / point_divisor、銘柄ごとの値は instruments.py）
+DEFAULT_POINT_DIVISOR = 100000
+
+# 1分足に付加する列（ティックから算出: 平均スプレッド, ティック数）
+BAR_EXTRA_COLUMNS = ['spread', 'tick_count']
+
+# ティックストア: parquet_data/.ticks/{pair}/{year}/{MM}.parquet（1日1 row group）
+# 時刻(ms)と価格はポイント値の整数のままデルタ符号化し、出来高はfloat32で保持する
+TICK_STORE_DIR = PARQUET_DIR / ".ticks"
+TICK_STORE_SCHEMA = pa.schema([
+    ('time', pa.int64()),
+    ('bid', pa.int32()),
+    ('ask', pa.int32()),
+    ('bid_volume', pa.float32()),
+    ('ask_volume', pa.float32()),
+])
+TICK_STORE_WRITE_OPTIONS = {
+    'compression': 'zstd',
+    'use_dictionary': False,
+    'column_encoding': {
+        'time': 'DELTA_BINARY_PACKED',
+        'bid': 'DELTA_BINARY_PACKED',
+        'ask': 'DELTA_BINARY_PACKED',
+        'bid_volume': 'BYTE_STREAM_SPLIT',
+        'ask_volume': 'BYTE_STREAM_SPLIT',
+    },
+}
+
+
+def decode_bi5_points(decompressed_data, base_timestamp_ms: int):
+    """
+    解凍済みbi5バッファを整数ポイント値のままティックのDataFrameに変換（ベクトル化）
+
+    バッファは構造化dtypeとしてそのまま参照し（コピーなし）、
+    列ごとにネイティブのエンディアンへ変換する
+
+    Args:
+        decompressed_data: LZMA解凍済みのbytes
+        base_timestamp_ms: 基準タイムスタンプ（ミリ秒）
+
+    Returns:
+        pandas.DataFrame: ティックデータ（columns: time(ms), bid, ask(int32), bid_volume, ask_volume(float32)）
+    """
+    num_records = len(decompressed_data) // TICK_DTYPE.itemsize
+    records = np.frombuffer(decompressed_data, dtype=TICK_DTYPE, count=num_records)
+    return pd.DataFrame({
+        'time': records['time_delta'].astype(np.int64) + base_timestamp_ms,
+        'bid': records['bid'].astype(np.int32),
+        'ask': records['ask'].astype(np.int32),
+        'bid_volume': records['bid_volume'].astype(np.float32),
+        'ask_volume': records['ask_volume'].astype(np.float32),
+    })
+
+
+def points_to_ticks(points: pd.DataFrame, point_divisor: int = DEFAULT_POINT_DIVISOR):
+    """
+    整数ポイント値のティック（decode_bi5_points / load_ticks の形式）を価格に変換
+
+    Args:
+        points: 整数ポイント値のティック
+        point_divisor: 銘柄のポイント除数（get_instrument(pair).point_divisor）
+
+    Returns:
+        pandas.DataFrame: ティックデータ（columns: timestamp, price, ask, bid, ask_volume, bid_volume）
+    """
+    if points.empty:
+        return pd.DataFrame(columns=TICK_COLUMNS)
+
+    bid = points['bid'].to_numpy() / point_divisor
+    return pd.DataFrame({
+        'timestamp': points['time'].to_numpy(dtype=np.int64),
+        # bid価格を使用（price = bid / point_divisor）
+        'price': bid,
+        'ask': points['ask'].to_numpy() / point_divisor,
+        'bid': bid,
+        'ask_volume': points['ask_volume'].to_numpy(dtype=np.float32),
+        'bid_volume': points['bid_volume'].to_numpy(dtype=np.float32),
+    })
+
+
+def decode_bi5(decompressed_data, base_timestamp_ms: int, point_divisor: int = DEFAULT_POINT_DIVISOR):
+    """
+    解凍済みbi5バッファをティックのDataFrameに変換（ベクトル化）
+
+    Args:
+        decompressed_data: LZMA解凍済みのbytes
+        base_timestamp_ms: 基準タイムスタンプ（ミリ秒）
+        point_divisor: 銘柄のポイント除数（get_instrument(pair).point_divisor）
+
+    Returns:
+        pandas.DataFrame: ティックデータ（columns: timestamp, price, ask, bid, ask_volume, bid_volume）
+    """
+    return points_to_ticks(decode_bi5_points(decompressed_data, base_timestamp_ms), point_divisor)
+
+
+def read_bi5_file(filepath: Path, base_timestamp_ms: int, point_divisor: int = DEFAULT_POINT_DIVISOR):
     """
     bi5ファイルを読み込み、ティックデータをDataFrameに変換
     
     Args:
         filepath: bi5ファイルのパス
         base_timestamp_ms: 基準タイムスタンプ（ミリ秒）
+        point_divisor: 銘柄のポイント除数（get_instrument(pair).point_divisor）
     
     Returns:
-        pandas.DataFrame: ティックデータ（columns: timestamp, price）
+        pandas.DataFrame: ティックデータ（columns: timestamp, price, ask, bid, ask_volume, bid_volume）
     """
     # LZMA解凍
     with open(filepath, 'rb') as f:
@@ -31,41 +158,10 @@ def read_bi5_file(filepath: Path, base_timestamp_ms: int):
     
     # 空ファイルの場合は空のDataFrameを返す
     if len(compressed_data) == 0:
-        return pd.DataFrame(columns=['timestamp', 'price'])
+        return pd.DataFrame(columns=TICK_COLUMNS)
     
     decompressed_data = lzma.decompress(compressed_data)
-    
-    # ティックデータをパース
-    ticks = []
-    offset = 0
-    current_time_ms = base_timestamp_ms
-    
-    # 1レコード = 20バイト
-    record_size = 20
-    num_records = len(decompressed_data) // record_size
-    
-    for i in range(num_records):
-        # 20バイトを読み込み
-        record = decompressed_data[offset:offset + record_size]
-        
-        # int32, int32, int32, float, float (Total 20 bytes)
-        # TimeDelta, Ask, Bid, AskVolume, BidVolume
-        time_delta_ms, ask, bid, ask_vol, bid_vol = struct.unpack('>iiiff', record)
-        
-        # タイムスタンプは時開始からの絶対値（ミリ秒）
-        timestamp_ms = base_timestamp_ms + time_delta_ms
-        
-        # bid価格を使用（price = bid / 100000）
-        price = bid / 100000.0
-        
-        ticks.append({
-            'timestamp': timestamp_ms,
-            'price': price
-        })
-        
-        offset += record_size
-    
-    return pd.DataFrame(ticks)
+    return decode_bi5(decompressed_data, base_timestamp_ms, point_divisor)
 
 
 def load_day_data(pair: str, date: str):
@@ -93,6 +189,7 @@ def load_day_data(pair: str, date: str):
     
     # 全ティックデータを結合
     all_ticks = []
+    point_divisor = get_instrument(pair).point_divisor
     
     for hour in range(24):
         filepath = data_dir / f"{hour:02d}h_ticks.bi5"
@@ -105,31 +202,60 @@ def load_day_data(pair: str, date: str):
         base_timestamp_ms = int(base_dt.timestamp() * 1000)
         
         # bi5ファイルを読み込み
-        df = read_bi5_file(filepath, base_timestamp_ms)
+        df = read_bi5_file(filepath, base_timestamp_ms, point_divisor)
         if not df.empty:
             all_ticks.append(df)
     
     if not all_ticks:
         return pd.DataFrame(columns=['time', 'open', 'high', 'low', 'close'])
     
-    # 全ティックを結合
-    df_all = pd.concat(all_ticks, ignore_index=True)
-    
-    # タイムスタンプをdatetimeに変換
-    df_all['datetime'] = pd.to_datetime(df_all['timestamp'], unit='ms', utc=True)
-    df_all.set_index('datetime', inplace=True)
-    
-    # 1分足OHLCにresample
-    ohlc = df_all['price'].resample('1min').ohlc()
-    
-    # NaNを除去
-    ohlc = ohlc.dropna()
-    
-    # インデックスをリセットしてtime列を作成
-    ohlc = ohlc.reset_index()
-    ohlc.rename(columns={'datetime': 'time'}, inplace=True)
-    
-    return ohlc
+    # 全ティックを結合して1分足に変換
+    return ticks_to_ohlc(pd.concat(all_ticks, ignore_index=True))
+
+
+def ticks_to_ohlc(ticks: pd.DataFrame):
+    """
+    ティックを1分足OHLCに変換（ティックのない分は含まない）
+
+    resample('1min').ohlc() と同じ結果を、分ごとの境界で reduceat して求める。
+    ask列があれば、その分の平均スプレッド（ask - bid）とティック数も付ける
+
+    Args:
+        ticks: ティックデータ（timestamp, price 列を使用）
+
+    Returns:
+        pandas.DataFrame: 1分足OHLC（columns: time, open, high, low, close[, spread, tick_count]）
+    """
+    if ticks.empty:
+        return pd.DataFrame(columns=OHLC_COLUMNS)
+
+    timestamp = ticks['timestamp'].to_numpy(dtype=np.int64)
+    order = None
+    if np.any(np.diff(timestamp) < 0):
+        order = np.argsort(timestamp, kind='stable')
+        timestamp = timestamp[order]
+
+    def column(name):
+        values = ticks[name].to_numpy(dtype=np.float64)
+        return values if order is None else values[order]
+
+    price = column('price')
+    minute = timestamp // 60000
+    starts = np.flatnonzero(np.r_[True, minute[1:] != minute[:-1]])
+    ends = np.r_[starts[1:], len(price)] - 1
+
+    bars = pd.DataFrame({
+        'time': pd.to_datetime(minute[starts] * 60000, unit='ms', utc=True),
+        'open': price[starts],
+        'high': np.maximum.reduceat(price, starts),
+        'low': np.minimum.reduceat(price, starts),
+        'close': price[ends],
+    })
+    if 'ask' in ticks:
+        tick_count = np.diff(np.r_[starts, len(price)])
+        bars['spread'] = np.add.reduceat(column('ask') - column('bid'), starts) / tick_count
+        bars['tick_count'] = tick_count.astype(np.int32)
+    return bars
 
 
 def load_date_range_data(pair: str, start_date: str, end_date: str):
@@ -169,6 +295,87 @@ def load_date_range_data(pair: str, start_date: str, end_date: str):
     return result
 
 
+def month_partitions(pair: str, start_dt: datetime, end_dt: datetime):
+    """
+    日付範囲に含まれるParquetパーティションを列挙（月単位）
+
+    月次ファイル（{MM}.parquet）があればそれを1つ、なければ範囲内の日次ファイルを返す
+
+    Args:
+        pair: 通貨ペア（例: "EURUSD"）
+        start_dt: 開始日
+        end_dt: 終了日（この日を含む）
+
+    Returns:
+        list[Path]: 読み込むParquetファイル（時系列順）
+    """
+    files = []
+    year, month = start_dt.year, start_dt.month
+    while (year, month) <= (end_dt.year, end_dt.month):
+        # Dukascopy形式（0-indexed）のフォルダ名
+        month_dir = PARQUET_DIR / pair / str(year) / f"{month - 1:02d}"
+        month_file = PARQUET_DIR / pair / str(year) / f"{month - 1:02d}.parquet"
+
+        if month_file.exists():
+            files.append(month_file)
+        elif month_dir.exists():
+            first_day = start_dt.day if (year, month) == (start_dt.year, start_dt.month) else 1
+            last_day = end_dt.day if (year, month) == (end_dt.year, end_dt.month) else 31
+            files.extend(
+                f for f in sorted(month_dir.glob("*.parquet"))
+                if f.stem.isdigit() and first_day <= int(f.stem) <= last_day
+            )
+
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return files
+
+
+def read_parquet_range(files, start_ts: datetime, end_ts: datetime):
+    """
+    Parquetファイル群から [start_ts, end_ts) の行だけを読み込み
+
+    時刻フィルタはpyarrowに渡し、row groupの統計情報で不要なブロックを読み飛ばす
+    各ファイルは1回だけ開く
+
+    Returns:
+        pandas.DataFrame: 時刻順の1分足OHLC（columns: time, open, high, low, close）
+    """
+    tables = []
+    for f in files:
+        table = pq.read_table(
+            f,
+            columns=OHLC_COLUMNS,
+            filters=[('time', '>=', start_ts), ('time', '<', end_ts)],
+        )
+        if table.num_rows:
+            tables.append(table)
+
+    if not tables:
+        return pd.DataFrame(columns=OHLC_COLUMNS)
+
+    table = pa.concat_tables(tables, promote_options='default')
+    # 月次ファイルは日単位で結合されているため時刻順とは限らない
+    table = table.sort_by('time')
+    return table.to_pandas()
+
+
+def write_monthly_parquet(df: pd.DataFrame, output_file: Path):
+    """
+    月次Parquetファイルを書き出し
+
+    時刻順に並べ、1日ごとにrow groupを分けることで
+    read_parquet_range の時刻フィルタが日単位で効くようにする
+    """
+    df = df.sort_values('time', kind='stable').reset_index(drop=True)
+    df.to_parquet(
+        output_file,
+        engine='pyarrow',
+        compression='zstd',
+        index=False,
+        row_group_size=MONTHLY_ROW_GROUP_SIZE,
+    )
+
+
 def load_day_data_from_parquet(pair: str, date: str):
     """
     Parquetファイルから1日分のOHLCデータを読み込み
@@ -182,59 +389,20 @@ def load_day_data_from_parquet(pair: str, date: str):
         pandas.DataFrame: 1分足OHLC（columns: time, open, high, low, close）
     """
     dt = datetime.strptime(date, "%Y-%m-%d")
-    year = dt.year
-    month = dt.month - 1  # Dukascopy folder format (0-indexed or 1-indexed? Wait, Convert script uses month directly without -1 but bi5 reader used -1?)
-    # Wait, bi5_reader.py uses `month = dt.month - 1` previously? 
-    # Let me check the View File output again.
-    # Line 185: month = dt.month - 1  # Dukascopy format
-    # But in aggregate_parquet.py I used `f"{month:02d}"` from `d.name`. 
-    # The folders in `data` are 00, 01, ... 11 for months? Or 01..12?
-    # `convert_to_parquet.py` implementation:
-    # `month = dt.month - 1` in `read_bi5_file`? No, let's verify folder structure.
-    
-    # Let's assume the previous bi5_reader logic was correct about the folder structure.
-    # If the folders are 00-11, then aggregate_parquet.py which uses `d.name` would define month as 0..11.
-    # But filtering from monthly file (which contains 'time' column) needs comparison.
-    # The monthly file itself will be `00.parquet` etc?
-    
-    # Re-reading `bi5_reader.py` lines 86: `data_dir = DATA_DIR / pair / str(year) / f"{month:02d}" / f"{day:02d}"`
-    # And line 81: `month = dt.month - 1`
-    # So folders are 00-11.
-    
-    # Aggregation script: `output_file = PARQUET_DIR / pair / str(year) / f"{month:02d}.parquet"`
-    # where month comes from directory name. So it respects the 00-11 naming.
-    
-    parquet_month_file = PARQUET_DIR / pair / str(year) / f"{month:02d}.parquet"
-    if parquet_month_file.exists():
-        # 月次ファイルから読み込み
-        df = pd.read_parquet(parquet_month_file, engine='pyarrow')
-        
-        # 日付でフィルタリング
-        # df['time'] is datetime? In convert_to_parquet:
-        # ohlc['time'] = ohlc['time'] (datetime)
-        # So filtering:
-        target_day_start = datetime(year, dt.month, dt.day, 0, 0, 0, tzinfo=timezone.utc)
-        target_day_end = target_day_start + timedelta(days=1)
-        
-        # Filter
-        mask = (df['time'] >= target_day_start) & (df['time'] < target_day_end)
-        day_df = df.loc[mask].copy()
-        return day_df
+    files = month_partitions(pair, dt, dt)
 
-    # 日次ファイル（フォールバック）
-    parquet_day_file = PARQUET_DIR / pair / str(year) / f"{month:02d}" / f"{day:02d}.parquet"
-    
-    if not parquet_day_file.exists():
-        raise FileNotFoundError(f"Parquetファイルが見つかりません: {parquet_day_file}")
-    
-    # Parquetから読み込み（高速）
-    df = pd.read_parquet(parquet_day_file, engine='pyarrow')
-    return df
+    if not files:
+        raise FileNotFoundError(f"Parquetファイルが見つかりません: {PARQUET_DIR / pair / str(dt.year)}")
+
+    target_day_start = datetime(dt.year, dt.month, dt.day, tzinfo=timezone.utc)
+    return read_parquet_range(files, target_day_start, target_day_start + timedelta(days=1))
 
 
 def load_date_range_data_from_parquet(pair: str, start_date: str, end_date: str):
     """
     Parquetファイルから日付範囲のOHLCデータを読み込み
+
+    必要な月次ファイルをそれぞれ1回だけ開き、時刻フィルタをrow groupまで押し下げる
     
     Args:
         pair: 通貨ペア（例: "EURUSD"）
@@ -246,27 +414,99 @@ def load_date_range_data_from_parquet(pair: str, start_date: str, end_date: str)
     """
     start_dt = datetime.strptime(start_date, "%Y-%m-%d")
     end_dt = datetime.strptime(end_date, "%Y-%m-%d")
-    
-    all_ohlc = []
-    current_dt = start_dt
-    
-    while current_dt <= end_dt:
-        date_str = current_dt.strftime("%Y-%m-%d")
-        try:
-            ohlc = load_day_data_from_parquet(pair, date_str)
-            if not ohlc.empty:
-                all_ohlc.append(ohlc)
-        except FileNotFoundError:
-            pass  # データがない日はスキップ
-        
-        current_dt += timedelta(days=1)
-    
-    if not all_ohlc:
-        return pd.DataFrame(columns=['time', 'open', 'high', 'low', 'close'])
-    
-    # 全データを結合
-    result = pd.concat(all_ohlc, ignore_index=True)
-    return result
+
+    files = month_partitions(pair, start_dt, end_dt)
+
+    start_ts = start_dt.replace(tzinfo=timezone.utc)
+    end_ts = end_dt.replace(tzinfo=timezone.utc) + timedelta(days=1)
+    return read_parquet_range(files, start_ts, end_ts)
+
+
+def resample_ohlc(df: pd.DataFrame, tf: int):
+    """
+    1分足OHLCを上位の時間足に集約
+
+    バーの開始時刻はepoch基準（ブラウザ側の floor(time / step) * step と同じ）
+
+    Args:
+        df: 1分足OHLC（columns: time, open, high, low, close）
+        tf: 時間足（分）
+
+    Returns:
+        pandas.DataFrame: 集約したOHLC（columns: time, open, high, low, close）
+    """
+    if df.empty or tf == 1:
+        return df[OHLC_COLUMNS]
+    bars = (
+        df.set_index('time')[OHLC_COLUMNS[1:]]
+        .resample(TIMEFRAMES[tf], label='left', closed='left', origin='epoch')
+        .agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last'})
+        .dropna()
+    )
+    return bars.reset_index()
+
+
+def timeframe_file(pair: str, tf: int, year: int, month: int) -> Path:
+    """
+    集約済み時間足ファイルのパス: parquet_data/.tf/{tf}/{pair}/{year}/{MM}.parquet
+
+    Args:
+        month: 月（1-12、カレンダー表記）。ファイル名は1分足と同じく0-indexed
+    """
+    return TF_DIR / str(tf) / pair / str(year) / f"{month - 1:02d}.parquet"
+
+
+def _month_bounds(year: int, month: int):
+    first_day = datetime(year, month, 1)
+    next_month = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return first_day, next_month
+
+
+def month_signature(pair: str, year: int, month: int, tf: int = 1):
+    """
+    月次パーティションの変更検知用シグネチャ（ファイルパスと更新時刻）
+
+    Args:
+        month: 月（1-12、カレンダー表記）
+        tf: 時間足（分）。集約済みファイルがあればその更新時刻も含める
+    """
+    first_day, next_month = _month_bounds(year, month)
+    files = month_partitions(pair, first_day, next_month - timedelta(days=1))
+    if tf != 1:
+        tf_file = timeframe_file(pair, tf, year, month)
+        if tf_file.exists():
+            files.append(tf_file)
+    return tuple((str(f), f.stat().st_mtime_ns) for f in files)
+
+
+def load_month_data_smart(pair: str, year: int, month: int, tf: int = 1):
+    """
+    1ヶ月分のOHLCを読み込み（集約済み時間足 → Parquet → bi5 の順に探す）
+
+    Args:
+        pair: 通貨ペア（例: "EURUSD"）
+        year: 年
+        month: 月（1-12、カレンダー表記）
+        tf: 時間足（分）。集約済みファイルがなければ1分足から集約する
+
+    Returns:
+        pandas.DataFrame: 時刻順のOHLC（columns: time, open, high, low, close）
+    """
+    first_day, next_month = _month_bounds(year, month)
+    last_day = next_month - timedelta(days=1)
+
+    if tf != 1:
+        tf_file = timeframe_file(pair, tf, year, month)
+        if tf_file.exists():
+            return pq.read_table(tf_file, columns=OHLC_COLUMNS).to_pandas()
+        return resample_ohlc(load_month_data_smart(pair, year, month), tf)
+
+    files = month_partitions(pair, first_day, last_day)
+    if files:
+        return read_parquet_range(files, first_day.replace(tzinfo=timezone.utc), next_month.replace(tzinfo=timezone.utc))
+
+    # Parquetがなければbi5から読み込み
+    return load_date_range_data(pair, first_day.strftime("%Y-%m-%d"), last_day.strftime("%Y-%m-%d"))
 
 
 def load_day_data_smart(pair: str, date: str):
@@ -306,6 +546,57 @@ def load_date_range_data_smart(pair: str, start_date: str, end_date: str):
         return load_date_range_data(pair, start_date, end_date)
 
 
+def tick_file(pair: str, year: int, month: int) -> Path:
+    """
+    ティックストアのファイルパス
+
+    Args:
+        month: 月（1-12）。ファイル名はDukascopy形式（0-indexed）
+    """
+    return TICK_STORE_DIR / pair / str(year) / f"{month - 1:02d}.parquet"
+
+
+def load_ticks(pair: str, start_date: str, end_date: str):
+    """
+    ティックストアから日付範囲（終了日を含む）のティックをチャンク単位で読み込むジェネレータ
+
+    1チャンク = 1 row group（1日分）。row groupの時刻統計で範囲外の日は読み飛ばし、
+    ファイルはメモリマップで開くので、長い期間でもメモリは1日分で済む
+
+    Args:
+        pair: 通貨ペア（例: "EURUSD"）
+        start_date: 開始日（例: "2025-01-01"）
+        end_date: 終了日（例: "2025-01-31"）
+
+    Yields:
+        pandas.DataFrame: ティックデータ（columns: time(ms), bid, ask(int32ポイント値), bid_volume, ask_volume）
+                          価格にするには points_to_ticks(chunk, get_instrument(pair).point_divisor) を使う
+    """
+    start_dt = datetime.strptime(start_date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    end_dt = datetime.strptime(end_date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    start_ms = int(start_dt.timestamp() * 1000)
+    end_ms = int((end_dt + timedelta(days=1)).timestamp() * 1000)
+
+    year, month = start_dt.year, start_dt.month
+    while (year, month) <= (end_dt.year, end_dt.month):
+        path = tick_file(pair, year, month)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        if not path.exists():
+            continue
+
+        pf = pq.ParquetFile(path, memory_map=True)
+        time_index = pf.schema_arrow.get_field_index('time')
+        for i in range(pf.metadata.num_row_groups):
+            stats = pf.metadata.row_group(i).column(time_index).statistics
+            if stats is not None and stats.has_min_max and (stats.max < start_ms or stats.min >= end_ms):
+                continue
+            table = pf.read_row_group(i)
+            times = table.column('time').to_numpy()
+            lo, hi = np.searchsorted(times, [start_ms, end_ms], side='left')
+            if hi > lo:
+                yield table.slice(lo, hi - lo).to_pandas()
+
+
 if __name__ == "__main__":
     # テスト: EURUSD / 2020-01-01 のデータを読み込み
     ohlc = load_day_data("EURUSD", "2020-01-01")
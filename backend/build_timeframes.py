@@ -0,0 +1,97 @@
+"""
+月次1分足Parquetから上位時間足（5m/15m/1h/4h/1D）のファイルを作成するスクリプト
+aggregate_parquet.py の後段として実行する
+
+出力: parquet_data/.tf/{tf}/{pair}/{year}/{MM}.parquet
+
+使用方法:
+    python build_timeframes.py            # 全ペア（更新された月のみ）
+    python build_timeframes.py --force    # 全て作り直す
+"""
+import argparse
+import concurrent.futures
+import time
+from functools import partial
+
+import pandas as pd
+
+from bi5_reader import PARQUET_DIR, TIMEFRAMES, OHLC_COLUMNS, resample_ohlc, timeframe_file
+
+
+def get_all_pairs():
+    """parquet_dataディレクトリ配下のサブディレクトリをスキャンして通貨ペアリストを取得"""
+    if not PARQUET_DIR.exists():
+        return []
+    return [d.name for d in PARQUET_DIR.iterdir() if d.is_dir() and not d.name.startswith('.')]
+
+
+def build_month(pair, year, month, force=False):
+    """
+    1ヶ月分の全時間足ファイルを作成
+
+    Args:
+        month: 月（0-indexed、ファイル名と同じ）
+
+    Returns:
+        int: 書き出したファイル数
+    """
+    source = PARQUET_DIR / pair / str(year) / f"{month:02d}.parquet"
+    source_mtime = source.stat().st_mtime
+
+    targets = {tf: timeframe_file(pair, tf, year, month + 1) for tf in TIMEFRAMES}
+    if not force:
+        targets = {
+            tf: f for tf, f in targets.items()
+            if not f.exists() or f.stat().st_mtime < source_mtime
+        }
+    if not targets:
+        return 0
+
+    df = pd.read_parquet(source, columns=OHLC_COLUMNS).sort_values('time', kind='stable')
+
+    written = 0
+    for tf, output_file in targets.items():
+        bars = resample_ohlc(df, tf)
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        bars.to_parquet(output_file, engine='pyarrow', compression='zstd', index=False)
+        written += 1
+    return written
+
+
+def process_pair(force, pair):
+    """
+    指定された通貨ペアの全月次ファイルを処理
+    Args:
+        force (bool): 既存の時間足ファイルも作り直すかどうか
+        pair (str): 通貨ペア名
+    """
+    pair_dir = PARQUET_DIR / pair
+    count = 0
+    for year_dir in sorted(d for d in pair_dir.iterdir() if d.is_dir() and d.name.isdigit()):
+        for month_file in sorted(year_dir.glob("*.parquet")):
+            if not month_file.stem.isdigit():
+                continue
+            try:
+                count += build_month(pair, int(year_dir.name), int(month_file.stem), force)
+            except Exception as e:
+                print(f"Error building {pair} {year_dir.name}-{month_file.stem}: {e}")
+
+    print(f"Processed {pair}: wrote {count} timeframe files")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build 5m/15m/1h/4h/1D OHLC files from monthly 1-minute parquet")
+    parser.add_argument("--force", action="store_true", help="Rebuild files that are already up to date")
+    parser.add_argument("--workers", type=int, default=4, help="Number of parallel workers (default: 4)")
+    args = parser.parse_args()
+
+    pairs = get_all_pairs()
+    print(f"Found pairs: {pairs}")
+    print(f"Timeframes: {sorted(TIMEFRAMES)}")
+
+    start_time = time.time()
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as executor:
+        list(executor.map(partial(process_pair, args.force), pairs))
+
+    print(f"Operation complete in {time.time() - start_time:.2f} seconds")
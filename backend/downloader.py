@@ -1,57 +1,16 @@
-import requests
-import time
 from pathlib import Path
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor
 
+from fetch_engine import fetch_all, hour_task, summarize
 
-def download_single_hour(pair: str, year: int, month: int, day: int, hour: int, save_dir: Path):
+
+def day_tasks(pair: str, dt: datetime):
     """
-    1時間分のbi5ファイルをダウンロードする補助関数
+    1日分（24時間）のダウンロードタスクを作成する補助関数
     """
-    url = f"https://datafeed.dukascopy.com/datafeed/{pair}/{year}/{month:02d}/{day:02d}/{hour:02d}h_ticks.bi5"
-    filename = save_dir / f"{hour:02d}h_ticks.bi5"
-    
-    # 既存ファイルがある場合はスキップ
-    if filename.exists() and filename.stat().st_size > 0:
-        return True, "skip"
-    
-    max_retries = 5
-    for attempt in range(max_retries):
-        try:
-            response = requests.get(url, timeout=30)
-            
-            # 404 Not Found はデータがないのでリトライしない
-            if response.status_code == 404:
-                return False, "no data (404)"
-
-            # 5xxエラーなどはリトライ
-            if response.status_code >= 500:
-                response.raise_for_status() # 例外を発生させてcatchブロックへ
-
-            response.raise_for_status()
-            
-            # ファイルに保存
-            content = response.content
-            if len(content) > 0:
-                with open(filename, 'wb') as f:
-                    f.write(content)
-                return True, f"complete ({len(content)} bytes)"
-            else:
-                # 200 OK だが空データの場合もリトライ対象にするか、あるいはデータなしとみなすか
-                # Dukascopyの場合、休日は空ファイルが返ることもあるが、サイズ0なら意味ないのでリトライせずno data扱いとする
-                return False, "no data (0 bytes)"
-        
-        except (requests.exceptions.RequestException, requests.exceptions.HTTPError) as e:
-            # 404以外は原則リトライ
-            last_error = e
-            if attempt < max_retries - 1:
-                # 指数バックオフ + ジッター (固定だと競合しやすいため)
-                sleep_time = (2 ** attempt) + (0.1 * attempt) 
-                time.sleep(sleep_time)
-                continue
-            
-    return False, f"error - max retries exceeded: {last_error}"
+    # 保存先: ../data/PAIR/YEAR/MONTH(0-indexed)/DAY
+    save_dir = Path(f"../data/{pair}/{dt.year}/{dt.month - 1:02d}/{dt.day:02d}")
+    return [hour_task(pair, dt, hour, save_dir) for hour in range(24)]
 
 
 def download_bi5_files(pair: str, date: str, max_workers: int = 2):
@@ -61,34 +20,23 @@ def download_bi5_files(pair: str, date: str, max_workers: int = 2):
     Args:
         pair: 通貨ペア（例: "EURUSD"）
         date: 日付（例: "2020-01-01"）
-        max_workers: 並列数 (デフォルト2: 複数ペア同時実行時の負荷軽減のため)
+        max_workers: 同時接続数 (デフォルト2: 複数ペア同時実行時の負荷軽減のため)
     """
-    # 日付をパース
     dt = datetime.strptime(date, "%Y-%m-%d")
-    year = dt.year
-    month = dt.month - 1  # Dukascopyは0-indexed
-    day = dt.day
-    
-    # 保存先ディレクトリを作成
-    save_dir = Path(f"../data/{pair}/{year}/{month:02d}/{day:02d}")
-    save_dir.mkdir(parents=True, exist_ok=True)
-    
     print(f"ダウンロード開始 (並列): {pair} / {date}")
-    
-    success_count = 0
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {
-            executor.submit(download_single_hour, pair, year, month, day, hour, save_dir): hour 
-            for hour in range(24)
-        }
-        
-        for future in futures:
-            hour = futures[future]
-            success, msg = future.result()
-            if success:
-                success_count += 1
-            print(f"  {hour:02d}h: {msg}")
-    
+
+    messages = {}
+
+    def on_result(task, status, content):
+        messages[task.path.name[:3]] = status
+
+    counts = fetch_all(day_tasks(pair, dt), on_result=on_result, max_connections=max_workers)
+    for hour in sorted(messages):
+        print(f"  {hour}: {messages[hour]}")
+
+    # 既存ファイル（skip）もダウンロード済みとして数える
+    summary = summarize(counts)
+    success_count = summary['downloaded'] + summary['skipped']
     print(f"ダウンロード完了: {pair}/{date} ({success_count}/24 ファイル)")
     return success_count
 
@@ -105,33 +53,35 @@ def download_date_range(pair: str, start_date: str, end_date: str):
     start_dt = datetime.strptime(start_date, "%Y-%m-%d")
     end_dt = datetime.strptime(end_date, "%Y-%m-%d")
     
-    current_dt = start_dt
-    total_days = 0
-    total_files = 0
-    
     print(f"=" * 60)
     print(f"日付範囲ダウンロード: {pair}")
     print(f"期間: {start_date} 〜 {end_date}")
     print(f"=" * 60)
-    
+
+    # 期間全体を1回のエンジン実行で取得（接続プールを日をまたいで再利用する）
+    tasks = []
+    current_dt = start_dt
+    total_days = 0
     while current_dt <= end_dt:
-        date_str = current_dt.strftime("%Y-%m-%d")
-        files = download_bi5_files(pair, date_str)
+        tasks.extend(day_tasks(pair, current_dt))
         total_days += 1
-        total_files += files
         current_dt += timedelta(days=1)
+
+    summary = summarize(fetch_all(tasks))
+    total_files = summary['downloaded'] + summary['skipped']
     
     print(f"\n" + "=" * 60)
     print(f"全ダウンロード完了！")
     print(f"総日数: {total_days} 日")
     print(f"総ファイル数: {total_files} ファイル")
+    print(f"内訳: {summary}")
     print(f"=" * 60)
 
 
 if __name__ == "__main__":
-    # 2025年1年間の主要通貨ペアデータを並列にダウンロード開始
+    # 2025年1年間の主要通貨ペアデータをダウンロード
+    # 並列度はフェッチエンジン側で調整されるので、ペアは順番に処理する
     pairs = ["EURUSD", "USDJPY", "GBPUSD", "AUDUSD"]
     
-    with ThreadPoolExecutor(max_workers=len(pairs)) as executor:
-        for pair in pairs:
-            executor.submit(download_date_range, pair, "2025-01-01", "2025-12-31")
+    for pair in pairs:
+        download_date_range(pair, "2025-01-01", "2025-12-31")
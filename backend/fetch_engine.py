@@ -0,0 +1,318 @@
+"""
+Dukascopy datafeed の非同期ダウンロードエンジン
+
+ダウンロード系スクリプト（fast_downloader*.py, fast_repair_data.py, repair_missing_data.py,
+downloader.py, verify_and_retry.py, smart_downloader.py）はすべてこのモジュールを使う。
+
+- 1つの httpx.AsyncClient（keep-alive のコネクションプール）を全タスクで共有
+- ホストごとの同時実行数を AIMD で調整（成功で +1/ウィンドウ、503・429・タイムアウトで半減）
+- レスポンスは .part ファイルへストリーミングし、完了後にリネーム
+- 完了したタスクを JSON Lines の状態ファイルに記録し、再実行時はスキップ（再開可能）
+
+接続先は base_url（環境変数 DUKASCOPY_BASE_URL）で差し替えられるので、
+ローカルのスタンドインサーバー（verify_fetch_engine.py）に向けて動作確認できる。
+"""
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+DEFAULT_BASE_URL = os.environ.get("DUKASCOPY_BASE_URL", "https://datafeed.dukascopy.com/datafeed")
+
+# 状態ファイル名（データディレクトリ直下に置く）
+STATE_FILE_NAME = ".fetch_state.jsonl"
+
+MAX_CONNECTIONS = 32      # プール全体の接続数 = ワーカー数
+MAX_PER_HOST = 16         # ホストごとの同時実行数の上限
+INITIAL_PER_HOST = 4      # ホストごとの同時実行数の初期値
+MAX_RETRIES = 5
+TIMEOUT_SEC = 15.0
+BACKOFF_BASE_SEC = 0.5
+BACKOFF_MAX_SEC = 30.0
+CHUNK_SIZE = 64 * 1024
+
+# 混雑とみなして同時実行数を下げるステータス
+CONGESTION_STATUS = {429, 503}
+
+# 状態ファイルに記録する（次回以降は取得しない）結果
+FINAL_STATUSES = {'downloaded', 'not_found', 'empty_data'}
+
+# 直近のデータは後から公開されるので、この時間以内の404/空データは状態ファイルに残さない
+UNSETTLED_HOURS = 48
+
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+
+
+@dataclass(frozen=True)
+class FetchTask:
+    """
+    1ファイル分のダウンロードタスク
+
+    Args:
+        url: 取得するURL
+        path: 保存先（None ならメモリに読み込み、on_result に bytes を渡す）
+        resumable: 結果を状態ファイルに記録してよいか
+    """
+    url: str
+    path: Optional[Path] = None
+    resumable: bool = True
+
+    @property
+    def key(self):
+        return self.url
+
+
+def hour_url(pair, year, month, day, hour, base_url=DEFAULT_BASE_URL):
+    """1時間分のbi5のURL（month は0-indexed）"""
+    return f"{base_url}/{pair}/{year}/{month:02d}/{day:02d}/{hour:02d}h_ticks.bi5"
+
+
+def hour_task(pair, date, hour, save_dir=None, base_url=DEFAULT_BASE_URL):
+    """
+    1時間分のbi5のタスクを作成
+
+    Args:
+        date: 対象日（datetime）
+        save_dir: 保存先ディレクトリ（None ならメモリに読み込む）
+    """
+    url = hour_url(pair, date.year, date.month - 1, date.day, hour, base_url)
+    path = Path(save_dir) / f"{hour:02d}h_ticks.bi5" if save_dir is not None else None
+    hour_start = datetime(date.year, date.month, date.day, hour)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    settled = hour_start < now - timedelta(hours=UNSETTLED_HOURS)
+    return FetchTask(url, path, resumable=settled)
+
+
+def summarize(counts):
+    """run() の結果を downloaded/skipped/not_found/empty_data/failed に集計"""
+    summary = {'downloaded': 0, 'skipped': 0, 'not_found': 0, 'empty_data': 0, 'failed': 0}
+    for status, n in counts.items():
+        if status == 'resumed':
+            status = 'skipped'
+        summary[status if status in summary else 'failed'] += n
+    return summary
+
+
+class AIMDLimiter:
+    """
+    同時実行数の AIMD 制御
+
+    成功するたびに 1/limit ずつ増やし（1ウィンドウで +1）、混雑時は半分にする。
+    同時に返ってきた複数の 503 で何度も半減しないよう、減少は cooldown 秒に1回まで。
+    """
+
+    def __init__(self, initial=INITIAL_PER_HOST, maximum=MAX_PER_HOST, minimum=1, cooldown=1.0):
+        self.limit = float(initial)
+        self.maximum = maximum
+        self.minimum = minimum
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self):
+        self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+
+    def on_congestion(self):
+        now = time.monotonic()
+        if now - self._last_decrease >= self.cooldown:
+            self.limit = max(float(self.minimum), self.limit / 2)
+            self._last_decrease = now
+
+
+class TaskState:
+    """完了したタスクを JSON Lines で追記し、再実行時に読み込む"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.done = {}
+        self._fh = None
+        if self.path.exists():
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 中断時に書きかけだった行
+                        continue
+                    self.done[record['key']] = record['status']
+
+    def record(self, task, status):
+        if not task.resumable or status not in FINAL_STATUSES:
+            return
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self.path, 'a', encoding='utf-8')
+        self._fh.write(json.dumps({'key': task.key, 'status': status}) + '\n')
+        self._fh.flush()
+        self.done[task.key] = status
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+class FetchEngine:
+    """
+    タスク列を共有クライアントで並行ダウンロードする
+
+    Args:
+        max_connections: ワーカー数（コネクションプールの上限）
+        max_per_host: ホストごとの同時実行数の上限
+        initial_per_host: ホストごとの同時実行数の初期値
+        retries: 混雑・タイムアウト・5xx 時の試行回数
+        timeout: 1リクエストのタイムアウト（秒）
+        state_file: 状態ファイルのパス（None なら再開しない）
+        transport: httpx のトランスポート（テスト用の差し替え）
+    """
+
+    def __init__(self, max_connections=MAX_CONNECTIONS, max_per_host=MAX_PER_HOST,
+                 initial_per_host=INITIAL_PER_HOST, retries=MAX_RETRIES, timeout=TIMEOUT_SEC,
+                 state_file=None, transport=None):
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.initial_per_host = min(initial_per_host, max_per_host)
+        self.retries = retries
+        self.timeout = timeout
+        self.state_file = state_file
+        self.transport = transport
+        self.limiters = {}
+
+    def limiter(self, host):
+        if host not in self.limiters:
+            self.limiters[host] = AIMDLimiter(self.initial_per_host, self.max_per_host)
+        return self.limiters[host]
+
+    async def run(self, tasks, on_result=None):
+        """
+        全タスクを実行
+
+        Args:
+            tasks: FetchTask の iterable（先頭から順に取り出す）
+            on_result: (task, status, content) を受け取るコールバック。
+                       content は path=None のタスクで取得できた場合のみ bytes
+
+        Returns:
+            Counter: ステータスごとの件数
+                     (downloaded / skipped / resumed / not_found / empty_data / failed / error_XXX)
+        """
+        counts = Counter()
+        state = TaskState(self.state_file) if self.state_file else None
+        pending = iter(tasks)
+        limits = httpx.Limits(max_connections=self.max_connections,
+                              max_keepalive_connections=self.max_connections)
+
+        async with httpx.AsyncClient(limits=limits, timeout=self.timeout, headers=HEADERS,
+                                     transport=self.transport) as client:
+            async def worker():
+                # 共有イテレータから1件ずつ取り出す（タスクを一度に全部コルーチン化しない）
+                for task in pending:
+                    if state is not None and task.key in state.done:
+                        status, content = 'resumed', None
+                    else:
+                        status, content = await self.fetch(client, task)
+                        if state is not None:
+                            state.record(task, status)
+                    counts[status] += 1
+                    if on_result is not None:
+                        on_result(task, status, content)
+
+            try:
+                await asyncio.gather(*(worker() for _ in range(self.max_connections)))
+            finally:
+                if state is not None:
+                    state.close()
+
+        return counts
+
+    async def fetch(self, client, task):
+        """1タスクを取得（リトライ込み）し、(status, content) を返す"""
+        if task.path is not None and task.path.exists() and task.path.stat().st_size > 0:
+            return 'skipped', None
+
+        limiter = self.limiter(urlsplit(task.url).netloc)
+        for attempt in range(self.retries):
+            await limiter.acquire()
+            try:
+                status, content = await self._get(client, task)
+            except httpx.TimeoutException:
+                status, content = 'congested', None
+            except httpx.TransportError:
+                status, content = 'retry', None
+            finally:
+                await limiter.release()
+
+            if status == 'congested':
+                limiter.on_congestion()
+            elif status != 'retry':
+                limiter.on_success()
+                return status, content
+
+            # 指数バックオフ + ジッター
+            delay = min(BACKOFF_MAX_SEC, BACKOFF_BASE_SEC * 2 ** attempt)
+            await asyncio.sleep(delay * (0.5 + random.random()))
+
+        return 'failed', None
+
+    async def _get(self, client, task):
+        async with client.stream('GET', task.url) as res:
+            if res.status_code == 404:
+                return 'not_found', None
+            if res.status_code in CONGESTION_STATUS:
+                return 'congested', None
+            if res.status_code >= 500:
+                return 'retry', None
+            if res.status_code != 200:
+                return f'error_{res.status_code}', None
+
+            if task.path is None:
+                content = await res.aread()
+                return ('downloaded' if content else 'empty_data'), (content or None)
+
+            return await self._stream_to_file(res, task.path), None
+
+    @staticmethod
+    async def _stream_to_file(res, path):
+        """.part に書き出してからリネーム（中断しても壊れたbi5が残らない）"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + '.part')
+        size = 0
+        try:
+            with open(tmp, 'wb') as f:
+                async for chunk in res.aiter_bytes(CHUNK_SIZE):
+                    f.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+        if size == 0:
+            tmp.unlink()
+            return 'empty_data'
+        os.replace(tmp, path)
+        return 'downloaded'
+
+
+def fetch_all(tasks, on_result=None, **kwargs):
+    """同期コードから FetchEngine(**kwargs).run(tasks, on_result) を実行"""
+    return asyncio.run(FetchEngine(**kwargs).run(tasks, on_result))
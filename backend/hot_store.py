@@ -0,0 +1,253 @@
+"""
+最近使った月のOHLCを非圧縮の列ファイルとして保持するホットストア（任意）
+
+(symbol, tf, year, month) ごとに1ディレクトリで、その下の版ディレクトリ（v1, v2, ...）に
+列ごとの .npy ファイル（time: int64 epoch秒, open/high/low/close: float64、固定長・非圧縮）を置く。
+読み出しは np.load(mmap_mode='r') のメモリマップなので、デコードもコピーもなく、
+OHLCBlockCache の二分探索（searchsorted）による切り出しもファイル上のビューになる。
+
+各版にはソースファイルのシグネチャ（パスと更新時刻）を保存し、Parquet などが
+更新されていたら新しい版として書き直す。max_months を超えたら最も古く使われた月を外す。
+Windows ではメモリマップ中のファイルを削除も置き換えもできないので、既存の版は書き換えず、
+古くなった版は開いているメモリマップがすべて解放されてから削除する。
+追い出した月は add_evict_listener で登録した関数（OHLCBlockCache.discard）に知らせ、
+キャッシュが持っているメモリマップを手放させる。
+"""
+import json
+import shutil
+import threading
+import weakref
+from collections import Counter, OrderedDict, deque
+from pathlib import Path
+
+import numpy as np
+
+# 保存する列（OHLCBlockCache のブロックと同じ）
+HOT_COLUMNS = ('time', 'open', 'high', 'low', 'close')
+
+# ソースのシグネチャを保存するファイル名
+SOURCE_FILE = "source.json"
+
+
+def _month_dir(root: Path, key) -> Path:
+    symbol, tf, year, month = key
+    return root / symbol / f"{tf}m" / f"{year:04d}-{month:02d}"
+
+
+def _version(path: Path) -> int:
+    """版ディレクトリ名（v3 など）の番号（版でなければ ValueError）"""
+    if not path.name.startswith("v"):
+        raise ValueError(path.name)
+    return int(path.name[1:])
+
+
+def _signature_json(sig):
+    """シグネチャ（タプルのタプル）をJSONで比較できる形に"""
+    return json.loads(json.dumps(sig))
+
+
+class HotStore:
+    """
+    メモリマップした月ブロックのストア
+
+    Args:
+        root: 列ファイルを置くディレクトリ（ローカルディスク推奨）
+        max_months: 保持する月ブロックの数の上限
+    """
+
+    def __init__(self, root: Path, max_months: int):
+        self.root = Path(root)
+        self.max_months = max_months
+        self._lock = threading.Lock()
+        self._order = OrderedDict()  # key -> 最新の版ディレクトリ（使った順）
+        self._maps = Counter()  # 版ディレクトリ -> 開いているメモリマップの数
+        self._released = deque()  # 解放されたメモリマップの版ディレクトリ（GC から追加される）
+        self._retired = set()  # 削除待ちの古い版ディレクトリ
+        self._listeners = []  # 追い出した月の key を受け取る関数
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        # 月ごとに最新の版だけ残し、それ以外（古い版や書きかけ）は削除待ちにする。
+        # 月は最新の版の更新時刻の古い順に並べる
+        found = []
+        for month_dir in self.root.glob("*/*m/*"):
+            try:
+                year, month = (int(x) for x in month_dir.name.split("-"))
+                key = (month_dir.parent.parent.name, int(month_dir.parent.name[:-1]), year, month)
+            except ValueError:
+                continue
+            versions = []
+            for path in month_dir.iterdir():
+                try:
+                    versions.append((_version(path), path))
+                except ValueError:
+                    self._retired.add(path)
+                    continue
+            versions.sort()
+            while versions and not (versions[-1][1] / SOURCE_FILE).exists():
+                self._retired.add(versions.pop()[1])
+            if not versions:
+                continue
+            self._retired.update(path for _, path in versions[:-1])
+            latest = versions[-1][1]
+            found.append(((latest / SOURCE_FILE).stat().st_mtime_ns, key, latest))
+        for _, key, latest in sorted(found):
+            self._order[key] = latest
+        self._sweep()
+
+    def add_evict_listener(self, fn):
+        """月を追い出したときに fn(key) を呼ぶ（その月のメモリマップを手放してもらう）"""
+        self._listeners.append(fn)
+
+    def holds(self, key) -> bool:
+        """key の月を保持しているか（追い出されていないか）"""
+        with self._lock:
+            return key in self._order
+
+    def get(self, key, sig):
+        """
+        月ブロックをメモリマップで開く
+
+        Args:
+            key: (symbol, tf, year, month)
+            sig: 現在のソースのシグネチャ
+
+        Returns:
+            {列名: 読み取り専用のmemmap配列}。ないか古ければ None
+        """
+        with self._lock:
+            version_dir = self._order.get(key)
+        try:
+            if version_dir is None:
+                raise FileNotFoundError(key)
+            saved = json.loads((version_dir / SOURCE_FILE).read_text())
+            if saved != _signature_json(sig):
+                raise FileNotFoundError(version_dir)
+            block = self._open(version_dir)
+        except (FileNotFoundError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            if key in self._order:
+                self._order.move_to_end(key)
+        return block
+
+    def _open(self, version_dir: Path):
+        """版ディレクトリの列を開き、メモリマップが解放されるまで版を使用中として数える"""
+        block = {}
+        for c in HOT_COLUMNS:
+            path = version_dir / f"{c}.npy"
+            arr = np.load(path, mmap_mode='r')
+            if not arr.size:
+                # 長さ0の配列はメモリマップできないので普通に読む
+                block[c] = np.load(path)
+                continue
+            with self._lock:
+                self._maps[version_dir] += 1
+            # 切り出したビューも元の配列を参照するので、これが呼ばれるのはすべて解放されてから
+            weakref.finalize(arr, self._released.append, version_dir)
+            block[c] = arr
+        return block
+
+    def put(self, key, sig, block):
+        """
+        月ブロックを新しい版として書き込み、メモリマップで開き直したブロックを返す
+
+        一時ディレクトリに書いてから新しい版の名前に変えるので、読み手が書きかけのファイルを
+        見ることはなく、開かれている古い版を消したり置き換えたりすることもない。
+        書き込めなければ（ディスクがいっぱいなど）渡されたブロックをそのまま返す
+        """
+        month_dir = _month_dir(self.root, key)
+        tmp_dir = month_dir / f".{threading.get_ident()}.tmp"
+        try:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            tmp_dir.mkdir(parents=True)
+            for c in HOT_COLUMNS:
+                dtype = '<i8' if c == 'time' else '<f8'
+                np.save(tmp_dir / f"{c}.npy", np.ascontiguousarray(block[c], dtype=dtype))
+            # シグネチャは最後に書く（これがあれば列ファイルはそろっている）
+            (tmp_dir / SOURCE_FILE).write_text(json.dumps(sig))
+
+            evicted = []
+            with self._lock:
+                previous = self._order.get(key)
+                number = _version(previous) + 1 if previous is not None else 1
+                while (month_dir / f"v{number}").exists():
+                    number += 1
+                version_dir = month_dir / f"v{number}"
+                tmp_dir.rename(version_dir)
+                self.writes += 1
+                self._order[key] = version_dir
+                self._order.move_to_end(key)
+                if previous is not None:
+                    self._retired.add(previous)
+                while len(self._order) > self.max_months:
+                    old_key, old_dir = self._order.popitem(last=False)
+                    self._retired.add(old_dir)
+                    evicted.append(old_key)
+                    self.evictions += 1
+        except OSError as e:
+            print(f"Hot store write failed for {key}: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return block
+
+        # キャッシュがメモリマップを手放してから削除する
+        for old_key in evicted:
+            for fn in self._listeners:
+                fn(old_key)
+        self._sweep()
+        try:
+            return self._open(version_dir)
+        except FileNotFoundError:
+            # 書いた直後に他のスレッドの書き込みで追い出されて消された
+            return block
+
+    def _sweep(self):
+        """削除待ちの版のうち、メモリマップが残っていないものを削除（消せなければ次の機会に再試行）"""
+        with self._lock:
+            while self._released:
+                version_dir = self._released.popleft()
+                self._maps[version_dir] -= 1
+                if self._maps[version_dir] <= 0:
+                    del self._maps[version_dir]
+            removable = [d for d in self._retired if d not in self._maps]
+
+        removed = []
+        for version_dir in removable:
+            try:
+                if version_dir.is_dir():
+                    shutil.rmtree(version_dir)
+                else:
+                    version_dir.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            removed.append(version_dir)
+            # 版がなくなった月のディレクトリも消す（空でなければそのまま）
+            try:
+                version_dir.parent.rmdir()
+            except OSError:
+                pass
+
+        with self._lock:
+            self._retired.difference_update(removed)
+
+    def stats(self):
+        self._sweep()
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "months": len(self._order),
+                "max_months": self.max_months,
+                "mapped_versions": len(self._maps),
+                "retired_versions": len(self._retired),
+            }
@@ -0,0 +1,259 @@
+"""
+チャート用インジケーターを月ブロック単位で計算してキャッシュする
+
+(symbol, tf, 指定, year, month) ごとに1ヶ月分のインジケーター列を保持し、
+任意の日付範囲をブロックの切り出しと連結で返す。範囲を広げても計算するのは
+まだキャッシュにない月だけ。
+
+各月は直前の月の末尾（ウォームアップ分の本数）を前につなげて計算するので、
+月の先頭でも移動平均などが途切れない。日足など1ヶ月の本数が少ない時間足では、
+本数がそろうまで何ヶ月でもさかのぼる。EMA（MACD）は最初の値を種にする再帰なので、
+期間の EMA_WARMUP_SPANS 倍の本数をさかのぼって種の影響が消えた値を使う。
+計算式は engine/indicators.py（Lab の戦略と共通、フロントエンドのチャートと同じ定義）。
+
+指定の書式: "sma:20", "ema:50", "rsi:14", "bb:20:2"（期間:σ倍率）, "macd:12:26:9"
+"""
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+from ohlc_cache import block_nbytes, iter_months
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "engine"))
+import indicators as ind
+
+# EMAのウォームアップ本数（期間の何倍さかのぼるか。10倍で種の影響は約 e^-20）
+EMA_WARMUP_SPANS = 10
+
+# ウォームアップでさかのぼるとき、足のない月がこれだけ続いたらデータの先頭とみなす
+WARMUP_MAX_EMPTY_MONTHS = 12
+
+# 指定ごとの引数の数
+SPEC_ARITY = {"sma": 1, "ema": 1, "rsi": 1, "bb": 2, "macd": 3}
+
+
+def parse_spec(spec: str):
+    """
+    インジケーター指定を (正規化した指定, 種類, 引数) に分解
+
+    Raises:
+        ValueError: 書式が不正な場合
+    """
+    kind, *args = spec.strip().lower().split(":")
+    if kind not in SPEC_ARITY or len(args) != SPEC_ARITY[kind]:
+        raise ValueError(f"Invalid indicator: {spec}")
+    try:
+        values = [float(a) if kind == "bb" and i == 1 else int(a) for i, a in enumerate(args)]
+    except ValueError:
+        raise ValueError(f"Invalid indicator: {spec}") from None
+    if any(v <= 0 for v in values):
+        raise ValueError(f"Invalid indicator: {spec}")
+    # bb:20:2 と bb:20:2.0 を同じキーにする
+    canonical = ":".join([kind, *(f"{v:g}" for v in values)])
+    return canonical, kind, values
+
+
+def warmup_bars(kind, args) -> int:
+    """月の先頭の値を求めるのに必要な、直前の本数"""
+    if kind in ("sma", "bb"):
+        return args[0] - 1
+    if kind == "rsi":
+        return args[0]
+    if kind == "ema":
+        return EMA_WARMUP_SPANS * args[0]
+    # macd: 長いほうのEMAとシグナルのEMA
+    return EMA_WARMUP_SPANS * (args[1] + args[2])
+
+
+def add_spec(graph, kind, args):
+    """指定の出力 {接尾辞: 列名} をグラフに追加（接尾辞 "" は本体）"""
+    if kind == "sma":
+        return {"": ind.sma(graph, "close", args[0])}
+    if kind == "ema":
+        return {"": ind.ema(graph, "close", args[0])}
+    if kind == "rsi":
+        return {"": ind.rsi(graph, "close", args[0])}
+    if kind == "bb":
+        return ind.bollinger(graph, "close", args[0], args[1])
+    return ind.macd(graph, "close", *args)
+
+
+def compute(close: np.ndarray, specs):
+    """
+    終値にインジケーターを計算（複数の指定で共通のノードは1回だけ）
+
+    Args:
+        specs: [(正規化した指定, 種類, 引数)]
+
+    Returns:
+        {指定: {接尾辞: float64配列（未定義はNaN）}}
+    """
+    graph = ind.IndicatorGraph()
+    outputs = {spec: add_spec(graph, kind, args) for spec, kind, args in specs}
+    frame = graph.apply(pl.LazyFrame({"close": close}, schema={"close": pl.Float64})).collect()
+    return {
+        spec: {suffix: frame[column].fill_null(np.nan).to_numpy() for suffix, column in columns.items()}
+        for spec, columns in outputs.items()
+    }
+
+
+class IndicatorBlockCache:
+    """
+    バイト数上限付きのLRUキャッシュ（OHLCBlockCache の上に載せる）
+
+    Args:
+        ohlc_cache: 価格の月ブロックを取得する OHLCBlockCache
+        max_bytes: 保持するブロックの合計バイト数の上限
+    """
+
+    def __init__(self, ohlc_cache, max_bytes: int):
+        self.ohlc_cache = ohlc_cache
+        self.max_bytes = max_bytes
+        self._blocks = OrderedDict()  # key -> ((使った月, シグネチャ), {接尾辞: 配列}, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _price_block(self, symbol, year, month, tf):
+        try:
+            return self.ohlc_cache.get_block(symbol, year, month, tf)
+        except FileNotFoundError:
+            return {"time": np.zeros(0, dtype=np.int64), "close": np.zeros(0)}
+
+    def _warmup(self, symbol, year, month, tf, bars):
+        """
+        直前の月から最大 bars 本の終値と、使った月の (year, month) のタプル
+
+        bars 本そろうか、足のない月が WARMUP_MAX_EMPTY_MONTHS ヶ月続く（データの先頭）までさかのぼる
+        """
+        closes, months = [], []
+        have = empty = 0
+        while have < bars and empty < WARMUP_MAX_EMPTY_MONTHS:
+            year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+            block = self._price_block(symbol, year, month, tf)
+            months.append((year, month))
+            part = block["close"][max(0, len(block["close"]) - (bars - have)):]
+            closes.insert(0, part)
+            have += len(part)
+            empty = 0 if len(part) else empty + 1
+        return (np.concatenate(closes) if closes else np.zeros(0)), tuple(months)
+
+    def _signature(self, symbol, tf, months):
+        """計算に使った月（対象月とウォームアップの月）のソースのシグネチャ"""
+        return tuple(self.ohlc_cache.signature(symbol, year, month, tf) for year, month in months)
+
+    def get_month(self, symbol: str, year: int, month: int, tf: int, specs):
+        """
+        1ヶ月分の価格ブロックの時刻と、指定ごとのインジケーター列
+
+        Returns:
+            (time配列, {指定: {接尾辞: 配列}})
+        """
+        block = self._price_block(symbol, year, month, tf)
+        result, missing = {}, []
+
+        for spec in specs:
+            key = (symbol, tf, spec[0], year, month)
+            with self._lock:
+                entry = self._blocks.get(key)
+            # 対象月かウォームアップに使った月のファイルが更新されていたら計算し直す
+            if entry is not None and self._signature(symbol, tf, entry[0][0]) == entry[0][1]:
+                with self._lock:
+                    if key in self._blocks:
+                        self._blocks.move_to_end(key)
+                    self.hits += 1
+                result[spec[0]] = entry[1]
+            else:
+                with self._lock:
+                    self.misses += 1
+                missing.append(spec)
+
+        if missing and len(block["time"]):
+            # 計算はロックの外で、足りない指定だけまとめて（共通ノードは1回）
+            warm, warm_months = self._warmup(symbol, year, month, tf,
+                                             max(warmup_bars(kind, args) for _, kind, args in missing))
+            months = ((year, month), *warm_months)
+            sig = (months, self._signature(symbol, tf, months))
+            values = compute(np.concatenate([warm, block["close"]]), missing)
+            for spec, _, _ in missing:
+                columns = {suffix: arr[len(warm):] for suffix, arr in values[spec].items()}
+                self._store((symbol, tf, spec, year, month), sig, columns)
+                result[spec] = columns
+        elif missing:
+            result.update({spec: {} for spec, _, _ in missing})
+
+        return block["time"], result
+
+    def _store(self, key, sig, columns):
+        nbytes = block_nbytes(columns)
+        with self._lock:
+            old = self._blocks.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+            # 上限を超えるブロックは保持しない
+            if nbytes > self.max_bytes:
+                return
+
+            while self._blocks and self._bytes + nbytes > self.max_bytes:
+                _, (_, _, evicted) = self._blocks.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+            self._blocks[key] = (sig, columns, nbytes)
+            self._bytes += nbytes
+
+    def get_range(self, symbol: str, start_date: str, end_date: str, tf: int, specs):
+        """
+        日付範囲（終了日を含む）のインジケーターを月ブロックから組み立て
+
+        Args:
+            specs: インジケーター指定の文字列のリスト（例: ["sma:20", "bb:20:2"]）
+
+        Returns:
+            (time: int64 epoch秒の配列, {出力名: float64配列})。
+            出力名は指定そのもの、複数出力は "bb:20:2.upper" のように接尾辞付き
+        """
+        parsed = list({p[0]: p for p in map(parse_spec, specs)}.values())
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d")
+        end_dt = datetime.strptime(end_date, "%Y-%m-%d")
+        start_ts = int(start_dt.replace(tzinfo=timezone.utc).timestamp())
+        end_ts = int((end_dt + timedelta(days=1)).replace(tzinfo=timezone.utc).timestamp())
+
+        times, parts = [], {}
+        for year, month in iter_months(start_dt, end_dt):
+            time, values = self.get_month(symbol, year, month, tf, parsed)
+            lo, hi = np.searchsorted(time, [start_ts, end_ts], side='left')
+            if hi <= lo:
+                continue
+            times.append(time[lo:hi])
+            for spec, columns in values.items():
+                for suffix, arr in columns.items():
+                    name = f"{spec}.{suffix}" if suffix else spec
+                    parts.setdefault(name, []).append(arr[lo:hi])
+
+        time = np.concatenate(times) if times else np.zeros(0, dtype=np.int64)
+        return time, {name: np.concatenate(arrs) for name, arrs in parts.items()}
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "blocks": len(self._blocks),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+            self._bytes = 0
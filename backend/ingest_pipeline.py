@@ -0,0 +1,224 @@
+"""
+bi5を中間ファイルなしで月次Parquetへ直接書き出すストリーミングパイプライン
+
+従来の fast_downloader（bi5保存）→ convert_to_parquet（日次Parquet）→ aggregate_parquet（月次に結合）
+の3段階を1パスにまとめる。
+1時間分のbi5はメモリ上でデコードし、1日分そろった時点で1分足と
+ティックストアそれぞれの月次ファイルにrow groupとして追記する（時刻順・1日1 row group）。
+保持するのは未書き出しの日のティックと、取得中のbi5だけなのでメモリは月の長さに依存しない。
+
+出力: parquet_data/{pair}/{year}/{MM}.parquet（MMは0-indexed、spread/tick_count列付き）、
+      .ticks のティックストア、.tf の上位時間足
+
+使用方法:
+    python ingest_pipeline.py --symbol EURUSD --start-year 2024 --end-year 2025
+    python ingest_pipeline.py --all --force
+"""
+import argparse
+import concurrent.futures
+import lzma
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from functools import partial
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from bi5_reader import (
+    PARQUET_DIR, TICK_STORE_SCHEMA, TICK_STORE_WRITE_OPTIONS,
+    decode_bi5_points, points_to_ticks, tick_file, ticks_to_ohlc,
+)
+from build_timeframes import build_month
+from fetch_engine import MAX_CONNECTIONS, fetch_all, hour_task
+from instruments import get_instrument
+
+PAIRS = ["EURUSD", "USDJPY", "GBPUSD", "EURJPY", "EURGBP", "GBPJPY"]
+
+# 既存の月次ファイルのOHLCに、ティックから求めたスプレッドとティック数を加えたスキーマ
+MONTHLY_SCHEMA = pa.schema([
+    ('time', pa.timestamp('ns', tz='UTC')),
+    ('open', pa.float64()),
+    ('high', pa.float64()),
+    ('low', pa.float64()),
+    ('close', pa.float64()),
+    ('spread', pa.float64()),
+    ('tick_count', pa.int32()),
+])
+MONTHLY_WRITE_OPTIONS = {'compression': 'zstd'}
+
+
+def month_days(year, month):
+    """月の全日（month は0-indexed）"""
+    day = datetime(year, month + 1, 1)
+    while day.month == month + 1:
+        yield day
+        day += timedelta(days=1)
+
+
+def settled_at(year, month):
+    """この時刻より後に書き出された月次ファイルは確定済みとみなす（月末 + 2日）"""
+    next_month = datetime(year + 1, 1, 1) if month == 11 else datetime(year, month + 2, 1)
+    return next_month + timedelta(days=2)
+
+
+class MonthWriter:
+    """
+    1ヶ月分のデータを日単位のrow groupで .part ファイルに追記し、完了時にリネームする
+    （1分足の月次ファイルとティックストアで共用）
+
+    日はダウンロード完了順に届くので、前の日が書かれるまで後の日はバッファしておく
+    """
+
+    def __init__(self, output_file, days, schema, write_options):
+        self.output_file = output_file
+        self.schema = schema
+        self.write_options = write_options
+        self.tmp_file = output_file.with_name(output_file.name + '.part')
+        self.days = list(days)
+        self.next_index = 0
+        self.ready = {}
+        self.rows = 0
+        self.writer = None
+
+    def add_day(self, day, bars):
+        self.ready[day] = bars
+        while self.next_index < len(self.days) and self.days[self.next_index] in self.ready:
+            self._write(self.ready.pop(self.days[self.next_index]))
+            self.next_index += 1
+
+    def _write(self, df):
+        if df.empty:
+            return
+        if self.writer is None:
+            self.output_file.parent.mkdir(parents=True, exist_ok=True)
+            self.writer = pq.ParquetWriter(self.tmp_file, self.schema, **self.write_options)
+        table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        self.writer.write_table(table)
+        self.rows += len(df)
+
+    def commit(self):
+        """書き出したデータがあれば月次ファイルに置き換える。行数を返す"""
+        if self.writer is None:
+            return 0
+        self.writer.close()
+        os.replace(self.tmp_file, self.output_file)
+        return self.rows
+
+    def abort(self):
+        if self.writer is not None:
+            self.writer.close()
+        if self.tmp_file.exists():
+            self.tmp_file.unlink()
+
+
+def ingest_month(pair, year, month, force=False):
+    """
+    1ヶ月分のbi5を取得して月次Parquet・ティックストア・上位時間足を作成
+
+    Args:
+        month: 月（0-indexed、ファイル名と同じ）
+        force: 既存の月次ファイルも作り直す
+
+    Returns:
+        str: 'written' / 'skipped' / 'empty' / 'failed'
+    """
+    output_file = PARQUET_DIR / pair / str(year) / f"{month:02d}.parquet"
+    if output_file.exists() and not force:
+        # 未確定だった月（書き出しが月末+2日より前）は取り直す
+        written_at = datetime.fromtimestamp(output_file.stat().st_mtime, timezone.utc).replace(tzinfo=None)
+        if written_at > settled_at(year, month):
+            return 'skipped'
+
+    days = [d for d in month_days(year, month) if d <= datetime.now()]
+    point_divisor = get_instrument(pair).point_divisor
+    writer = MonthWriter(output_file, days, MONTHLY_SCHEMA, MONTHLY_WRITE_OPTIONS)
+    tick_writer = MonthWriter(tick_file(pair, year, month + 1), days, TICK_STORE_SCHEMA, TICK_STORE_WRITE_OPTIONS)
+    pending = {day: {'left': 24, 'points': [], 'failed': False} for day in days}
+    owners = {}
+
+    def tasks():
+        for day in days:
+            for hour in range(24):
+                task = hour_task(pair, day, hour)
+                owners[task.url] = (day, hour)
+                yield task
+
+    def on_result(task, status, content):
+        day, hour = owners.pop(task.url)
+        entry = pending[day]
+        if content is not None:
+            base_dt = day.replace(hour=hour, tzinfo=timezone.utc)
+            points = decode_bi5_points(lzma.decompress(content), int(base_dt.timestamp() * 1000))
+            if not points.empty:
+                entry['points'].append(points)
+        elif status not in ('not_found', 'empty_data'):
+            entry['failed'] = True
+
+        entry['left'] -= 1
+        if entry['left'] == 0:
+            # 1日分そろったら書き出し、ティックは保持しない
+            del pending[day]
+            if entry['failed']:
+                raise RuntimeError(f"download failed for {pair} {day:%Y-%m-%d}")
+            if entry['points']:
+                points = pd.concat(entry['points'], ignore_index=True).sort_values('time', kind='stable')
+            else:
+                points = pd.DataFrame(columns=TICK_STORE_SCHEMA.names)
+            tick_writer.add_day(day, points)
+            writer.add_day(day, ticks_to_ohlc(points_to_ticks(points, point_divisor)))
+
+    try:
+        fetch_all(tasks(), on_result=on_result, max_connections=MAX_CONNECTIONS)
+    except Exception as e:
+        writer.abort()
+        tick_writer.abort()
+        print(f"Error ingesting {pair} {year}-{month:02d}: {e}")
+        return 'failed'
+
+    tick_writer.commit()
+    if writer.commit() == 0:
+        return 'empty'
+
+    # 上位時間足（.tf）も同じパスで更新
+    build_month(pair, year, month, force=True)
+    return 'written'
+
+
+def process_pair(args, pair):
+    """
+    指定された通貨ペアの期間内の全月を順番に処理（1ワーカー = 1ペア）
+    """
+    now = datetime.now()
+    results = {'written': 0, 'skipped': 0, 'empty': 0, 'failed': 0}
+    for year in range(args.end_year, args.start_year - 1, -1):
+        for month in range(11, -1, -1):
+            if (year, month) > (now.year, now.month - 1):
+                continue
+            results[ingest_month(pair, year, month, args.force)] += 1
+    print(f"Processed {pair}: {results}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download bi5 straight into monthly 1-minute parquet files")
+    parser.add_argument("--symbol", type=str, help="Currency pair (e.g., EURUSD)")
+    parser.add_argument("--all", action="store_true", help="Process all default pairs")
+    parser.add_argument("--start-year", type=int, default=2020)
+    parser.add_argument("--end-year", type=int, default=datetime.now().year)
+    parser.add_argument("--force", action="store_true", help="Rebuild months that already have a monthly file")
+    parser.add_argument("--workers", type=int, default=2, help="Pairs processed in parallel (default: 2)")
+    args = parser.parse_args()
+
+    if not args.symbol and not args.all:
+        parser.print_help()
+        raise SystemExit(1)
+
+    pairs = PAIRS if args.all else [args.symbol]
+    print(f"Pairs: {pairs}  Years: {args.start_year}-{args.end_year}")
+
+    start_time = time.time()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as executor:
+        list(executor.map(partial(process_pair, args), pairs))
+
+    print(f"Operation complete in {time.time() - start_time:.2f} seconds")
@@ -0,0 +1,78 @@
+"""
+通貨ペアごとの銘柄情報（ポイント値・pip・取引単位・表示桁数）のレジストリ
+
+bi5の価格は整数のポイント値で、ポイントの大きさは銘柄によって異なる
+（JPYクロスは 0.001、それ以外は 0.00001）。デコーダ・エンジン・フロントエンドは
+銘柄名の文字列判定ではなく、ここから取得した値を使う。
+
+get_instrument() はプロセス内でキャッシュされる。
+"""
+from dataclasses import dataclass, asdict
+from functools import lru_cache
+
+
+@dataclass(frozen=True)
+class Instrument:
+    """
+    Args:
+        symbol: 通貨ペア（例: "EURUSD"）
+        point_divisor: bi5の整数価格を割る値（price = points / point_divisor）
+        pip_size: 1pipの価格幅
+        contract_size: 1ロットの通貨量
+        precision: 価格の表示桁数
+    """
+    symbol: str
+    point_divisor: int
+    pip_size: float
+    contract_size: int
+    precision: int
+
+    @property
+    def point_size(self) -> float:
+        return 1.0 / self.point_divisor
+
+    @property
+    def pip_multiplier(self) -> int:
+        """価格差をpipsに換算する係数（1 / pip_size）"""
+        return round(1.0 / self.pip_size)
+
+    def to_dict(self):
+        return {**asdict(self), "point_size": self.point_size, "pip_multiplier": self.pip_multiplier}
+
+
+STANDARD_LOT = 100000
+
+# 既知の銘柄（ここにない通貨ペアは決済通貨から推定する）
+INSTRUMENTS = {
+    "EURUSD": Instrument("EURUSD", 100000, 0.0001, STANDARD_LOT, 5),
+    "GBPUSD": Instrument("GBPUSD", 100000, 0.0001, STANDARD_LOT, 5),
+    "AUDUSD": Instrument("AUDUSD", 100000, 0.0001, STANDARD_LOT, 5),
+    "NZDUSD": Instrument("NZDUSD", 100000, 0.0001, STANDARD_LOT, 5),
+    "USDCAD": Instrument("USDCAD", 100000, 0.0001, STANDARD_LOT, 5),
+    "USDCHF": Instrument("USDCHF", 100000, 0.0001, STANDARD_LOT, 5),
+    "EURGBP": Instrument("EURGBP", 100000, 0.0001, STANDARD_LOT, 5),
+    "USDJPY": Instrument("USDJPY", 1000, 0.01, STANDARD_LOT, 3),
+    "EURJPY": Instrument("EURJPY", 1000, 0.01, STANDARD_LOT, 3),
+    "GBPJPY": Instrument("GBPJPY", 1000, 0.01, STANDARD_LOT, 3),
+    "AUDJPY": Instrument("AUDJPY", 1000, 0.01, STANDARD_LOT, 3),
+}
+
+
+@lru_cache(maxsize=None)
+def get_instrument(symbol: str) -> Instrument:
+    """
+    銘柄情報を取得（キャッシュ付き）
+
+    Args:
+        symbol: 通貨ペア（例: "USDJPY"）
+
+    Returns:
+        Instrument
+    """
+    symbol = symbol.upper()
+    if symbol in INSTRUMENTS:
+        return INSTRUMENTS[symbol]
+    # 未登録の通貨ペア: 決済通貨がJPYなら3桁、それ以外は5桁
+    if symbol.endswith("JPY"):
+        return Instrument(symbol, 1000, 0.01, STANDARD_LOT, 3)
+    return Instrument(symbol, 100000, 0.0001, STANDARD_LOT, 5)
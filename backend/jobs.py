@@ -0,0 +1,257 @@
+"""
+時間のかかるバックテストのジョブキュー
+
+投入したジョブはワーカープロセスのプールで順に実行し、区間ごとの進捗と途中までの
+損益曲線をキュー経由で受け取る。終わったジョブは状態（{id}.meta.json）と結果本体
+（{id}.json）を別の JSON ファイルとして保存し、サーバーを再起動しても取り出せる。
+起動時に読むのは小さい状態のファイルだけで、結果本体は取り出すときに読む。待機中のジョブは取り消し、実行中のジョブは
+次の区間の区切りで止める。
+
+ワーカーと共有するキューと取り消しの表は multiprocessing.Manager のもので、
+最初の投入時に起動する（spawn した子がこのモジュールを読み込んでも起動しない）。
+"""
+import json
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from work_pools import PoolBusy
+
+# 保存する状態ファイルの接尾辞（結果本体は {id}.json）
+META_SUFFIX = ".meta.json"
+
+# ジョブの状態（後ろ3つで終了）
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+def _run_job(runner, job_id, params, updates, cancelled):
+    """ワーカープロセスでジョブを実行（進捗は updates に送り、cancelled に入ったら止める）"""
+    # 待機中に取り消されたがプールの送り待ちに入っていて future.cancel() できなかったもの
+    if job_id in cancelled:
+        return None
+    updates.put((job_id, "start", None))
+
+    def report(done, total, equity):
+        updates.put((job_id, "progress", {"done": done, "total": total, "equity": equity}))
+        return job_id not in cancelled
+
+    return runner(**params, report=report)
+
+
+class Job:
+    def __init__(self, job_id: str, params: dict, created: float):
+        self.id = job_id
+        self.params = params
+        self.status = QUEUED
+        self.progress = {"done": 0, "total": None}
+        self.equity = []  # 途中までの損益曲線
+        self.error = None
+        self.created = created
+        self.started = None
+        self.finished = None
+        self.version = 0  # 状態が変わるたびに増える（SSE の送信判定用）
+        self.future = None
+
+    def summary(self, equity: bool = False):
+        """状態の dict（equity=True なら途中までの損益曲線も）"""
+        out = {
+            "id": self.id,
+            "status": self.status,
+            "params": self.params,
+            "progress": self.progress,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+        if equity:
+            out["equity"] = self.equity
+        return out
+
+
+class JobManager:
+    """
+    バックテストジョブの投入・進捗・取り消し・結果の保存
+
+    Args:
+        root: 状態と結果の JSON を置くディレクトリ
+        runner: ワーカーで実行する関数（engine.run_stepped）。report 引数で進捗を受け取る
+        workers: ジョブを並列に実行するプロセス数
+        max_queued: 終わっていないジョブの数の上限（超えたら PoolBusy）
+        max_stored: 保存しておく終了済みジョブの数の上限（古いものから削除）
+    """
+
+    def __init__(self, root: Path, runner, workers: int, max_queued: int, max_stored: int):
+        self.root = Path(root)
+        self.runner = runner
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_stored = max_stored
+        self._jobs = OrderedDict()  # id -> Job（投入順）
+        self._lock = threading.Lock()
+        self._executor = None
+        self._manager = None
+        self._updates = None
+        self._cancelled = None
+
+        # 保存済みのジョブは状態のファイルだけ読む（結果本体は取り出すときに読む）
+        self.root.mkdir(parents=True, exist_ok=True)
+        for path in sorted(self.root.glob(f"*{META_SUFFIX}"), key=lambda p: p.stat().st_mtime):
+            try:
+                saved = json.loads(path.read_text())
+            except ValueError:
+                continue
+            job = Job(saved["id"], saved["params"], saved["created"])
+            job.status, job.error = saved["status"], saved["error"]
+            job.progress, job.started, job.finished = saved["progress"], saved["started"], saved["finished"]
+            self._jobs[job.id] = job
+        # 状態を書く前に止まったジョブの結果本体は消す
+        for path in self.root.glob("*.json"):
+            if not path.name.endswith(META_SUFFIX) and path.stem not in self._jobs:
+                path.unlink(missing_ok=True)
+
+    def _start(self):
+        """ワーカープールと共有キューを起動（呼び出し側がロックを持つ）"""
+        if self._executor is not None:
+            return
+        ctx = multiprocessing.get_context("spawn")
+        self._manager = ctx.Manager()
+        self._updates = self._manager.Queue()
+        self._cancelled = self._manager.dict()
+        # Polars のスレッドプールは fork 後に使えないので spawn
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx)
+        threading.Thread(target=self._listen, args=(self._updates,), name="job-updates", daemon=True).start()
+
+    def submit(self, params: dict) -> Job:
+        """ジョブを投入（params は runner のキーワード引数）"""
+        with self._lock:
+            active = sum(1 for j in self._jobs.values() if j.status not in FINISHED)
+            if active >= self.max_queued:
+                raise PoolBusy(f"{active} jobs queued or running")
+            self._start()
+            job = Job(uuid.uuid4().hex, params, time.time())
+            self._jobs[job.id] = job
+            job.future = self._executor.submit(_run_job, self.runner, job.id, params, self._updates, self._cancelled)
+        job.future.add_done_callback(lambda f: self._finish(job, f))
+        return job
+
+    def _listen(self, updates):
+        """ワーカーからの開始・進捗の通知を反映"""
+        while True:
+            try:
+                job_id, kind, data = updates.get()
+            except (EOFError, OSError):
+                return
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job.status in FINISHED:
+                    continue
+                if kind == "start":
+                    job.status, job.started = RUNNING, time.time()
+                else:
+                    job.progress = {"done": data["done"], "total": data["total"]}
+                    job.equity = data["equity"]
+                job.version += 1
+
+    def _finish(self, job: Job, future):
+        """ジョブの終了（結果を保存して状態を確定）"""
+        result = None
+        if future.cancelled():
+            status = CANCELLED
+        elif future.exception() is not None:
+            status, job.error = FAILED, str(future.exception())
+        else:
+            result = future.result()
+            if result is None:
+                status = CANCELLED
+            elif "error" in result:
+                status, job.error = FAILED, result["error"]
+            else:
+                status = DONE
+
+        finished = time.time()
+        with self._lock:
+            saved = {**job.summary(), "status": status, "finished": finished}
+        # 状態を終了にするのは結果が読めるようになってから（状態のファイルも結果の後に書く）
+        if result is not None:
+            self._write(f"{job.id}.json", result)
+        self._write(f"{job.id}{META_SUFFIX}", saved)
+        with self._lock:
+            job.status, job.finished = status, finished
+            job.future = None
+            if self._cancelled is not None:
+                self._cancelled.pop(job.id, None)
+            job.version += 1
+            self._prune()
+
+    def _write(self, name: str, data):
+        """書きかけのファイルを読ませないように、一時ファイルに書いてから置き換える"""
+        tmp = self.root / f".{name}.tmp"
+        tmp.write_text(json.dumps(data))
+        tmp.replace(self.root / name)
+
+    def _prune(self):
+        """終了済みのジョブを max_stored 件まで減らす（古いものから、呼び出し側がロックを持つ）"""
+        finished = [j for j in self._jobs.values() if j.status in FINISHED]
+        for job in finished[:max(0, len(finished) - self.max_stored)]:
+            del self._jobs[job.id]
+            (self.root / f"{job.id}{META_SUFFIX}").unlink(missing_ok=True)
+            (self.root / f"{job.id}.json").unlink(missing_ok=True)
+
+    def cancel(self, job_id: str):
+        """
+        ジョブを取り消す（待機中ならすぐ、実行中なら次の区間の区切りで止まる）
+
+        Returns:
+            取り消しを受け付けたか（ないジョブは None、終了済みなら False）
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job.status in FINISHED:
+                return False
+            self._cancelled[job_id] = True
+            future = job.future
+        if future is not None:
+            future.cancel()
+        return True
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return [job.summary() for job in reversed(self._jobs.values())]
+
+    def result(self, job_id: str):
+        """保存した結果（終了していないか、結果なしで終わったなら None）"""
+        path = self.root / f"{job_id}.json"
+        if not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {"jobs": counts, "workers": self.workers, "max_queued": self.max_queued}
+
+    def shutdown(self):
+        with self._lock:
+            executor, manager = self._executor, self._manager
+            # 実行中のジョブは次の区切りで止める
+            for job in self._jobs.values():
+                if job.status not in FINISHED and self._cancelled is not None:
+                    self._cancelled[job.id] = True
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        if manager is not None:
+            manager.shutdown()
@@ -0,0 +1,213 @@
+"""
+月単位の列ブロックで1分足OHLCを保持するキャッシュ
+
+(symbol, tf, year, month) ごとに1ヶ月分の列（time: int64 epoch秒, open/high/low/close: float64）を
+保持し、任意の日付範囲リクエストをブロックの切り出しと連結で組み立てる。
+メモリ上限はバイト数で指定し、超えた分は最も古く使われたブロックから追い出す（LRU）。
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from bi5_reader import OHLC_COLUMNS, load_month_data_smart, month_signature
+from ohlc_format import epoch_seconds, PRICE_COLUMNS
+
+# カーソル読み出しで、足のない月がこれだけ続いたらデータの端とみなす
+CURSOR_MAX_EMPTY_MONTHS = 12
+
+
+def iter_months(start_dt: datetime, end_dt: datetime):
+    """start_dt〜end_dt に含まれる (year, month) を列挙（month は1-12）"""
+    year, month = start_dt.year, start_dt.month
+    while (year, month) <= (end_dt.year, end_dt.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def frame_to_block(df: pd.DataFrame):
+    """OHLCのDataFrameを列ブロック（numpy配列のdict）に変換"""
+    block = {'time': epoch_seconds(df['time'])}
+    for c in PRICE_COLUMNS:
+        block[c] = df[c].to_numpy(dtype=np.float64)
+    return block
+
+
+def block_nbytes(block) -> int:
+    """
+    ブロックがメモリ上に持つバイト数
+
+    メモリマップの配列（HotStore の列ファイルとそのビュー）はOSのページキャッシュに載るだけで
+    いつでも捨てられるので数えない（数えるとホットな月がメモリ上のブロックを追い出してしまう）。
+    そうしたブロックの数は HotStore の max_months で決まる（追い出された月は discard で外す）
+    """
+    return sum(arr.nbytes for arr in block.values() if not isinstance(arr, np.memmap))
+
+
+def blocks_to_frame(parts) -> pd.DataFrame:
+    """切り出した列ブロック群を1つのDataFrameに連結"""
+    if not parts:
+        return pd.DataFrame(columns=OHLC_COLUMNS)
+    df = pd.DataFrame({c: np.concatenate([p[c] for p in parts]) for c in PRICE_COLUMNS})
+    df.insert(0, 'time', pd.to_datetime(np.concatenate([p['time'] for p in parts]), unit='s', utc=True))
+    return df
+
+
+class OHLCBlockCache:
+    """
+    バイト数上限付きのLRUブロックキャッシュ
+
+    Args:
+        max_bytes: 保持するブロックの合計バイト数の上限
+        loader: (symbol, year, month, tf) -> DataFrame（1ヶ月分のOHLC）
+        signature: (symbol, year, month, tf) -> ソースファイルの変更検知用の値
+        hot_store: 読み込んだ月をメモリマップの列ファイルとして保持する HotStore（任意）。
+            あればキャッシュにない月はまずそこから開き、ソースを読んだ月はそこに書く。
+            HotStore が月を追い出したらその月のブロックも外す（ファイルを削除できるように）
+    """
+
+    def __init__(self, max_bytes: int, loader=load_month_data_smart, signature=month_signature, hot_store=None):
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self.signature = signature
+        self.hot_store = hot_store
+        self._blocks = OrderedDict()  # key -> (signature, block, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if hot_store is not None:
+            hot_store.add_evict_listener(self.discard)
+
+    def get_block(self, symbol: str, year: int, month: int, tf: int = 1):
+        key = (symbol, tf, year, month)
+        sig = self.signature(symbol, year, month, tf)
+
+        with self._lock:
+            entry = self._blocks.get(key)
+            if entry is not None and entry[0] == sig:
+                self._blocks.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # ファイル読み込みはロックの外で行う
+        block = self.hot_store.get(key, sig) if self.hot_store is not None else None
+        if block is None:
+            block = frame_to_block(self.loader(symbol, year, month, tf))
+            if self.hot_store is not None:
+                block = self.hot_store.put(key, sig, block)
+        self._store(key, sig, block)
+        return block
+
+    def _store(self, key, sig, block):
+        nbytes = block_nbytes(block)
+        mapped = any(isinstance(arr, np.memmap) for arr in block.values())
+        with self._lock:
+            old = self._blocks.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+            # 開いている間に HotStore から追い出された月は保持しない（discard と行き違った場合）
+            if mapped and not self.hot_store.holds(key):
+                return
+
+            # 上限を超えるブロックは保持しない
+            if nbytes > self.max_bytes:
+                return
+
+            while self._blocks and self._bytes + nbytes > self.max_bytes:
+                _, (_, _, evicted) = self._blocks.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+            self._blocks[key] = (sig, block, nbytes)
+            self._bytes += nbytes
+
+    def discard(self, key):
+        """(symbol, tf, year, month) のブロックがあれば外す"""
+        with self._lock:
+            old = self._blocks.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+    def get_range(self, symbol: str, start_date: str, end_date: str, tf: int = 1) -> pd.DataFrame:
+        """
+        日付範囲（終了日を含む）のOHLCをキャッシュ済みブロックから組み立て
+
+        Args:
+            tf: 時間足（分）
+
+        Returns:
+            pandas.DataFrame: 時刻順のOHLC（columns: time, open, high, low, close）
+        """
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d")
+        end_dt = datetime.strptime(end_date, "%Y-%m-%d")
+        start_ts = int(start_dt.replace(tzinfo=timezone.utc).timestamp())
+        end_ts = int((end_dt + timedelta(days=1)).replace(tzinfo=timezone.utc).timestamp())
+
+        parts = []
+        for year, month in iter_months(start_dt, end_dt):
+            block = self.get_block(symbol, year, month, tf)
+            lo, hi = np.searchsorted(block['time'], [start_ts, end_ts], side='left')
+            if hi > lo:
+                # numpyのスライスはビューなのでコピーは連結時の1回だけ
+                parts.append({c: arr[lo:hi] for c, arr in block.items()})
+
+        return blocks_to_frame(parts)
+
+    def get_adjacent(self, symbol: str, ts: int, limit: int, direction: int, tf: int = 1,
+                     max_empty_months: int = CURSOR_MAX_EMPTY_MONTHS) -> pd.DataFrame:
+        """
+        時刻 ts より前（direction < 0）または後（direction > 0）の足を最大 limit 本（ts の足は含まない）
+
+        ts の月から月ブロックを順にたどり、足のない月が max_empty_months ヶ月続いたら打ち切る
+
+        Args:
+            ts: カーソルの時刻（epoch秒）
+
+        Returns:
+            pandas.DataFrame: 時刻順のOHLC（columns: time, open, high, low, close）
+        """
+        dt = datetime.fromtimestamp(ts, tz=timezone.utc)
+        year, month = dt.year, dt.month
+        parts, have, empty = [], 0, 0
+        while have < limit and empty < max_empty_months:
+            block = self.get_block(symbol, year, month, tf)
+            if direction < 0:
+                hi = int(np.searchsorted(block['time'], ts, side='left'))
+                lo = max(0, hi - (limit - have))
+                year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+            else:
+                lo = int(np.searchsorted(block['time'], ts, side='right'))
+                hi = min(len(block['time']), lo + (limit - have))
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+            if hi > lo:
+                parts.append({c: arr[lo:hi] for c, arr in block.items()})
+                have += hi - lo
+                empty = 0
+            else:
+                empty += 1
+
+        if direction < 0:
+            parts.reverse()
+        return blocks_to_frame(parts)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "blocks": len(self._blocks),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+            self._bytes = 0
@@ -0,0 +1,69 @@
+"""
+/ohlc レスポンスのエンコーダ
+
+- json:   [{"time": "YYYY-MM-DDTHH:MM:SSZ", "open": ..., ...}, ...]（従来形式）
+- arrow:  Arrow IPC stream（time: int64 epoch秒, open/high/low/close: float64）
+- binary: リトルエンディアンの列バッファ
+          [uint32 本数][uint32 列数(=4)] + Int64 time[n] + Float64 open[n], high[n], low[n], close[n]
+          ヘッダが8バイトなので各列は8バイト境界に揃い、ブラウザ側で
+          BigInt64Array / Float64Array としてそのまま参照できる
+"""
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+BINARY_MEDIA_TYPE = "application/octet-stream"
+JSON_MEDIA_TYPE = "application/json"
+
+
+def epoch_seconds(times: pd.Series) -> np.ndarray:
+    """datetime列をint64のepoch秒に変換"""
+    times = pd.to_datetime(times, utc=True)
+    return ((times - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+
+
+def to_json_records(df: pd.DataFrame):
+    """従来のJSON形式（1本ごとのdict）"""
+    if df.empty:
+        return []
+    seconds = epoch_seconds(df['time']).astype('datetime64[s]')
+    times = np.char.add(np.datetime_as_string(seconds, unit='s'), 'Z').tolist()
+    prices = [df[c].to_numpy(dtype=np.float64).tolist() for c in PRICE_COLUMNS]
+    return [
+        {'time': t, 'open': o, 'high': h, 'low': l, 'close': c}
+        for t, o, h, l, c in zip(times, *prices)
+    ]
+
+
+def to_json_bytes(df: pd.DataFrame) -> bytes:
+    """JSON形式をシリアライズ済みのbytesで返す（FastAPIのjsonable_encoderを通さない）"""
+    return json.dumps(to_json_records(df)).encode()
+
+
+def to_arrow_ipc(df: pd.DataFrame) -> bytes:
+    """Arrow IPC stream形式"""
+    table = pa.table({
+        'time': pa.array(epoch_seconds(df['time']), type=pa.int64()),
+        **{c: pa.array(df[c].to_numpy(dtype=np.float64), type=pa.float64()) for c in PRICE_COLUMNS},
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def to_binary(df: pd.DataFrame) -> bytes:
+    """パックされた列バッファ形式"""
+    n = len(df)
+    parts = [
+        struct.pack('<II', n, len(PRICE_COLUMNS)),
+        epoch_seconds(df['time']).astype('<i8').tobytes(),
+    ]
+    parts.extend(df[c].to_numpy(dtype='<f8').tobytes() for c in PRICE_COLUMNS)
+    return b''.join(parts)
@@ -0,0 +1,106 @@
+"""
+ダッシュボード（MarketOverview）用の通貨ペアごとの概況
+
+最終値・前の足からの変化・時間足ごとのトレンドを全通貨ペアについてスレッドプールで
+並列に計算する。結果は使った月次ファイルのシグネチャと一緒に保持し、ファイルが
+更新されるまで使い回す。
+
+トレンドは swings.py のスイング（チャートのダウ理論のマーカーと同じもの）の直近4つから判定する。
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from ohlc_cache import iter_months
+from ohlc_format import epoch_seconds
+from swings import SWING_BARS, trend
+
+# 保持する概況の数の上限（通貨ペア × 期間 × 時間足の組み合わせ）
+OVERVIEW_CACHE_MAX_ENTRIES = 256
+
+
+class OverviewCache:
+    """
+    通貨ペアごとの概況のキャッシュ（OHLCBlockCache の上に載せる）
+
+    Args:
+        ohlc_cache: 価格の月ブロックを取得する OHLCBlockCache
+        swing_cache: スイングを取得する SwingBlockCache
+        workers: 通貨ペアを並列に計算するスレッド数
+    """
+
+    def __init__(self, ohlc_cache, swing_cache, workers: int):
+        self.ohlc_cache = ohlc_cache
+        self.swing_cache = swing_cache
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._entries = OrderedDict()  # key -> (シグネチャ, 概況)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _signature(self, symbol, start_date, end_date, timeframes):
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d")
+        end_dt = datetime.strptime(end_date, "%Y-%m-%d")
+        return tuple(
+            self.ohlc_cache.signature(symbol, year, month, tf)
+            for tf in timeframes
+            for year, month in iter_months(start_dt, end_dt)
+        )
+
+    def _bars(self, symbol, start_date, end_date, tf):
+        try:
+            return self.ohlc_cache.get_range(symbol, start_date, end_date, tf)
+        except FileNotFoundError:
+            return None
+
+    def compute(self, symbol: str, start_date: str, end_date: str, timeframes):
+        """
+        1通貨ペアの概況
+
+        Returns:
+            {"symbol", "time": 最後の足のepoch秒, "last", "prev", "change", "trends": {時間足: トレンド}}。
+            データがなければ time 以降は None
+        """
+        result = {"symbol": symbol, "time": None, "last": None, "prev": None, "change": None, "trends": {}}
+        bars = self._bars(symbol, start_date, end_date, min(timeframes))
+        if bars is not None and not bars.empty:
+            close = bars['close'].to_numpy(dtype=np.float64)
+            result["time"] = int(epoch_seconds(bars['time'].iloc[-1:])[0])
+            result["last"] = float(close[-1])
+            result["prev"] = float(close[-2]) if len(close) > 1 else None
+            result["change"] = result["last"] - result["prev"] if result["prev"] is not None else None
+        for tf in timeframes:
+            result["trends"][str(tf)] = trend(self.swing_cache.get_range(symbol, start_date, end_date, tf, SWING_BARS))
+        return result
+
+    def get(self, symbol: str, start_date: str, end_date: str, timeframes):
+        """概況（使った月次ファイルが更新されていなければキャッシュから）"""
+        key = (symbol, start_date, end_date, tuple(timeframes))
+        sig = self._signature(symbol, start_date, end_date, timeframes)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == sig:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # 計算はロックの外で行う
+        result = self.compute(symbol, start_date, end_date, timeframes)
+        with self._lock:
+            self._entries[key] = (sig, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > OVERVIEW_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+        return result
+
+    def get_many(self, symbols, start_date: str, end_date: str, timeframes):
+        """全通貨ペアの概況を並列に（symbols の順）"""
+        return list(self._pool.map(lambda s: self.get(s, start_date, end_date, timeframes), symbols))
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
@@ -4,9 +4,7 @@ import shutil
 from pathlib import Path
 import argparse
 import time
-import requests
 from datetime import datetime, timedelta, timezone
-import concurrent.futures
 from tqdm import tqdm
 import pandas as pd
 import subprocess
@@ -14,17 +12,15 @@ import subprocess
 # Add current dir to path to import sibling modules
 sys.path.append(str(Path(__file__).parent))
 
-# Import logic from other modules if possible, but for stability I might implement wrapper calls
-# or reimplement simple logic.
-# fast_downloader3 has good download logic.
+from fetch_engine import STATE_FILE_NAME, fetch_all, hour_task
 
 # Settings
 SCRIPT_DIR = Path(__file__).parent
 DATA_DIR = (SCRIPT_DIR / "../data").resolve()
 PARQUET_DIR = (SCRIPT_DIR / "../parquet_data").resolve()
 
-# Dukascopy API Template
-URL_TEMPLATE = "https://datafeed.dukascopy.com/datafeed/{pair}/{year}/{month:02d}/{day:02d}/{hour:02d}h_ticks.bi5"
+# Pooled connections for the async fetch engine (per-host concurrency adapts to 503s)
+MAX_CONNECTIONS = 20
 
 def get_existing_pairs():
     if not PARQUET_DIR.exists():
@@ -124,7 +120,7 @@ def download_month_bi5(pair, year, month):
             # Check if bi5 exists?
             filename = save_dir / f"{h:02d}h_ticks.bi5"
             if not filename.exists() or filename.stat().st_size == 0:
-                tasks.append((pair, current_date, h, save_dir))
+                tasks.append(hour_task(pair, current_date, h, save_dir))
         
         current_date += timedelta(days=1)
         
@@ -133,38 +129,11 @@ def download_month_bi5(pair, year, month):
         
     print(f"Downloading {len(tasks)} files for {pair} {year}-{month:02d}...")
     
-    with concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
-        futures = {executor.submit(do_download, t): t for t in tasks}
-        for future in concurrent.futures.as_completed(futures):
-            # Just consume
-            pass
+    # The state file lets an interrupted repair skip hours already fetched or known to be 404
+    fetch_all(tasks, state_file=DATA_DIR / STATE_FILE_NAME, max_connections=MAX_CONNECTIONS)
             
     return True
 
-def do_download(args):
-    pair, date, hour, save_dir = args
-    year = date.year
-    month = date.month - 1 # 0-indexed for URL
-    day = date.day
-    
-    url = URL_TEMPLATE.format(pair=pair, year=year, month=month, day=day, hour=hour)
-    filename = save_dir / f"{hour:02d}h_ticks.bi5"
-    
-    # Retry loop
-    for _ in range(3):
-        try:
-            res = requests.get(url, timeout=10)
-            if res.status_code == 200:
-                filename.parent.mkdir(parents=True, exist_ok=True)
-                with open(filename, "wb") as f:
-                    f.write(res.content)
-                return True
-            elif res.status_code == 404:
-                return False # Not found
-        except:
-            time.sleep(1)
-    return False
-
 def process_missing_month(pair, year, month):
     print(f"Repairing {pair} {year} Month {month}...")
     
@@ -178,7 +147,7 @@ def process_missing_month(pair, year, month):
     # It doesn't accept date range.
     # But I can use bi5_reader to load DF then save to parquet manually here.
     
-    from bi5_reader import load_day_data
+    from bi5_reader import load_day_data, write_monthly_parquet
     
     month_start = datetime(year, month + 1, 1)
     if month == 11:
@@ -208,14 +177,13 @@ def process_missing_month(pair, year, month):
         
     # 3. Aggregate
     monthly_df = pd.concat(dfs)
-    monthly_df = monthly_df.sort_index()
     
     # Save
     output_dir = PARQUET_DIR / pair / str(year)
     output_dir.mkdir(parents=True, exist_ok=True)
     output_file = output_dir / f"{month:02d}.parquet"
     
-    monthly_df.to_parquet(output_file, compression='zstd')
+    write_monthly_parquet(monthly_df, output_file)
     print(f"Fixed: {output_file}")
     
     # 4. Cleanup bi5
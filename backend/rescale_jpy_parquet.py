@@ -0,0 +1,87 @@
+"""
+JPYクロスの既存Parquetの価格スケールを修正するスクリプト（1回だけ実行）
+
+以前のデコーダは全銘柄の価格を 100000 で割っていたため、ポイントが 0.001 の
+JPYクロスは 1/100 の値（USDJPY 155.686 -> 1.55686）で保存されている。
+instruments.py の point_divisor に合わせて OHLC（と spread）を掛け直す。
+
+修正済みかどうかは価格の大きさで判定するので、何度実行しても二重には掛からない。
+対象: parquet_data/{pair}/ 以下の月次・日次ファイルと .tf の上位時間足
+
+使用方法:
+    python rescale_jpy_parquet.py            # 確認のみ（件数を表示）
+    python rescale_jpy_parquet.py --apply    # 書き換える
+"""
+import argparse
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from bi5_reader import DEFAULT_POINT_DIVISOR, PARQUET_DIR, TF_DIR
+from instruments import get_instrument
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+
+# 正しいスケールのJPYクロスはこれより十分大きい（誤ったスケールでは 0.5〜3 程度）
+MIN_JPY_PRICE = 20.0
+
+
+def get_all_pairs():
+    """parquet_dataディレクトリ配下のサブディレクトリをスキャンして通貨ペアリストを取得"""
+    if not PARQUET_DIR.exists():
+        return []
+    return [d.name for d in PARQUET_DIR.iterdir() if d.is_dir() and not d.name.startswith('.')]
+
+
+def rescale_file(path, instrument, apply):
+    """
+    1ファイルを修正（既に正しいスケールならそのまま）
+
+    Returns:
+        bool: 修正が必要だったか
+    """
+    table = pq.read_table(path)
+    close = table.column('close').to_numpy()
+    if len(close) == 0 or np.nanmedian(close) >= MIN_JPY_PRICE:
+        return False
+    if not apply:
+        return True
+
+    factor = pa.scalar(float(DEFAULT_POINT_DIVISOR // instrument.point_divisor))
+    for name in PRICE_COLUMNS + ['spread']:
+        if name in table.column_names:
+            scaled = pc.multiply(table.column(name), factor)
+            # OHLCは元の整数ポイント値に戻るよう表示桁数で丸める（spreadは平均値なので丸めない）
+            if name in PRICE_COLUMNS:
+                scaled = pc.round(scaled, ndigits=instrument.precision)
+            table = table.set_column(table.column_names.index(name), name, scaled)
+
+    row_group_size = pq.ParquetFile(path).metadata.row_group(0).num_rows
+    tmp = path.with_name(path.name + '.part')
+    pq.write_table(table, tmp, compression='zstd', row_group_size=row_group_size)
+    os.replace(tmp, path)
+    return True
+
+
+def process_pair(pair, apply):
+    instrument = get_instrument(pair)
+    if instrument.point_divisor == DEFAULT_POINT_DIVISOR:
+        return 0
+    files = sorted((PARQUET_DIR / pair).rglob('*.parquet'))
+    files += sorted(f for tf_dir in TF_DIR.glob('*') for f in (tf_dir / pair).rglob('*.parquet'))
+    count = sum(rescale_file(f, instrument, apply) for f in files)
+    factor = DEFAULT_POINT_DIVISOR // instrument.point_divisor
+    print(f"{pair}: {count}/{len(files)} files {'rescaled' if apply else 'need rescaling'} (x{factor})")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fix the price scale of JPY pair parquet files")
+    parser.add_argument("--apply", action="store_true", help="Rewrite the files (default: report only)")
+    args = parser.parse_args()
+
+    for pair in get_all_pairs():
+        process_pair(pair, args.apply)
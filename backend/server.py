@@ -1,49 +1,116 @@
-from fastapi import FastAPI, Query
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from pathlib import Path
-from bi5_reader import load_day_data_smart, load_date_range_data_smart, DATA_DIR, PARQUET_DIR
+import numpy as np
+import pandas as pd
+from bi5_reader import DATA_DIR, PARQUET_DIR, OHLC_COLUMNS, TIMEFRAMES
+from ohlc_cache import OHLCBlockCache
+from hot_store import HotStore
+from indicator_cache import IndicatorBlockCache
+from overview import OverviewCache
+from swings import SWING_BARS, SwingBlockCache
+from work_pools import PoolBusy, process_pool, thread_pool
+from ohlc_format import to_json_bytes, to_arrow_ipc, to_binary, ARROW_MEDIA_TYPE, BINARY_MEDIA_TYPE, JSON_MEDIA_TYPE
 import sys
 sys.path.append("../engine")
-from engine import run_backtest
+from engine import run_backtest, run_portfolio, run_stepped, run_strategy, run_sweep, run_walk_forward
+from jobs import FINISHED, JobManager
+import asyncio
 from pydantic import BaseModel
 from typing import Optional, List
-from functools import lru_cache
 import json
 import os
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    # Created on startup (not at import) so importing the module neither reads nor creates JOB_RESULTS_DIR
+    global job_manager
+    job_manager = JobManager(JOB_RESULTS_DIR, run_stepped, JOB_WORKERS, JOB_MAX_QUEUED, JOB_MAX_STORED)
+    yield
+    io_pool.shutdown()
+    lab_pool.shutdown()
+    job_manager.shutdown()
 
-# Cache for OHLC data - stores up to 1000 unique requests
-@lru_cache(maxsize=1000)
-def get_cached_ohlc(symbol: str, start_date: str, end_date: str):
-    """Cached version of OHLC data loading (Parquet-first with bi5 fallback)"""
+app = FastAPI(lifespan=lifespan)
+
+# Cache for OHLC data - monthly column blocks bounded by a byte budget
+OHLC_CACHE_MAX_BYTES = int(os.environ.get("OHLC_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+# Optional hot tier: recently used months as uncompressed memory-mapped column files (set HOT_STORE_DIR to enable)
+HOT_STORE_DIR = os.environ.get("HOT_STORE_DIR")
+HOT_STORE_MAX_MONTHS = int(os.environ.get("HOT_STORE_MAX_MONTHS", 48))
+hot_store = HotStore(Path(HOT_STORE_DIR), HOT_STORE_MAX_MONTHS) if HOT_STORE_DIR else None
+ohlc_cache = OHLCBlockCache(OHLC_CACHE_MAX_BYTES, hot_store=hot_store)
+# Upper bound of bars per /ohlc/cursor page
+CURSOR_MAX_BARS = 20000
+
+# Indicator columns per (symbol, tf, indicator, month), computed from the OHLC blocks above
+INDICATOR_CACHE_MAX_BYTES = int(os.environ.get("INDICATOR_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+indicator_cache = IndicatorBlockCache(ohlc_cache, INDICATOR_CACHE_MAX_BYTES)
+# Swing candidates per (symbol, tf, p, month), used by the chart markers and the dashboard trends
+SWING_CACHE_MAX_BYTES = int(os.environ.get("SWING_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+swing_cache = SwingBlockCache(ohlc_cache, SWING_CACHE_MAX_BYTES)
+# Dashboard summaries per (symbol, range, timeframes), computed for all symbols in parallel
+OVERVIEW_WORKERS = 8
+OVERVIEW_TIMEFRAMES = [1, 5, 15, 60, 240]
+overview_cache = OverviewCache(ohlc_cache, swing_cache, OVERVIEW_WORKERS)
+# Decimals of /indicators values (MACD of 5-digit pairs is around 1e-5)
+INDICATOR_DIGITS = 10
+
+# Chart and dashboard work (cache lookups, Parquet reads) runs on its own thread pool,
+# backtests in worker processes, so a long /lab run never holds up chart requests.
+# Identical concurrent requests share one computation; a full queue answers 503.
+IO_WORKERS = int(os.environ.get("IO_WORKERS", 16))
+IO_MAX_PENDING = 256
+LAB_WORKERS = int(os.environ.get("LAB_WORKERS", max(1, (os.cpu_count() or 1) - 1)))
+LAB_MAX_PENDING = LAB_WORKERS * 4
+io_pool = thread_pool(IO_WORKERS, IO_MAX_PENDING)
+lab_pool = process_pool(LAB_WORKERS, LAB_MAX_PENDING)
+
+# Background backtest jobs (/jobs): own worker processes, state and results kept as JSON files
+JOB_RESULTS_DIR = Path(os.environ.get("JOB_RESULTS_DIR", "../job_results"))
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", LAB_WORKERS))
+JOB_MAX_QUEUED = 32
+JOB_MAX_STORED = 200
+# Seconds between job state checks of /jobs/{id}/events
+JOB_EVENT_INTERVAL = 0.25
+job_manager = None  # JobManager, created in lifespan
+
+def get_cached_ohlc(symbol: str, start_date: str, end_date: str, tf: int = 1):
+    """OHLC range assembled from cached monthly blocks (pre-aggregated timeframe, Parquet, then bi5)"""
     try:
-        if start_date == end_date:
-            ohlc = load_day_data_smart(symbol, start_date)
-        else:
-            ohlc = load_date_range_data_smart(symbol, start_date, end_date)
-        
-        result = []
-        for _, row in ohlc.iterrows():
-            result.append({
-                "time": row['time'].strftime("%Y-%m-%dT%H:%M:%SZ"),
-                "open": float(row['open']),
-                "high": float(row['high']),
-                "low": float(row['low']),
-                "close": float(row['close'])
-            })
-        return result
+        return ohlc_cache.get_range(symbol, start_date, end_date, tf)
     except FileNotFoundError:
-        return []
+        return pd.DataFrame(columns=OHLC_COLUMNS)
     except Exception as e:
         print(f"Error: {e}")
-        return []
+        return pd.DataFrame(columns=OHLC_COLUMNS)
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    """OHLCブロックキャッシュ（とホットストア）のヒット/ミス/追い出し回数"""
+    stats = ohlc_cache.stats()
+    if hot_store is not None:
+        stats["hot_store"] = hot_store.stats()
+    return stats
+
+@app.get("/pools/stats")
+def get_pool_stats():
+    """I/Oスレッドプールとバックテスト用プロセスプールの待ち行列・合流・拒否の回数"""
+    return {"io": io_pool.stats(), "lab": lab_pool.stats()}
+
+@app.exception_handler(PoolBusy)
+async def pool_busy_handler(request, exc):
+    return JSONResponse(status_code=503, content={"detail": f"Server busy: {exc}"}, headers={"Retry-After": "1"})
 
 @app.get("/symbols")
 def get_symbols():
     """利用可能な通貨ペアのリストを取得"""
+    return list_symbols()
+
+def list_symbols():
     symbols = set()
     
     # 既存のデータディレクトリをスキャン
@@ -66,34 +133,316 @@ app.add_middleware(
 )
 
 @app.get("/ohlc")
-def get_ohlc(
+async def get_ohlc(
     start_date: Optional[str] = Query(None, description="開始日 (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="終了日 (YYYY-MM-DD)"),
-    symbol: str = Query("EURUSD", description="通貨ペア")
+    symbol: str = Query("EURUSD", description="通貨ペア"),
+    tf: int = Query(1, description="時間足（分）: 1, 5, 15, 60, 240, 1440"),
+    fmt: str = Query("json", alias="format", description="レスポンス形式 (json / arrow / binary)")
 ):
     if start_date is None:
         start_date = "2020-01-01"
     if end_date is None:
         end_date = start_date
+    if tf != 1 and tf not in TIMEFRAMES:
+        raise HTTPException(status_code=400, detail=f"Unsupported timeframe: {tf}")
     
     # Use cached version for instant response
-    return get_cached_ohlc(symbol, start_date, end_date)
+    return await io_pool.run_once(("ohlc", symbol, start_date, end_date, tf, fmt),
+                                  ohlc_response, symbol, start_date, end_date, tf, fmt)
+
+def ohlc_response(symbol: str, start_date: str, end_date: str, tf: int, fmt: str):
+    return encode_ohlc(get_cached_ohlc(symbol, start_date, end_date, tf), fmt)
+
+@app.get("/ohlc/cursor")
+async def get_ohlc_cursor(
+    symbol: str = Query("EURUSD", description="通貨ペア"),
+    tf: int = Query(1, description="時間足（分）: 1, 5, 15, 60, 240, 1440"),
+    before: Optional[int] = Query(None, description="この時刻（epoch秒）より前の足"),
+    after: Optional[int] = Query(None, description="この時刻（epoch秒）より後の足"),
+    limit: int = Query(1000, description="本数"),
+    fmt: str = Query("json", alias="format", description="レスポンス形式 (json / arrow / binary)")
+):
+    """before の直前、または after の直後の limit 本（スクロールでの追加読み込み用）"""
+    if (before is None) == (after is None):
+        raise HTTPException(status_code=400, detail="Specify exactly one of before / after")
+    if not 1 <= limit <= CURSOR_MAX_BARS:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {CURSOR_MAX_BARS}")
+    if tf != 1 and tf not in TIMEFRAMES:
+        raise HTTPException(status_code=400, detail=f"Unsupported timeframe: {tf}")
+    ts, direction = (before, -1) if before is not None else (after, 1)
+    return await io_pool.run_once(("cursor", symbol, tf, ts, direction, limit, fmt),
+                                  cursor_response, symbol, tf, ts, direction, limit, fmt)
+
+def cursor_response(symbol: str, tf: int, ts: int, direction: int, limit: int, fmt: str):
+    try:
+        ohlc = ohlc_cache.get_adjacent(symbol, ts, limit, direction, tf)
+    except FileNotFoundError:
+        ohlc = pd.DataFrame(columns=OHLC_COLUMNS)
+    return encode_ohlc(ohlc, fmt)
+
+@app.get("/overview")
+async def get_overview(
+    start_date: str = Query(..., description="開始日 (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="終了日 (YYYY-MM-DD)"),
+    symbols: Optional[List[str]] = Query(None, description="通貨ペア（省略時は全て）"),
+    tf: Optional[List[int]] = Query(None, description="トレンドを判定する時間足（分）。複数指定可")
+):
+    """
+    ダッシュボード用の全通貨ペアの概況（最終値・変化・時間足ごとのトレンド）
+
+    [{"symbol", "time", "last", "prev", "change", "trends": {"1": "UP", "5": "FLAT", ...}}, ...]
+    """
+    if end_date is None:
+        end_date = start_date
+    timeframes = tf or OVERVIEW_TIMEFRAMES
+    for t in timeframes:
+        if t != 1 and t not in TIMEFRAMES:
+            raise HTTPException(status_code=400, detail=f"Unsupported timeframe: {t}")
+    symbols = symbols or list_symbols()
+    try:
+        return await io_pool.run_once(("overview", tuple(symbols), start_date, end_date, tuple(timeframes)),
+                                      overview_cache.get_many, symbols, start_date, end_date, timeframes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/overview/stats")
+def get_overview_cache_stats():
+    """概況キャッシュのヒット/ミス回数"""
+    return overview_cache.stats()
+
+@app.get("/swings")
+async def get_swings(
+    start_date: str = Query(..., description="開始日 (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="終了日 (YYYY-MM-DD)"),
+    symbol: str = Query("EURUSD", description="通貨ペア"),
+    tf: int = Query(1, description="時間足（分）"),
+    p: int = Query(SWING_BARS, description="スイングの判定に使う前後の本数")
+):
+    """
+    ダウ理論のスイング（チャートのマーカー用、列形式）
+
+    {"time": [epoch秒...], "value": [...], "type": [1 高値 / -1 安値...], "label": ["HH", "HL", ...]}
+    """
+    if end_date is None:
+        end_date = start_date
+    if tf != 1 and tf not in TIMEFRAMES:
+        raise HTTPException(status_code=400, detail=f"Unsupported timeframe: {tf}")
+    if p < 1:
+        raise HTTPException(status_code=400, detail="p must be at least 1")
+    try:
+        return await io_pool.run_once(("swings", symbol, start_date, end_date, tf, p),
+                                      swing_cache.get_range, symbol, start_date, end_date, tf, p)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/swings/stats")
+def get_swing_cache_stats():
+    """スイングブロックキャッシュのヒット/ミス/追い出し回数"""
+    return swing_cache.stats()
+
+@app.get("/indicators")
+async def get_indicators(
+    start_date: str = Query(..., description="開始日 (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="終了日 (YYYY-MM-DD)"),
+    symbol: str = Query("EURUSD", description="通貨ペア"),
+    tf: int = Query(1, description="時間足（分）"),
+    ind: List[str] = Query(..., description="インジケーター（例: sma:20, bb:20:2, rsi:14, macd:12:26:9）。複数指定可")
+):
+    """
+    /ohlc と同じ足に対するインジケーター（列形式）
+
+    {"time": [epoch秒...], "series": {"sma:20": [値 or null...], "bb:20:2.upper": [...], ...}}
+    """
+    if end_date is None:
+        end_date = start_date
+    if tf != 1 and tf not in TIMEFRAMES:
+        raise HTTPException(status_code=400, detail=f"Unsupported timeframe: {tf}")
+    try:
+        return await io_pool.run_once(("indicators", symbol, start_date, end_date, tf, tuple(ind)),
+                                      indicators_response, symbol, start_date, end_date, tf, ind)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def indicators_response(symbol: str, start_date: str, end_date: str, tf: int, ind: List[str]):
+    times, series = indicator_cache.get_range(symbol, start_date, end_date, tf, ind)
+    body = {
+        "time": times.tolist(),
+        "series": {
+            name: np.where(np.isnan(values), None, np.round(values, INDICATOR_DIGITS)).tolist()
+            for name, values in series.items()
+        },
+    }
+    return Response(content=json.dumps(body).encode(), media_type=JSON_MEDIA_TYPE)
+
+@app.get("/indicators/stats")
+def get_indicator_cache_stats():
+    """インジケーターブロックキャッシュのヒット/ミス/追い出し回数"""
+    return indicator_cache.stats()
+
+def encode_ohlc(ohlc, fmt: str):
+    """Encode an OHLC frame in the requested /ohlc response format"""
+    if fmt == "arrow":
+        return Response(content=to_arrow_ipc(ohlc), media_type=ARROW_MEDIA_TYPE)
+    if fmt == "binary":
+        return Response(content=to_binary(ohlc), media_type=BINARY_MEDIA_TYPE)
+    return Response(content=to_json_bytes(ohlc), media_type=JSON_MEDIA_TYPE)
 
 class LabRequest(BaseModel):
     symbol: str
     start: str
     end: str
-    fast: int
-    slow: int
+    fast: int = 20
+    slow: int = 50
+    # JSON strategy spec (engine/strategy.py); replaces the fast/slow SMA crossover when given
+    strategy: Optional[dict] = None
+    # Downsample equity/indicators to at most this many points (trades and stats stay exact)
+    max_points: Optional[int] = None
+    # Simulate positions with the Rust extension (fxlab_engine); opt-in, NumPy otherwise
+    native: bool = False
 
 @app.post("/lab/run")
-def run_lab_strategy(req: LabRequest):
+async def run_lab_strategy(req: LabRequest):
+    if req.max_points is not None and req.max_points < 3:
+        raise HTTPException(status_code=400, detail="max_points must be at least 3")
+    key = ("run", req.model_dump_json())
+    if req.strategy is not None:
+        return await lab_pool.run_once(key, run_strategy, req.symbol, req.start, req.end, req.strategy, req.max_points)
     # Execute the Polars engine
     # In a real "AI" scenario, we would parse natural language here.
     # For now, we use the explicitly extracted params.
-    result = run_backtest(req.symbol, req.start, req.end, req.fast, req.slow)
+    return await lab_pool.run_once(key, run_backtest, req.symbol, req.start, req.end,
+                                   req.fast, req.slow, req.max_points, req.native)
+
+class SweepRequest(BaseModel):
+    symbol: str
+    start: str
+    end: str
+    fast: List[int]
+    slow: List[int]
+    sort_by: str = "total_pnl_pips"
+    top: Optional[int] = None
+
+@app.post("/lab/sweep")
+async def run_lab_sweep(req: SweepRequest):
+    # Grid of (fast, slow) pairs evaluated on a single price load, ranked by sort_by
+    return await lab_pool.run_once(("sweep", req.model_dump_json()), run_sweep,
+                                   req.symbol, req.start, req.end, req.fast, req.slow, req.sort_by, req.top)
+
+class WalkForwardRequest(BaseModel):
+    symbol: str
+    start: str
+    end: str
+    fast: List[int]
+    slow: List[int]
+    in_sample_days: int = 60
+    out_sample_days: int = 20
+    objective: str = "total_pnl_pips"
+    max_points: Optional[int] = None
+
+@app.post("/lab/walkforward")
+async def run_lab_walk_forward(req: WalkForwardRequest):
+    # Optimize fast/slow on each in-sample window, trade the winner on the following out-of-sample window
+    if req.in_sample_days < 1 or req.out_sample_days < 1:
+        raise HTTPException(status_code=400, detail="in_sample_days and out_sample_days must be at least 1")
+    if req.max_points is not None and req.max_points < 3:
+        raise HTTPException(status_code=400, detail="max_points must be at least 3")
+    return await lab_pool.run_once(("walkforward", req.model_dump_json()), run_walk_forward,
+                                   req.symbol, req.start, req.end, req.fast, req.slow,
+                                   req.in_sample_days, req.out_sample_days, req.objective, req.max_points)
+
+class PortfolioRequest(BaseModel):
+    symbols: List[str]
+    start: str
+    end: str
+    fast: int
+    slow: int
+    max_points: Optional[int] = None
+
+@app.post("/lab/portfolio")
+async def run_lab_portfolio(req: PortfolioRequest):
+    # Same strategy on every symbol in parallel; per-symbol and combined equity on one time axis
+    if not req.symbols:
+        raise HTTPException(status_code=400, detail="symbols must not be empty")
+    if req.max_points is not None and req.max_points < 3:
+        raise HTTPException(status_code=400, detail="max_points must be at least 3")
+    return await lab_pool.run_once(("portfolio", req.model_dump_json()), run_portfolio,
+                                   req.symbols, req.start, req.end, req.fast, req.slow, req.max_points)
+
+@app.post("/jobs")
+def submit_job(req: LabRequest):
+    """/lab/run と同じ内容をバックグラウンドのジョブとして投入（進捗は /jobs/{id} か /jobs/{id}/events）"""
+    if req.max_points is not None and req.max_points < 3:
+        raise HTTPException(status_code=400, detail="max_points must be at least 3")
+    params = {"symbol": req.symbol, "start_date": req.start, "end_date": req.end, "max_points": req.max_points}
+    if req.strategy is not None:
+        params["spec"] = req.strategy
+    else:
+        params.update(fast_sma=req.fast, slow_sma=req.slow, native=req.native)
+    return job_manager.submit(params).summary()
+
+@app.get("/jobs")
+def list_jobs():
+    """ジョブの一覧（新しい順）"""
+    return job_manager.list()
+
+@app.get("/jobs/stats")
+def get_job_stats():
+    """状態ごとのジョブ数"""
+    return job_manager.stats()
+
+def find_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """状態・進捗（区間数）・途中までの損益曲線"""
+    return find_job(job_id).summary(equity=True)
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    """終了したジョブの結果（/lab/run と同じ形式）"""
+    job = find_job(job_id)
+    if job.status not in FINISHED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    result = job_manager.result(job_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Job was {job.status} without a result")
     return result
 
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    """待機中ならすぐ、実行中なら次の区間の区切りで止める"""
+    find_job(job_id)
+    job_manager.cancel(job_id)
+    return job_manager.get(job_id).summary()
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Server-Sent Events で状態の変化を送る
+
+    状態が変わるたびに "progress"（summary と途中までの損益曲線）、終了したら "done" を送って閉じる
+    """
+    job = find_job(job_id)
+
+    async def events():
+        version = None
+        while True:
+            if job.version != version:
+                version = job.version
+                summary = job.summary(equity=True)
+                kind = "done" if summary["status"] in FINISHED else "progress"
+                yield f"event: {kind}\ndata: {json.dumps(summary)}\n\n"
+                if kind == "done":
+                    return
+            await asyncio.sleep(JOB_EVENT_INTERVAL)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 # --- Serve Frontend ---
 app.mount("/static", StaticFiles(directory="../frontend"), name="static")
 
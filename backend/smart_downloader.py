@@ -1,89 +1,43 @@
 
 import os
-import requests
-import struct
 import lzma
 import pandas as pd
-import concurrent.futures
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
 from tqdm import tqdm
-import time
+
+from bi5_reader import decode_bi5
+from fetch_engine import fetch_all, hour_task
+from instruments import get_instrument
 
 # Options
 PAIRS = ["EURUSD", "USDJPY", "GBPUSD", "EURJPY", "EURGBP"]
 START_YEAR = 2000
 END_YEAR = 2025
 PARQUET_DIR = Path("../parquet_data")
-MAX_WORKERS = 6 # Golden ratio: 4-8
-BASE_URL = "https://datafeed.dukascopy.com/datafeed"
+MAX_CONNECTIONS = 6 # Golden ratio: 4-8
 
-def parse_bi5(compressed_data, base_timestamp_ms):
+def parse_bi5(compressed_data, base_timestamp_ms, point_divisor):
     if not compressed_data:
-        return []
+        return None
     try:
         decompressed_data = lzma.decompress(compressed_data)
     except:
-        return []
-
-    ticks = []
-    offset = 0
-    # struct format: >iiiff (Big-endian: int, int, int, float, float)
-    # 20 bytes per record
-    record_size = 20
-    num_records = len(decompressed_data) // record_size
+        return None
 
-    for _ in range(num_records):
-        time_delta, ask, bid, ask_vol, bid_vol = struct.unpack('>iiiff', decompressed_data[offset:offset+20])
-        timestamp = base_timestamp_ms + time_delta
-        # Price scaling
-        price = bid / 100000.0
-        ticks.append((timestamp, price))
-        offset += 20
-        
-    return ticks
+    # Vectorized decode shared with bi5_reader (20 bytes per record)
+    return decode_bi5(decompressed_data, base_timestamp_ms, point_divisor)
 
-def process_day(args):
-    pair, date_str, session = args
-    
-    dt = datetime.strptime(date_str, "%Y-%m-%d")
-    year = dt.year
-    month = dt.month - 1
-    day = dt.day
-    
-    # Target Parquet File
-    save_path = PARQUET_DIR / pair / str(year) / f"{month:02d}" / f"{day:02d}.parquet"
-    if save_path.exists():
-        return 'skipped'
+def day_parquet_path(pair, dt):
+    return PARQUET_DIR / pair / str(dt.year) / f"{dt.month - 1:02d}" / f"{dt.day:02d}.parquet"
 
-    all_ticks = []
-    
-    # Download 24h
-    for hour in range(24):
-        url = f"{BASE_URL}/{pair}/{year}/{month:02d}/{day:02d}/{hour:02d}h_ticks.bi5"
-        
-        try:
-            resp = session.get(url, timeout=5)
-            if resp.status_code == 200:
-                # Calculate base timestamp for this hour
-                base_dt = datetime(year, month + 1, day, hour, 0, 0, tzinfo=timezone.utc)
-                base_ts = int(base_dt.timestamp() * 1000)
-                
-                ticks = parse_bi5(resp.content, base_ts)
-                all_ticks.extend(ticks)
-            elif resp.status_code == 404:
-                pass # No data
-            else:
-                pass # potentially retry?
-        except Exception as e:
-            # print(f"Err {url}: {e}")
-            pass
-            
+def save_day(pair, dt, all_ticks):
+    """Resample one day of downloaded ticks to 1min OHLC and save it as daily Parquet"""
     if not all_ticks:
         return 'empty'
         
     # Convert to DataFrame
-    df = pd.DataFrame(all_ticks, columns=['timestamp', 'price'])
+    df = pd.concat(all_ticks, ignore_index=True)
     
     # Optimize conversion
     df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms', utc=True)
@@ -98,73 +52,59 @@ def process_day(args):
         return 'empty'
         
     # Save to Parquet
+    save_path = day_parquet_path(pair, dt)
     save_path.parent.mkdir(parents=True, exist_ok=True)
     ohlc.to_parquet(save_path, engine='pyarrow', compression='snappy')
     
     return 'done'
 
-def main():
-    if not PARQUET_DIR.exists():
-        PARQUET_DIR.mkdir()
+def run(days):
+    """
+    Download the 24 hours of every (pair, datetime) day in memory on the shared fetch
+    engine and write each day as soon as its last hour arrives.
+    """
+    pending = {}
+    owners = {}
+    results = {'done': 0, 'empty': 0, 'incomplete': 0}
 
-    # Create task queue (Recent first)
-    tasks = []
-    print("Generating task list...")
-    
-    # Priority: Year Descending, Pair
-    for year in range(END_YEAR, START_YEAR - 1, -1):
-        for pair in PAIRS:
-            start_date = datetime(year, 1, 1)
-            end_date = datetime(year, 12, 31)
-            current = start_date
-            while current <= end_date:
-                # Limit to today
-                if current > datetime.now():
-                    break
-                tasks.append((pair, current.strftime("%Y-%m-%d")))
-                current += timedelta(days=1)
+    def tasks():
+        for pair, dt in days:
+            pending[(pair, dt)] = {'left': 24, 'ticks': [], 'failed': False}
+            for hour in range(24):
+                task = hour_task(pair, dt, hour)
+                owners[task.url] = (pair, dt, hour)
+                yield task
 
-    print(f"Total Daily Tasks: {len(tasks)}")
-    
-    # Use a session per thread? 
-    # Actually, we can pass a session created inside the thread initializer, 
-    # but concurrent.futures doesn't support initializers easily for ThreadPoolExecutor in the args way easily.
-    # Simpler: Create session inside the worker or pass one? 
-    # Passing session across threads is not thread-safe for requests.Session object usually? 
-    # Documentation says Session is not thread-safe.
-    # So we should create a session local to the thread.
-    # We will use a custom worker function that creates a session.
-    
-    # However, for simplicity with Executor, I'll instantiate a session per batch or just standard requests? 
-    # User said "Keep-alive". Session provides that. 
-    # Let's use `thread_local` storage for sessions.
-    
-    pass
+    def on_result(task, status, content):
+        pair, dt, hour = owners.pop(task.url)
+        entry = pending[(pair, dt)]
 
-# Thread Local Session
-import threading
-thread_local = threading.local()
+        if content is not None:
+            # Calculate base timestamp for this hour
+            base_dt = dt.replace(hour=hour, tzinfo=timezone.utc)
+            ticks = parse_bi5(content, int(base_dt.timestamp() * 1000), get_instrument(pair).point_divisor)
+            if ticks is not None and not ticks.empty:
+                entry['ticks'].append(ticks)
+        elif status not in ('not_found', 'empty_data'):
+            entry['failed'] = True
 
-def get_session():
-    if not hasattr(thread_local, "session"):
-        thread_local.session = requests.Session()
-        # Optimize headers
-        thread_local.session.headers.update({
-            'User-Agent': 'Mozilla/5.0',
-            'Connection': 'keep-alive'
-        })
-    return thread_local.session
+        entry['left'] -= 1
+        if entry['left'] == 0:
+            del pending[(pair, dt)]
+            # Days with failed hours are not saved so that the next run retries them
+            res = 'incomplete' if entry['failed'] else save_day(pair, dt, entry['ticks'])
+            results[res] += 1
+            bar.update()
 
-def worker_wrapper(args):
-    pair, date_str = args
-    session = get_session()
-    return process_day((pair, date_str, session))
+    with tqdm(total=len(days), unit="day") as bar:
+        fetch_all(tasks(), on_result=on_result, max_connections=MAX_CONNECTIONS)
+    return results
 
 if __name__ == "__main__":
     if not PARQUET_DIR.exists():
         PARQUET_DIR.mkdir()
         
-    tasks = []
+    days = []
     # 2025 -> 2000
     for year in range(END_YEAR, START_YEAR - 1, -1):
         for pair in PAIRS:
@@ -173,12 +113,11 @@ if __name__ == "__main__":
             curr = start
             while curr <= end:
                 if curr > datetime.now(): break
-                tasks.append((pair, curr.strftime("%Y-%m-%d")))
+                if not day_parquet_path(pair, curr).exists():
+                    days.append((pair, curr))
                 curr += timedelta(days=1)
                 
-    print(f"Starting Smart Pipeline: {len(tasks)} days to process.")
-    print(f"Max Workers: {MAX_WORKERS}")
+    print(f"Starting Smart Pipeline: {len(days)} days to process.")
+    print(f"Max Connections: {MAX_CONNECTIONS}")
     
-    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        list(tqdm(executor.map(worker_wrapper, tasks), total=len(tasks), unit="day"))
-
+    print(run(days))
@@ -0,0 +1,241 @@
+"""
+ダウ理論のスイングハイ/ロー（HH/HL/LH/LL）の検出
+
+前後 p 本より高い（安い）足をスイングハイ（ロー）とし（左側は同値でも不成立、
+右側は同値なら成立）、高値と安値が交互になるように同じ種類が続いたらより極端な
+ほうを残す。各スイングは同じ種類の直前のスイングと比べて HH/LH、LL/HL と分類する。
+チャートの calcDow（frontend/indicator_worker.js）と同じ定義。
+
+スイングの候補（前後 p 本との比較）は月ブロックごとに、前後の月の p 本をつなげて
+計算してキャッシュする。前後 p 本の最大値/最小値はブロック単位の累積最大値
+（van Herk / Gil-Werman）で求めるので、p に関係なく本数に比例する時間で済む。
+ジグザグと分類は期間の候補だけをたどる。
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from ohlc_cache import iter_months
+
+# スイングの判定に使う前後の本数（既定値）
+SWING_BARS = 5
+
+
+def window_max(a: np.ndarray, length: int) -> np.ndarray:
+    """
+    長さ length の窓の最大値（out[j] は a[j]〜a[j + length - 1] の最大値、len(a) - length + 1 個）
+
+    length 本ずつのブロックの前からと後ろからの累積最大値を組み合わせる
+    """
+    n = len(a)
+    if n < length:
+        return np.zeros(0)
+    padded = np.full(-(-n // length) * length, -np.inf)
+    padded[:n] = a
+    blocks = padded.reshape(-1, length)
+    prefix = np.maximum.accumulate(blocks, axis=1).ravel()
+    suffix = np.maximum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    start = np.arange(n - length + 1)
+    return np.maximum(suffix[start], prefix[start + length - 1])
+
+
+def swing_flags(high: np.ndarray, low: np.ndarray, p: int):
+    """
+    各足がスイングハイ/ローの候補か（前後 p 本がない足は False）
+
+    Returns:
+        (is_high, is_low): bool配列
+    """
+    n = len(high)
+    is_high = np.zeros(n, dtype=bool)
+    is_low = np.zeros(n, dtype=bool)
+    if n < 2 * p + 1:
+        return is_high, is_low
+    max_h = window_max(high, p)
+    min_l = -window_max(-low, p)
+    i = np.arange(p, n - p)
+    # 左は i-p..i-1（窓の先頭 i-p）、右は i+1..i+p（窓の先頭 i+1）
+    is_high[p:n - p] = (max_h[i - p] < high[i]) & (max_h[i + 1] <= high[i])
+    is_low[p:n - p] = (min_l[i - p] > low[i]) & (min_l[i + 1] >= low[i])
+    return is_high, is_low
+
+
+def classify(time, high, low, is_high, is_low):
+    """
+    候補から交互のスイングを作り HH/HL/LH/LL に分類
+
+    Returns:
+        {"time": epoch秒, "value": 価格, "type": 1（高値）/ -1（安値）, "label": "H"/"HH"/"LH"/"L"/"LL"/"HL"}
+        の列ごとのリスト
+    """
+    times, values, types = [], [], []
+    for i in np.flatnonzero(is_high | is_low):
+        ch, cl = float(high[i]), float(low[i])
+        if is_high[i] and (not types or types[-1] == -1 or ch > values[-1]):
+            if types and types[-1] == 1:
+                times.pop(); values.pop(); types.pop()
+            times.append(int(time[i])); values.append(ch); types.append(1)
+        elif is_low[i] and (not types or types[-1] == 1 or cl < values[-1]):
+            if types and types[-1] == -1:
+                times.pop(); values.pop(); types.pop()
+            times.append(int(time[i])); values.append(cl); types.append(-1)
+
+    labels = []
+    prev = {1: None, -1: None}
+    for value, kind in zip(values, types):
+        last = prev[kind]
+        if kind == 1:
+            labels.append('H' if last is None else ('HH' if value > last else 'LH'))
+        else:
+            labels.append('L' if last is None else ('LL' if value < last else 'HL'))
+        prev[kind] = value
+    return {"time": times, "value": values, "type": types, "label": labels}
+
+
+def trend(swings) -> str:
+    """直近4つのスイングで高値・安値がともに切り上がっていれば 'UP'、切り下がっていれば 'DOWN'、それ以外は 'FLAT'"""
+    if len(swings["type"]) < 4:
+        return 'FLAT'
+    last = list(zip(swings["type"][-4:], swings["value"][-4:]))
+    h = [v for t, v in last if t == 1]
+    l = [v for t, v in last if t == -1]
+    if len(h) >= 2 and len(l) >= 2:
+        if h[1] > h[0] and l[1] > l[0]:
+            return 'UP'
+        if h[1] < h[0] and l[1] < l[0]:
+            return 'DOWN'
+    return 'FLAT'
+
+
+class SwingBlockCache:
+    """
+    月ブロックごとのスイング候補のLRUキャッシュ（OHLCBlockCache の上に載せる）
+
+    Args:
+        ohlc_cache: 価格の月ブロックを取得する OHLCBlockCache
+        max_bytes: 保持するブロックの合計バイト数の上限
+    """
+
+    def __init__(self, ohlc_cache, max_bytes: int):
+        self.ohlc_cache = ohlc_cache
+        self.max_bytes = max_bytes
+        self._blocks = OrderedDict()  # key -> (シグネチャ, (is_high, is_low), nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _price_block(self, symbol, year, month, tf):
+        try:
+            return self.ohlc_cache.get_block(symbol, year, month, tf)
+        except FileNotFoundError:
+            return {"time": np.zeros(0, dtype=np.int64), "high": np.zeros(0), "low": np.zeros(0)}
+
+    @staticmethod
+    def _neighbors(year, month):
+        prev = (year - 1, 12) if month == 1 else (year, month - 1)
+        nxt = (year + 1, 1) if month == 12 else (year, month + 1)
+        return prev, nxt
+
+    def _signature(self, symbol, tf, year, month):
+        """対象月と前後の月（月の端の判定に使う）のソースのシグネチャ"""
+        prev, nxt = self._neighbors(year, month)
+        return tuple(self.ohlc_cache.signature(symbol, y, m, tf) for y, m in (prev, (year, month), nxt))
+
+    def get_month(self, symbol: str, year: int, month: int, tf: int, p: int):
+        """
+        1ヶ月分の価格ブロックとスイング候補
+
+        Returns:
+            (価格ブロック, is_high, is_low)
+        """
+        block = self._price_block(symbol, year, month, tf)
+        key = (symbol, tf, p, year, month)
+        sig = self._signature(symbol, tf, year, month)
+        with self._lock:
+            entry = self._blocks.get(key)
+            if entry is not None and entry[0] == sig:
+                self._blocks.move_to_end(key)
+                self.hits += 1
+                return (block, *entry[1])
+            self.misses += 1
+
+        # 前後の月の p 本をつなげて、月の端の足も判定できるようにする
+        prev, nxt = self._neighbors(year, month)
+        before = self._price_block(symbol, *prev, tf)
+        after = self._price_block(symbol, *nxt, tf)
+        head = min(p, len(before["time"]))
+        high = np.concatenate([before["high"][len(before["high"]) - head:], block["high"], after["high"][:p]])
+        low = np.concatenate([before["low"][len(before["low"]) - head:], block["low"], after["low"][:p]])
+        is_high, is_low = swing_flags(high, low, p)
+        flags = (is_high[head:head + len(block["time"])], is_low[head:head + len(block["time"])])
+        self._store(key, sig, flags)
+        return (block, *flags)
+
+    def _store(self, key, sig, flags):
+        nbytes = sum(f.nbytes for f in flags)
+        with self._lock:
+            old = self._blocks.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+            # 上限を超えるブロックは保持しない
+            if nbytes > self.max_bytes:
+                return
+
+            while self._blocks and self._bytes + nbytes > self.max_bytes:
+                _, (_, _, evicted) = self._blocks.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+            self._blocks[key] = (sig, flags, nbytes)
+            self._bytes += nbytes
+
+    def get_range(self, symbol: str, start_date: str, end_date: str, tf: int, p: int = SWING_BARS):
+        """
+        日付範囲（終了日を含む）のスイング
+
+        範囲の先頭と末尾の p 本は、範囲内に前後 p 本がないのでスイングにしない
+        （範囲外の足を使わない。チャートが読み込んだ足だけで判定するのと同じ）
+
+        Returns:
+            classify() と同じ形式
+        """
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d")
+        end_dt = datetime.strptime(end_date, "%Y-%m-%d")
+        start_ts = int(start_dt.replace(tzinfo=timezone.utc).timestamp())
+        end_ts = int((end_dt + timedelta(days=1)).replace(tzinfo=timezone.utc).timestamp())
+
+        parts = []
+        for year, month in iter_months(start_dt, end_dt):
+            block, is_high, is_low = self.get_month(symbol, year, month, tf, p)
+            lo, hi = np.searchsorted(block["time"], [start_ts, end_ts], side='left')
+            if hi > lo:
+                parts.append((block["time"][lo:hi], block["high"][lo:hi], block["low"][lo:hi],
+                              is_high[lo:hi], is_low[lo:hi]))
+        if not parts:
+            return classify(*(np.zeros(0) for _ in range(3)), np.zeros(0, dtype=bool), np.zeros(0, dtype=bool))
+
+        time, high, low, is_high, is_low = (np.concatenate(cols) for cols in zip(*parts))
+        is_high[:p] = is_high[len(is_high) - p:] = False
+        is_low[:p] = is_low[len(is_low) - p:] = False
+        return classify(time, high, low, is_high, is_low)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "blocks": len(self._blocks),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+            self._bytes = 0
@@ -1,9 +1,8 @@
-
 import os
-import requests
 from pathlib import Path
 from datetime import datetime, timedelta
-import time
+
+from fetch_engine import fetch_all, hour_task
 
 def check_and_redownload(pair="EURUSD", start_year=2025, end_year=2025):
     base_dir = Path(f"../data/{pair}")
@@ -15,8 +14,7 @@ def check_and_redownload(pair="EURUSD", start_year=2025, end_year=2025):
     current_date = start_date
     today = datetime.now()
     
-    missing_count = 0
-    redownload_count = 0
+    missing = []
     
     while current_date <= end_date and current_date <= today:
         year = current_date.year
@@ -40,35 +38,24 @@ def check_and_redownload(pair="EURUSD", start_year=2025, end_year=2025):
                 needs_download = True
                 
             if needs_download:
-                missing_count += 1
-                # Try simple download
-                url = f"https://datafeed.dukascopy.com/datafeed/{pair}/{year}/{month:02d}/{day:02d}/{hour:02d}h_ticks.bi5"
-                try:
-                    # 100ms delay to avoid rate limit
-                    time.sleep(0.1) 
-                    
-                    res = requests.get(url, timeout=10)
-                    if res.status_code == 200:
-                        day_dir.mkdir(parents=True, exist_ok=True)
-                        with open(file_path, 'wb') as f:
-                            f.write(res.content)
-                        if len(res.content) > 0:
-                            print(f"Downloaded: {file_path} ({len(res.content)} bytes)")
-                            redownload_count += 1
-                    elif res.status_code == 404:
-                        pass # Valid but no data
-                    else:
-                        print(f"Failed {url}: {res.status_code}")
-                except Exception as e:
-                    print(f"Error downloading {url}: {e}")
+                missing.append(hour_task(pair, current_date, hour, day_dir))
         
         current_date += timedelta(days=1)
         if current_date.day == 1:
             print(f"Processed through {current_date.strftime('%Y-%m-%d')}...")
 
+    # Redownload everything that is missing in one run (the fetch engine backs off on rate limits)
+    def on_result(task, status, content):
+        if status == 'downloaded':
+            print(f"Downloaded: {task.path} ({task.path.stat().st_size} bytes)")
+        elif status not in ('not_found', 'empty_data', 'skipped'):
+            print(f"Failed {task.url}: {status}")
+
+    counts = fetch_all(missing, on_result=on_result)
+
     print(f"Check complete.")
-    print(f"Missing/Empty files found: {missing_count}")
-    print(f"Successfully redownloaded: {redownload_count}")
+    print(f"Missing/Empty files found: {len(missing)}")
+    print(f"Successfully redownloaded: {counts['downloaded']}")
 
 if __name__ == "__main__":
     check_and_redownload()
@@ -0,0 +1,160 @@
+"""
+fetch_engine をローカルのスタンドインHTTPサーバーに対して動作確認するスクリプト
+
+合成bi5（bench_bi5_decoder.make_synthetic_hour）を datafeed と同じURL構成で配信し、
+503（混雑）・404・空レスポンスを混ぜた状態でダウンロードして以下を確認する
+- 保存されたbi5がすべて元のフィクスチャと一致し、decode_bi5 で読めること
+- 503 のあとも再試行で全件取得できること
+- 状態ファイルで再実行時に取得済み・404のタスクがスキップされること
+
+使用方法:
+    python verify_fetch_engine.py
+    python verify_fetch_engine.py --days 5 --fail-rate 0.3
+"""
+import argparse
+import lzma
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from bench_bi5_decoder import make_synthetic_hour
+from bi5_reader import decode_bi5
+from fetch_engine import STATE_FILE_NAME, fetch_all, hour_task, hour_url, summarize
+
+PAIR = "EURUSD"
+START_DATE = datetime(2024, 3, 4)
+
+
+class StandInServer:
+    """bi5フィクスチャを配信し、一部のリクエストに 503 を返すサーバー"""
+
+    def __init__(self, fixtures, fail_rate, seed=0):
+        self.fixtures = fixtures        # URLパス -> bytes（None は 404）
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rejected = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with server.lock:
+                    server.requests += 1
+                    reject = server.rng.random() < server.fail_rate
+                    server.rejected += reject
+                if reject:
+                    self.reply(503, b"")
+                elif self.path not in server.fixtures or server.fixtures[self.path] is None:
+                    self.reply(404, b"")
+                else:
+                    self.reply(200, server.fixtures[self.path])
+
+            def reply(self, code, body):
+                self.send_response(code)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}/datafeed"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+
+
+def make_fixtures(days):
+    """{URLパス: bi5}（各日の 22時台は 404、23時台は空レスポンス）"""
+    fixtures = {}
+    for d in range(days):
+        date = START_DATE.replace(day=START_DATE.day + d)
+        for hour in range(24):
+            path = "/datafeed" + hour_url(PAIR, date.year, date.month - 1, date.day, hour, base_url="")
+            if hour == 22:
+                fixtures[path] = None
+            elif hour == 23:
+                fixtures[path] = b""
+            else:
+                fixtures[path] = make_synthetic_hour(200, seed=d * 24 + hour)
+    return fixtures
+
+
+def build_tasks(days, data_dir, base_url):
+    tasks = []
+    for d in range(days):
+        date = START_DATE.replace(day=START_DATE.day + d)
+        save_dir = data_dir / PAIR / str(date.year) / f"{date.month - 1:02d}" / f"{date.day:02d}"
+        tasks.extend(hour_task(PAIR, date, hour, save_dir, base_url) for hour in range(24))
+    return tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check fetch_engine against a local stand-in datafeed")
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--fail-rate", type=float, default=0.2, help="Share of requests answered with 503")
+    args = parser.parse_args()
+
+    fixtures = make_fixtures(args.days)
+    server = StandInServer(fixtures, args.fail_rate)
+    ok = True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        state_file = data_dir / STATE_FILE_NAME
+        tasks = build_tasks(args.days, data_dir, server.base_url)
+
+        started = time.perf_counter()
+        counts = fetch_all(tasks, state_file=state_file, max_connections=8)
+        summary = summarize(counts)
+        print(f"First run:  {summary} in {time.perf_counter() - started:.2f}s "
+              f"({server.requests} requests, {server.rejected} answered 503)")
+
+        expected = {'downloaded': 22 * args.days, 'skipped': 0, 'not_found': args.days,
+                    'empty_data': args.days, 'failed': 0}
+        if summary != expected:
+            print(f"FAIL expected {expected}")
+            ok = False
+
+        # 保存内容がフィクスチャと一致し、デコードできること
+        for task in tasks:
+            body = fixtures["/datafeed" + task.url[len(server.base_url):]]
+            if body:
+                saved = task.path.read_bytes()
+                base_ms = int(datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp() * 1000)
+                if saved != body or decode_bi5(lzma.decompress(saved), base_ms).empty:
+                    print(f"FAIL content mismatch: {task.path}")
+                    ok = False
+            elif task.path.exists():
+                print(f"FAIL unexpected file: {task.path}")
+                ok = False
+        if list(data_dir.rglob("*.part")):
+            print("FAIL leftover .part files")
+            ok = False
+
+        # 再実行: 取得済みはファイルで、404/空は状態ファイルでスキップされ、リクエストは発生しない
+        requests_before = server.requests
+        summary = summarize(fetch_all(tasks, state_file=state_file, max_connections=8))
+        print(f"Second run: {summary} ({server.requests - requests_before} requests)")
+        if summary['skipped'] != len(tasks) or server.requests != requests_before:
+            print("FAIL second run was not fully resumed")
+            ok = False
+
+    server.close()
+    print("OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
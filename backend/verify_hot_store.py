@@ -0,0 +1,82 @@
+"""
+HotStore と OHLCBlockCache の組み合わせを一時ディレクトリで動作確認するスクリプト
+
+max_months を超える月を読み込み、以下を確認する
+- ホットストアから開いたブロックがソースから読んだブロックと一致すること
+- 追い出された月や作り直された月の古い版が、キャッシュが手放したあと実際に削除されること
+  （ディスク上の版の数が max_months を超えないこと）
+- メモリマップのブロックがキャッシュのバイト数に数えられず、その数も max_months を超えないこと
+
+使用方法:
+    python verify_hot_store.py
+    python verify_hot_store.py --symbol USDJPY --year 2024 --max-months 3
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from bi5_reader import month_signature
+from hot_store import HotStore
+from ohlc_cache import OHLCBlockCache
+
+
+def version_dirs(root: Path):
+    return sorted(p.parent for p in root.glob("*/*m/*/v*/*.npy") if p.name == "time.npy")
+
+
+def check(label, ok, detail=""):
+    print(f"{'OK  ' if ok else 'FAIL'} {label}{': ' + detail if detail else ''}")
+    return ok
+
+
+def main(symbol, year, tf, max_months):
+    root = Path(tempfile.mkdtemp(prefix="hot_store_"))
+    changed = set()  # 作り直しをさせる月（シグネチャを変える）
+
+    def signature(sym, y, m, t):
+        sig = month_signature(sym, y, m, t)
+        return (*sig, ("rebuilt",)) if (y, m) in changed else sig
+
+    try:
+        plain = OHLCBlockCache(1 << 30)
+        store = HotStore(root, max_months)
+        cache = OHLCBlockCache(1 << 30, signature=signature, hot_store=store)
+        ok = True
+
+        months = range(1, 7)
+        for month in months:
+            block = cache.get_block(symbol, year, month, tf)
+            expected = plain.get_block(symbol, year, month, tf)
+            ok &= check(f"{symbol} {year}-{month:02d} matches the source",
+                        all(np.array_equal(block[c], expected[c]) for c in expected))
+        del block
+
+        # 最後の月を作り直す（古い版はキャッシュが新しい版に置き換えたら消える）
+        changed.add((year, months[-1]))
+        cache.get_block(symbol, year, months[-1], tf)
+
+        stats = store.stats()
+        on_disk = version_dirs(root)
+        ok &= check("versions on disk <= max_months", len(on_disk) <= max_months,
+                    f"{len(on_disk)} on disk, {stats['retired_versions']} retired")
+        ok &= check("no retired version left", stats["retired_versions"] == 0)
+        ok &= check("mapped blocks in the cache <= max_months", len(cache._blocks) <= max_months,
+                    f"{len(cache._blocks)} blocks, {cache._bytes} bytes")
+        ok &= check("mapped blocks not counted in bytes", cache._bytes == 0)
+        return ok
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that the hot store deletes evicted and rebuilt months")
+    parser.add_argument("--symbol", default="EURUSD")
+    parser.add_argument("--year", type=int, default=2024)
+    parser.add_argument("--tf", type=int, default=60)
+    parser.add_argument("--max-months", type=int, default=2)
+    args = parser.parse_args()
+    sys.exit(0 if main(args.symbol, args.year, args.tf, args.max_months) else 1)
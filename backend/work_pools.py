@@ -0,0 +1,94 @@
+"""
+非同期ハンドラから重い処理を逃がすための実行プール
+
+FastAPI の async ハンドラから、Parquet の読み込みやキャッシュの組み立て（I/O 中心）は
+スレッドプールへ、バックテスト（Polars/NumPy の CPU 処理）はプロセスプールへ投げる。
+プールごとに待ち行列の長さに上限を設け、あふれたら PoolBusy で断る（サーバーは 503 を返す）。
+同じキーの処理が実行中なら新しく投げずにその結果を待つ（同一リクエストの合流）。
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class PoolBusy(Exception):
+    """待ち行列が上限に達していて受け付けられない"""
+
+
+class WorkPool:
+    """
+    上限付きの待ち行列と同一リクエストの合流を持つ実行プール
+
+    カウンタと実行中の表はイベントループのスレッドからだけ触るのでロックは不要
+
+    Args:
+        executor: 実際に処理を行う concurrent.futures の Executor
+        max_pending: 実行中と待機中を合わせた処理数の上限
+    """
+
+    def __init__(self, executor, max_pending: int):
+        self.executor = executor
+        self.max_pending = max_pending
+        self._pending = 0
+        self._inflight = {}  # key -> asyncio.Future
+        self.submitted = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    async def run(self, fn, *args):
+        """fn(*args) をプールで実行して結果を待つ（待ち行列があふれていれば PoolBusy）"""
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise PoolBusy(f"{self._pending} tasks pending")
+        self._pending += 1
+        self.submitted += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def run_once(self, key, fn, *args):
+        """
+        run() と同じだが、同じ key の処理が実行中ならそれに合流する
+
+        クライアントが切断しても（待ちがキャンセルされても）共有の処理は止めない
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self.run(fn, *args))
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._finished(key, f))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    def _finished(self, key, future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # 待ち手が全員いなくなっていても例外を「未取得」のままにしない
+        if not future.cancelled():
+            future.exception()
+
+    def stats(self):
+        return {
+            "pending": self._pending,
+            "inflight": len(self._inflight),
+            "max_pending": self.max_pending,
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def thread_pool(workers: int, max_pending: int) -> WorkPool:
+    """I/O 中心の処理用（キャッシュを共有するのでサーバーと同じプロセス）"""
+    return WorkPool(ThreadPoolExecutor(max_workers=workers, thread_name_prefix="io"), max_pending)
+
+
+def process_pool(workers: int, max_pending: int) -> WorkPool:
+    """CPU 中心の処理用（Polars のスレッドプールは fork 後に使えないので spawn）"""
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return WorkPool(executor, max_pending)
@@ -0,0 +1,62 @@
+"""
+Benchmark: run_backtest on the NumPy path vs the Rust extension vs the Rust CLI.
+
+The CLI timing includes the process spawn and the JSON round trip that
+/lab/run would pay for it; the extension and NumPy timings are in-process.
+Engines that are not installed/built are skipped.
+
+Usage:
+    python bench_engines.py
+    python bench_engines.py --symbol USDJPY --start 2024-01-01 --end 2024-12-31 --repeat 5
+"""
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+from verify_golden import DEFAULT_CLI, engines
+
+
+def bench(run, case, repeat):
+    """(median seconds, result) over `repeat` runs after one warm-up"""
+    result = run(*case)
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run(*case)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare backtest engine speed")
+    parser.add_argument("--symbol", default="EURUSD")
+    parser.add_argument("--start", default="2024-01-01")
+    parser.add_argument("--end", default="2024-12-31")
+    parser.add_argument("--fast", type=int, default=20)
+    parser.add_argument("--slow", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cli", type=Path, default=DEFAULT_CLI)
+    args = parser.parse_args()
+
+    case = (args.symbol, args.start, args.end, args.fast, args.slow)
+    print(f"{args.symbol} {args.start}..{args.end} {args.fast}/{args.slow}, median of {args.repeat}")
+
+    baseline = None
+    reference = None
+    for name, run in engines(args.cli):
+        sec, result = bench(run, case, args.repeat)
+        if "error" in result:
+            print(f"{name:>9}: {result['error']}")
+            continue
+        result = json.loads(json.dumps(result))
+        baseline = baseline or sec
+        reference = reference or result
+        same = "same output" if result == reference else "OUTPUT DIFFERS"
+        print(f"{name:>9}: {sec:7.3f}s  x{baseline / sec:5.2f}  "
+              f"({len(result['equity'])} bars, {result['stats']['total_trades']} trades, {same})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,142 +1,804 @@
 
 import polars as pl
+import numpy as np
 import argparse
 import json
+import multiprocessing
+import os
+import sys
+import time as time_module
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
-def run_backtest(symbol, start_date, end_date, fast_sma, slow_sma):
-    # Determine parquet path pattern
-    # ../parquet_data/{symbol}/**/*.parquet
-    base_path = Path(f"../parquet_data/{symbol}")
-    if not base_path.exists():
+# Share the partition layout with the backend loaders
+sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
+from bi5_reader import month_partitions
+from instruments import get_instrument
+from strategy import StrategyError, compile_strategy
+
+# Optional in-process Rust core (pip install ./engine, built by maturin); only used with native=True
+try:
+    import fxlab_engine
+except ImportError:
+    fxlab_engine = None
+
+# Parallel fast-window batches in run_sweep (each holds a few (k, n) float arrays)
+SWEEP_WORKERS = 4
+
+# Stats run_walk_forward can rank in-sample candidates by (higher is better)
+WALK_FORWARD_OBJECTIVES = ("total_pnl_pips", "win_rate", "profit_factor")
+
+# Stats run_sweep can rank by -> whether higher is better (drawdown ranks smallest first)
+SWEEP_SORT_KEYS = {
+    "total_pnl_pips": True,
+    "win_rate": True,
+    "profit_factor": True,
+    "total_trades": True,
+    "max_drawdown_pips": False,
+}
+
+# Symbols of run_portfolio evaluated at once (one process each)
+PORTFOLIO_WORKERS = os.cpu_count() or 1
+
+# Segments run_stepped loads the period in (one progress report after each)
+STEPPED_SEGMENTS = 12
+
+# Points of run_stepped's partial equity curves when the run has no max_points
+STEPPED_PREVIEW_POINTS = 1000
+
+# Bars before each segment run_stepped's preview recomputes indicators and positions over
+STEPPED_WARMUP_BARS = 5000
+
+
+def scan_prices(symbol, start_date, end_date):
+    """
+    Lazily scan the bars of [start_date, end_date] (inclusive), sorted by time.
+
+    Only the monthly partitions overlapping the range are scanned instead of
+    globbing every file of the symbol. Returns None when no partition exists.
+    """
+    start_dt = datetime.strptime(start_date, "%Y-%m-%d")
+    end_dt = datetime.strptime(end_date, "%Y-%m-%d")
+    files = month_partitions(symbol, start_dt, end_dt)
+    if not files:
+        return None
+
+    # Convert inputs to datetime with UTC to match Parquet data
+    start_ts = start_dt.replace(tzinfo=timezone.utc)
+    end_ts = end_dt.replace(hour=23, minute=59, second=59, tzinfo=timezone.utc)
+
+    return (
+        # Monthly files differ in extra columns (pandas index, spread/tick_count)
+        pl.scan_parquet([str(f) for f in files], extra_columns="ignore")
+        .select(["time", "open", "high", "low", "close"])
+        .filter((pl.col("time") >= start_ts) & (pl.col("time") <= end_ts))
+        # Sort (Parquet partitions might be unordered)
+        .sort("time")
+    )
+
+
+def iso_times(times):
+    """Format a UTC datetime column like datetime.isoformat() (e.g. 2025-01-02T03:04:00+00:00)."""
+    return times.dt.to_string("%Y-%m-%dT%H:%M:%S%:z").to_list()
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: indices of at most n_out points keeping the shape of y(x).
+
+    The first and last points are always kept; the points in between are split
+    into n_out - 2 buckets and each bucket keeps the point forming the largest
+    triangle with the previously kept point and the mean of the next bucket.
+    """
+    n = len(y)
+    if n_out is None or n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        if b + 2 < len(edges):
+            cx = x[hi:edges[b + 2]].mean()
+            cy = y[hi:edges[b + 2]].mean()
+        else:
+            cx, cy = x[n - 1], y[n - 1]
+        # Twice the triangle area for every candidate of the bucket
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[b + 1] = a
+    return selected
+
+
+def series_points(times, values, digits, epoch=None, max_points=None):
+    """
+    [{"time", "value"}] for the non-NaN entries of values, rounded to `digits`.
+
+    With max_points the series is reduced with LTTB over `epoch` (seconds) first.
+    """
+    keep = np.flatnonzero(~np.isnan(values))
+    if max_points is not None:
+        keep = keep[lttb_indices(epoch[keep], values[keep], max_points)]
+    return [
+        {"time": times[i], "value": round(v, digits)}
+        for i, v in zip(keep.tolist(), values[keep].tolist())
+    ]
+
+
+def simulate_positions(close, target):
+    """
+    Columnar equivalent of stepping bar by bar through a target position.
+
+    A position is opened at the close of the first bar and of every bar whose
+    target differs from the previous one; each position is closed at the next
+    such bar. Bars are grouped by the entry they belong to (cumulative sum of
+    the change flags), which gives the entry price and the realized PnL of the
+    positions closed before them.
+
+    Args:
+        close: (n,) closing prices
+        target: (n,) position per bar (1 long, -1 short, 0 flat)
+
+    Returns:
+        dict with entry/exit bar indices, direction and pnl of the closed
+        trades, and the per-bar equity (realized + floating) in price units
+    """
+    n = len(close)
+    is_entry = np.ones(n, dtype=bool)
+    is_entry[1:] = target[1:] != target[:-1]
+    entries = np.flatnonzero(is_entry)
+    group = np.cumsum(is_entry) - 1
+
+    entry_price = close[entries]
+    direction = target[entries]
+
+    # Every position but the last is closed at the following entry bar
+    exits = entries[1:]
+    closed = direction[:-1]
+    exit_price = close[exits]
+    pnl = np.where(closed == 1, exit_price - entry_price[:-1], entry_price[:-1] - exit_price)
+    pnl[closed == 0] = 0.0
+
+    # Realized PnL before each group (same summation order as a running total)
+    realized = np.concatenate(([0.0], np.cumsum(pnl)))[group]
+    held = close - entry_price[group]
+    floating = np.where(target == 1, held, np.where(target == -1, -held, 0.0))
+
+    traded = closed != 0
+    return {
+        "entries": entries[:-1][traded],
+        "exits": exits[traded],
+        "direction": closed[traded],
+        "pnl": pnl[traded],
+        "equity": realized + floating,
+    }
+
+
+def native_positions(frame):
+    """
+    simulate_positions() through the fxlab_engine extension.
+
+    The frame's close/bullish columns are handed over as Arrow buffers (no copy,
+    no JSON) and the trade/equity columns come back the same way.
+    """
+    trades, equity = fxlab_engine.simulate_frame(frame.select(["close", "bullish"]))
+    return {
+        "entries": trades["entry"].to_numpy(),
+        "exits": trades["exit"].to_numpy(),
+        "direction": trades["direction"].to_numpy(),
+        "pnl": trades["pnl"].to_numpy(),
+        "equity": equity["equity"].to_numpy(),
+    }
+
+
+def crossover_frame(q, fast_sma, slow_sma):
+    """Collect time/close/bullish/fast/slow for every bar of a lazy price frame."""
+    # 1. Calculate SMAs
+    q = q.with_columns([
+        pl.col("close").rolling_mean(window_size=fast_sma).alias("fast"),
+        pl.col("close").rolling_mean(window_size=slow_sma).alias("slow"),
+    ])
+
+    # 2. Signals
+    # Bullish: Fast > Slow
+    q = q.with_columns(
+        (pl.col("fast") > pl.col("slow")).alias("bullish")
+    )
+
+    # 3. Filter only relevant columns and collect all bars for time-axis sync
+    return q.select(["time", "close", "bullish", "fast", "slow"]).collect()
+
+
+def crossover_book(full_data, native=False):
+    """Closing prices and the simulated positions (simulate_positions layout) of a crossover frame."""
+    close = full_data["close"].to_numpy().astype(np.float64)
+    if native:
+        return close, native_positions(full_data)
+    # Short while the averages are not both available (bullish is null)
+    target = np.where(full_data["bullish"].fill_null(False).to_numpy(), 1, -1).astype(np.int8)
+    return close, simulate_positions(close, target)
+
+
+def book_stats(pnl, multiplier):
+    """run_backtest stats of the closed trades' PnL (price units)."""
+    count = len(pnl)
+    wins = int((pnl > 0).sum())
+    realized_pnl = float(np.cumsum(pnl)[-1]) if count else 0.0
+    return {
+        "total_trades": count,
+        "win_rate": round(wins / count if count > 0 else 0, 4),
+        "total_pnl_pips": round(realized_pnl * multiplier, 2),
+        "profit_factor": profit_factor(pnl),
+    }
+
+
+def run_backtest(symbol, start_date, end_date, fast_sma, slow_sma, max_points=None, native=False):
+    """
+    Fast/slow SMA crossover backtest over 1-minute bars.
+
+    Trades and stats are always exact. With max_points the equity curve and
+    each indicator are downsampled (LTTB) to at most that many points.
+    Positions are simulated with NumPy, or by the fxlab_engine extension with
+    native=True (opt-in: check a build with verify_golden.py before using it).
+    """
+    if native and fxlab_engine is None:
+        return {"error": "fxlab_engine extension is not installed"}
+
+    q = scan_prices(symbol, start_date, end_date)
+    if q is None:
         return {"error": f"No data found for {symbol}"}
 
     try:
-        # Scan Parquet (Lazy)
-        q = pl.scan_parquet(f"../parquet_data/{symbol}/**/*.parquet")
-        
-        # Filter Date Range
-        # Convert inputs to datetime with UTC to match Parquet data
-        start_dt = datetime.strptime(start_date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
-        end_dt = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59, tzinfo=timezone.utc)
-        
-        q = q.filter(
-            (pl.col("time") >= start_dt) & (pl.col("time") <= end_dt)
-        )
-        
-        # Sort (Parquet partitions might be unordered)
-        q = q.sort("time")
-        
-        # Strategy Logic (Vectorized)
-        # 1. Calculate SMAs
-        q = q.with_columns([
-            pl.col("close").rolling_mean(window_size=fast_sma).alias("fast"),
-            pl.col("close").rolling_mean(window_size=slow_sma).alias("slow"),
-        ])
-        
-        # 2. Signals
-        # Bullish: Fast > Slow
-        q = q.with_columns(
-            (pl.col("fast") > pl.col("slow")).alias("bullish")
-        )
-        
-        # 3. Crossover (State Change)
-        # We also need to keep the SMA data for visualization
-        q = q.with_columns(
-            (pl.col("bullish") != pl.col("bullish").shift(1)).fill_null(False).alias("signal_change")
+        # Strategy Logic (Vectorized): SMAs and the bullish signal for every bar
+        full_data = crossover_frame(q, fast_sma, slow_sma)
+
+        # 4. Trades and equity from columnar position groups (crossovers = group starts)
+        close, book = crossover_book(full_data, native)
+        multiplier = get_instrument(symbol).pip_multiplier
+        return backtest_response(symbol, start_date, end_date, full_data, close, book, multiplier,
+                                 {"fast_sma": "fast", "slow_sma": "slow"}, max_points)
+
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def backtest_response(symbol, start_date, end_date, full_data, close, book, multiplier, indicators,
+                      max_points=None, oscillators=None):
+    """
+    run_backtest's response from a collected frame and its simulated book.
+
+    Args:
+        indicators: {response name: column of full_data} for the "indicators" series
+        oscillators: same for an "oscillators" entry (omitted when None)
+    """
+    times = iso_times(full_data["time"])
+    pnl = book["pnl"]
+    trades = [
+        {
+            "entry_time": times[i],
+            "exit_time": times[j],
+            "entry_price": close_in,
+            "exit_price": close_out,
+            "type": "LONG" if d == 1 else "SHORT",
+            "pnl": p,
+        }
+        for i, j, close_in, close_out, d, p in zip(
+            book["entries"].tolist(), book["exits"].tolist(),
+            close[book["entries"]].tolist(), close[book["exits"]].tolist(),
+            book["direction"].tolist(), pnl.tolist(),
         )
-        
-        # 4. Filter only relevant columns and collect all bars for time-axis sync
-        # We need 'time', 'close', 'bullish', 'fast', 'slow' for every bar.
-        full_data = q.select(["time", "close", "bullish", "fast", "slow"]).collect()
-        
-        # Process Trades and Equity in Python
-        trades = []
-        equity_curve = []
-        
-        position = 0 # 0: None, 1: Long, -1: Short
-        entry_price = 0.0
-        entry_time = None
-        
-        realized_pnl = 0.0
-        wins = 0
-        count = 0
-        
-        multiplier = 100 if "JPY" in symbol else 10000
-        
-        rows = full_data.rows(named=True)
-        for row in rows:
-            is_bullish = row['bullish']
-            price = row['close']
-            time = row['time']
-            
-            # Check for Signal Change (Crossover)
-            # Simplified: if is_bullish is True and we aren't Long -> Buy
-            # If is_bullish is False and we aren't Short -> Sell
-            
-            signal_target = 1 if is_bullish else -1
-            
-            if position != signal_target:
-                # Close existing if any
-                if position != 0:
-                    pnl = 0.0
-                    if position == 1:
-                        pnl = price - entry_price
-                    else:
-                        pnl = entry_price - price
-                    
-                    realized_pnl += pnl
-                    if pnl > 0: wins += 1
-                    count += 1
-                    
-                    trades.append({
-                        "entry_time": entry_time.isoformat(),
-                        "exit_time": time.isoformat(),
-                        "entry_price": entry_price,
-                        "exit_price": price,
-                        "type": "LONG" if position == 1 else "SHORT",
-                        "pnl": pnl
-                    })
-                
-                # Open new
-                position = signal_target
-                entry_price = price
-                entry_time = time
-                
-            # Current Equity = Realized + Floating
-            floating_pnl = 0.0
-            if position == 1:
-                floating_pnl = price - entry_price
-            elif position == -1:
-                floating_pnl = entry_price - price
-                
-            current_total_pips = (realized_pnl + floating_pnl) * multiplier
-            equity_curve.append({
-                "time": time.isoformat(),
-                "value": round(current_total_pips, 2)
-            })
+    ]
+
+    epoch = full_data["time"].dt.epoch("s").to_numpy().astype(np.float64)
+    equity_curve = series_points(times, book["equity"] * multiplier, 2, epoch, max_points)
+
+    def points(column):
+        return series_points(times, full_data[column].fill_null(np.nan).to_numpy(), 5, epoch, max_points)
 
+    response = {
+        "symbol": symbol,
+        "period_start": start_date,
+        "period_end": end_date,
+        "stats": book_stats(pnl, multiplier),
+        "trades": trades,
+        "equity": equity_curve,
         # Prepare indicator data for frontend display
-        # Only taking a sample if data is huge, but for now we take all to match bars
-        indicators = {
-            "fast_sma": [{"time": row['time'].isoformat(), "value": round(row['fast'], 5)} for row in full_data.rows(named=True) if row['fast'] is not None],
-            "slow_sma": [{"time": row['time'].isoformat(), "value": round(row['slow'], 5)} for row in full_data.rows(named=True) if row['slow'] is not None]
+        "indicators": {name: points(column) for name, column in indicators.items()},
+    }
+    if oscillators is not None:
+        response["oscillators"] = {name: points(column) for name, column in oscillators.items()}
+    return response
+
+
+def run_strategy(symbol, start_date, end_date, spec, max_points=None):
+    """
+    Backtest a JSON strategy spec (see strategy.py) with run_backtest's response.
+
+    Indicators drawn on prices are returned under "indicators" and the others
+    (RSI, MACD, ...) under "oscillators", keyed by their spec names.
+    """
+    try:
+        plan = compile_strategy(spec)
+    except StrategyError as e:
+        return {"error": f"Invalid strategy: {e}"}
+
+    q = scan_prices(symbol, start_date, end_date)
+    if q is None:
+        return {"error": f"No data found for {symbol}"}
+
+    try:
+        full_data, close, book = strategy_book(plan, q)
+        multiplier = get_instrument(symbol).pip_multiplier
+        return backtest_response(symbol, start_date, end_date, full_data, close, book, multiplier,
+                                 plan.overlays, max_points, plan.oscillators)
+
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def strategy_book(plan, q):
+    """Collect a compiled strategy over a lazy price frame and simulate its positions (frame, close, book)."""
+    # Indicators, rules and the position target in one lazy plan
+    full_data = plan.apply(q).select(["time", "close", "target", *plan.display_columns]).collect()
+    close = full_data["close"].to_numpy().astype(np.float64)
+    return full_data, close, simulate_positions(close, full_data["target"].to_numpy())
+
+
+def period_segments(start_date, end_date, count):
+    """Split [start_date, end_date] (inclusive days) into at most `count` contiguous (start, end) date pairs."""
+    start_dt = datetime.strptime(start_date, "%Y-%m-%d")
+    days = (datetime.strptime(end_date, "%Y-%m-%d") - start_dt).days + 1
+    edges = sorted({days * i // count for i in range(count + 1)}) if days > 0 else []
+    day = lambda offset: (start_dt + timedelta(days=offset)).strftime("%Y-%m-%d")
+    return [(day(a), day(b - 1)) for a, b in zip(edges, edges[1:])]
+
+
+def equity_points(full_data, equity, max_points):
+    """series_points of an equity curve (pips), formatting only the times of the kept points."""
+    epoch = full_data["time"].dt.epoch("s").to_numpy().astype(np.float64)
+    keep = lttb_indices(epoch, equity, max_points)
+    times = iso_times(full_data["time"].gather(keep))
+    return [{"time": t, "value": round(v, 2)} for t, v in zip(times, equity[keep].tolist())]
+
+
+def run_stepped(symbol, start_date, end_date, fast_sma=20, slow_sma=50, spec=None, max_points=None,
+                native=False, report=None, segments=STEPPED_SEGMENTS):
+    """
+    run_backtest (or run_strategy when spec is given) loading the period segment by segment.
+
+    After every segment report(done, total, equity) gets the equity curve (pips,
+    downsampled to about max_points or STEPPED_PREVIEW_POINTS in total) of the
+    bars loaded so far. The preview is extended segment by segment: only the new
+    bars are simulated, after STEPPED_WARMUP_BARS (at least slow_sma) bars of the
+    previous ones, and their equity continues from the last previewed value, so
+    progress costs one pass over the data. It follows the final curve up to that
+    time except on bars where the recomputed averages differ from the final ones
+    in the last bit (a tie such as fast == slow can flip), or where a strategy's
+    position was decided before the warm-up. When report returns False the
+    run stops and None is returned; otherwise the response is the one
+    run_backtest / run_strategy give for the whole period (simulated once).
+    """
+    plan = None
+    if spec is not None:
+        try:
+            plan = compile_strategy(spec)
+        except StrategyError as e:
+            return {"error": f"Invalid strategy: {e}"}
+    elif native and fxlab_engine is None:
+        return {"error": "fxlab_engine extension is not installed"}
+
+    def simulate(prices):
+        if plan is not None:
+            return strategy_book(plan, prices.lazy())
+        full_data = crossover_frame(prices.lazy(), fast_sma, slow_sma)
+        return (full_data, *crossover_book(full_data, native))
+
+    try:
+        multiplier = get_instrument(symbol).pip_multiplier
+        steps = period_segments(start_date, end_date, segments)
+        warmup = max(slow_sma, STEPPED_WARMUP_BARS)
+        segment_points = max(3, (max_points or STEPPED_PREVIEW_POINTS) // max(1, len(steps)))
+        parts, preview = [], []
+        tail, last_equity = None, 0.0
+        for done, (segment_start, segment_end) in enumerate(steps, 1):
+            q = scan_prices(symbol, segment_start, segment_end)
+            part = q.collect() if q is not None else None
+            if part is not None:
+                parts.append(part)
+            if report is None:
+                continue
+            if part is not None and len(part):
+                prices = part if tail is None else pl.concat([tail, part])
+                full_data, _, book = simulate(prices)
+                # Equity moves by the previous bar's position times the price change, so the new
+                # bars continue the preview from its last value (k = warm-up bars in front)
+                k = len(prices) - len(part)
+                equity = book["equity"][k:] * multiplier
+                if k:
+                    equity += last_equity - book["equity"][k - 1] * multiplier
+                preview += equity_points(full_data[k:], equity, segment_points)
+                last_equity = float(equity[-1])
+                tail = prices.tail(warmup)
+            if report(done, len(steps), preview) is False:
+                return None
+
+        if not parts:
+            return {"error": f"No data found for {symbol}"}
+        full_data, close, book = simulate(pl.concat(parts))
+        if plan is not None:
+            return backtest_response(symbol, start_date, end_date, full_data, close, book, multiplier,
+                                     plan.overlays, max_points, plan.oscillators)
+        return backtest_response(symbol, start_date, end_date, full_data, close, book, multiplier,
+                                 {"fast_sma": "fast", "slow_sma": "slow"}, max_points)
+
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def portfolio_member(symbol, start_date, end_date, fast_sma, slow_sma, native=False):
+    """
+    One symbol of run_portfolio (runs in a worker process).
+
+    Returns the bar times (epoch seconds), the equity in pips and the stats,
+    or {"error": ...} like run_backtest.
+    """
+    q = scan_prices(symbol, start_date, end_date)
+    if q is None:
+        return {"error": f"No data found for {symbol}"}
+    try:
+        full_data = crossover_frame(q, fast_sma, slow_sma)
+        close, book = crossover_book(full_data, native)
+        multiplier = get_instrument(symbol).pip_multiplier
+        return {
+            "epoch": full_data["time"].dt.epoch("s").to_numpy(),
+            "equity": book["equity"] * multiplier,
+            "pnl_pips": book["pnl"] * multiplier,
+            "stats": book_stats(book["pnl"], multiplier),
         }
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def max_drawdown(equity):
+    """Largest peak-to-trough drop of an equity curve (0 for an empty curve)."""
+    if len(equity) == 0:
+        return 0.0
+    return float((np.maximum.accumulate(equity) - equity).max())
+
+
+def profit_factor(pnl):
+    """Gross profit / gross loss of closed trades (None without losing trades)."""
+    gross_loss = float(-pnl[pnl < 0].sum())
+    return round(float(pnl[pnl > 0].sum()) / gross_loss, 4) if gross_loss > 0 else None
+
+
+def run_portfolio(symbols, start_date, end_date, fast_sma, slow_sma, max_points=None):
+    """
+    The same SMA crossover on several symbols, one worker process per symbol.
+
+    Every symbol's equity (pips) is put on the union of all bar times, holding
+    its last value over bars it does not have (0 before its first bar), and the
+    combined equity is their sum. Symbols without data are reported in "errors"
+    and left out of the combination.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    started = time_module.perf_counter()
+
+    # Polars' thread pool does not survive fork, so workers are spawned
+    workers = max(1, min(len(symbols), PORTFOLIO_WORKERS))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [
+            executor.submit(portfolio_member, symbol, start_date, end_date, fast_sma, slow_sma)
+            for symbol in symbols
+        ]
+        members = dict(zip(symbols, (f.result() for f in futures)))
+
+    errors = {s: m["error"] for s, m in members.items() if "error" in m}
+    members = {s: m for s, m in members.items() if "error" not in m}
+    if not members:
+        return {"error": "No data found for " + ", ".join(symbols), "errors": errors}
+
+    # Common time axis: union of every symbol's bars
+    epoch = np.unique(np.concatenate([m["epoch"] for m in members.values()]))
+    times = iso_times(pl.from_epoch(pl.Series(epoch), time_unit="s").dt.replace_time_zone("UTC"))
+    epoch_f = epoch.astype(np.float64)
+
+    combined = np.zeros(len(epoch))
+    per_symbol = {}
+    for symbol, m in members.items():
+        # Last bar of the symbol at or before each common time (-1 before its first bar)
+        at = np.searchsorted(m["epoch"], epoch, side="right") - 1
+        aligned = np.where(at >= 0, m["equity"][np.maximum(at, 0)], 0.0)
+        combined += aligned
+        per_symbol[symbol] = {
+            "stats": {
+                **m["stats"],
+                "profit_factor": profit_factor(m["pnl_pips"]),
+                "max_drawdown_pips": round(max_drawdown(aligned), 2),
+            },
+            "equity": series_points(times, aligned, 2, epoch_f, max_points),
+        }
+
+    pnl_pips = np.concatenate([m["pnl_pips"] for m in members.values()])
+    count = len(pnl_pips)
+    wins = int((pnl_pips > 0).sum())
+
+    return {
+        "symbols": list(members),
+        "period_start": start_date,
+        "period_end": end_date,
+        "bars": len(epoch),
+        "elapsed_sec": round(time_module.perf_counter() - started, 3),
+        "stats": {
+            "total_trades": count,
+            "win_rate": round(wins / count if count > 0 else 0, 4),
+            "total_pnl_pips": round(float(pnl_pips.sum()), 2),
+            "profit_factor": profit_factor(pnl_pips),
+            "max_drawdown_pips": round(max_drawdown(combined), 2),
+        },
+        "equity": series_points(times, combined, 2, epoch_f, max_points),
+        "per_symbol": per_symbol,
+        "errors": errors,
+    }
+
+
+def with_rolling_means(q, windows):
+    """
+    Add one `sma_{w}` column per distinct window to a lazy price frame.
+
+    All means are produced by the same Polars plan (and the same rolling_mean
+    as run_backtest) so crossovers on flat stretches resolve identically.
+    """
+    return q.with_columns([
+        pl.col("close").rolling_mean(window_size=w).alias(f"sma_{w}")
+        for w in sorted(set(windows))
+    ])
+
+
+def sma_matrix(df, windows):
+    """Stack `sma_{w}` columns into a (len(windows), n) float array with NaN for nulls."""
+    return np.vstack([
+        df[f"sma_{w}"].fill_null(np.nan).to_numpy() for w in windows
+    ])
+
+
+def mark_to_market(close, target):
+    """Equity (price units) of holding target[..., i - 1] into bar i; the last axis is time."""
+    mtm = np.zeros(target.shape)
+    mtm[..., 1:] = target[..., :-1] * np.diff(close)
+    return np.cumsum(mtm, axis=-1)
+
+
+def trade_pnls(equity, target, close_last=False):
+    """
+    Closed-trade PnL of one target row: entries are the first bar plus every reversal.
+
+    With close_last the position still open is closed at the last bar, so the
+    PnL adds up to equity[-1].
+    """
+    entries = np.concatenate(([0], np.flatnonzero(target[1:] != target[:-1]) + 1))
+    if close_last and entries[-1] != len(target) - 1:
+        entries = np.append(entries, len(target) - 1)
+    return np.diff(equity[entries])
+
+
+def crossover_stats(trade_pnl, drawdown, multiplier):
+    """Sweep stats from closed-trade PnL and the max drawdown (price units)."""
+    gross_profit = trade_pnl[trade_pnl > 0].sum()
+    gross_loss = -trade_pnl[trade_pnl < 0].sum()
+    count = len(trade_pnl)
+    wins = int((trade_pnl > 0).sum())
+    return {
+        "total_trades": count,
+        "win_rate": round(wins / count if count > 0 else 0, 4),
+        "total_pnl_pips": round(float(trade_pnl.sum()) * multiplier, 2),
+        "profit_factor": round(float(gross_profit / gross_loss), 4) if gross_loss > 0 else None,
+        "max_drawdown_pips": round(float(drawdown) * multiplier, 2),
+    }
+
+
+def evaluate_crossovers(close, fast_mean, slow_means, multiplier):
+    """
+    Evaluate one fast SMA against a batch of slow SMAs in a single pass.
+
+    Positions follow run_backtest: always in the market, long while fast > slow
+    (short before both averages exist), reversing at the close of the signal bar.
+
+    Args:
+        close: (n,) closing prices
+        fast_mean: (n,) fast SMA
+        slow_means: (k, n) slow SMAs, one row per combination
+        multiplier: pip multiplier for the symbol
+
+    Returns:
+        list of stats dicts, one per row of slow_means
+    """
+    # +1 long / -1 short per combination and bar
+    target = np.where(fast_mean > slow_means, 1, -1).astype(np.int8)
+
+    # Mark-to-market PnL of the position held into each bar; its running sum is the equity
+    equity = mark_to_market(close, target)
+    drawdown = (np.maximum.accumulate(equity, axis=1) - equity).max(axis=1)
+
+    return [
+        crossover_stats(trade_pnls(equity[j], target[j]), drawdown[j], multiplier)
+        for j in range(slow_means.shape[0])
+    ]
+
+
+def run_sweep(symbol, start_date, end_date, fast_values, slow_values, sort_by="total_pnl_pips", top=None):
+    """
+    Evaluate a grid of (fast, slow) SMA crossovers on one price load.
+
+    Every rolling mean needed by the grid is computed once; each fast window is
+    then evaluated against all of its slow windows as one batched NumPy pass.
+    Combinations with fast >= slow are skipped; combinations without a value
+    for sort_by (profit_factor without losing trades) rank last.
+    """
+    if sort_by not in SWEEP_SORT_KEYS:
+        return {"error": f"Unknown sort_by: {sort_by} (one of {', '.join(SWEEP_SORT_KEYS)})"}
+    sign = -1 if SWEEP_SORT_KEYS[sort_by] else 1
+
+    q = scan_prices(symbol, start_date, end_date)
+    if q is None:
+        return {"error": f"No data found for {symbol}"}
+
+    try:
+        started = time_module.perf_counter()
+        windows = sorted(set(fast_values) | set(slow_values))
+        df = with_rolling_means(q.select(["time", "close"]), windows).collect()
+        close = df["close"].to_numpy().astype(np.float64)
+
+        multiplier = get_instrument(symbol).pip_multiplier
+
+        def evaluate_fast(fast):
+            slows = [slow for slow in sorted(set(slow_values)) if slow > fast]
+            if not slows:
+                return []
+            stats = evaluate_crossovers(close, sma_matrix(df, [fast])[0], sma_matrix(df, slows), multiplier)
+            return [{"fast": fast, "slow": slow, **st} for slow, st in zip(slows, stats)]
+
+        # NumPy releases the GIL on these array passes, so fast windows run side by side
+        with ThreadPoolExecutor(max_workers=SWEEP_WORKERS) as executor:
+            results = [r for batch in executor.map(evaluate_fast, sorted(set(fast_values))) for r in batch]
+
+        results.sort(key=lambda r: (r[sort_by] is None, sign * (r[sort_by] or 0)))
 
         return {
             "symbol": symbol,
             "period_start": start_date,
             "period_end": end_date,
-            "stats": {
-                "total_trades": count,
-                "win_rate": round(wins / count if count > 0 else 0, 4),
-                "total_pnl_pips": round(realized_pnl * multiplier, 2),
-                "profit_factor": 1.5 
-            },
-            "trades": trades,
-            "equity": equity_curve,
-            "indicators": indicators
+            "bars": len(close),
+            "combinations": len(results),
+            "elapsed_sec": round(time_module.perf_counter() - started, 3),
+            "results": results[:top] if top else results,
+        }
+
+    except Exception as e:
+        return {"error": str(e)}
+
+def walk_forward_windows(start_dt, end_dt, in_sample_days, out_sample_days):
+    """
+    (in-sample start, out-of-sample start, out-of-sample end) of each window.
+
+    Windows step by the out-of-sample length so the out-of-sample slices tile
+    the range; ends are exclusive and the last slice is cut at end_dt's day.
+    """
+    end_excl = end_dt + timedelta(days=1)
+    windows = []
+    t = start_dt
+    while t + timedelta(days=in_sample_days) < end_excl:
+        oos_start = t + timedelta(days=in_sample_days)
+        windows.append((t, oos_start, min(oos_start + timedelta(days=out_sample_days), end_excl)))
+        t += timedelta(days=out_sample_days)
+    return windows
+
+
+def run_walk_forward(symbol, start_date, end_date, fast_values, slow_values,
+                     in_sample_days=60, out_sample_days=20, objective="total_pnl_pips", max_points=None):
+    """
+    Walk-forward optimization of the SMA crossover.
+
+    Each window picks the (fast, slow) pair with the best `objective` on its
+    in-sample slice and trades it on the following out-of-sample slice. Prices
+    and every rolling mean are loaded once for the whole range (so in-sample
+    slices start with warmed-up averages) and shared by the windows, which are
+    evaluated side by side. Each out-of-sample slice opens its position at its
+    first bar and closes it at its last, so no position is carried across a
+    window boundary; the slices' equity is stitched window after window into
+    one curve whose last value is the out-of-sample total PnL.
+    """
+    if objective not in WALK_FORWARD_OBJECTIVES:
+        return {"error": f"Unknown objective: {objective}"}
+    pairs = [(f, s) for f in sorted(set(fast_values)) for s in sorted(set(slow_values)) if s > f]
+    if not pairs:
+        return {"error": "No (fast, slow) combination with fast < slow"}
+
+    q = scan_prices(symbol, start_date, end_date)
+    if q is None:
+        return {"error": f"No data found for {symbol}"}
+
+    try:
+        started = time_module.perf_counter()
+        df = with_rolling_means(q.select(["time", "close"]), [w for pair in pairs for w in pair]).collect()
+        close = df["close"].to_numpy().astype(np.float64)
+        epoch = df["time"].dt.epoch("s").to_numpy()
+        means = {w: sma_matrix(df, [w])[0] for w in {w for pair in pairs for w in pair}}
+        multiplier = get_instrument(symbol).pip_multiplier
+
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        end_dt = datetime.strptime(end_date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        windows = walk_forward_windows(start_dt, end_dt, in_sample_days, out_sample_days)
+        rank = lambda r: (r[objective] is not None, r[objective] or 0)
+
+        def evaluate_window(window):
+            a, b, c = np.searchsorted(epoch, [int(t.timestamp()) for t in window])
+            if b - a < 2 or c - b < 2:
+                return None
+
+            # In-sample: each fast window against all of its slow windows in one batch
+            candidates = []
+            for fast in sorted({f for f, _ in pairs}):
+                slows = [s for f, s in pairs if f == fast]
+                stats = evaluate_crossovers(close[a:b], means[fast][a:b],
+                                            np.vstack([means[s][a:b] for s in slows]), multiplier)
+                candidates.extend({"fast": fast, "slow": slow, **st} for slow, st in zip(slows, stats))
+            best = max(candidates, key=rank)
+            fast, slow = best.pop("fast"), best.pop("slow")
+
+            # Out-of-sample: the chosen pair, opening a position at the first bar of the slice
+            # and closing it at the last one
+            target = np.where(means[fast][b:c] > means[slow][b:c], 1, -1).astype(np.int8)
+            equity = mark_to_market(close[b:c], target)
+            pnl = trade_pnls(equity, target, close_last=True)
+            drawdown = (np.maximum.accumulate(equity) - equity).max()
+            return {
+                "in_sample_start": window[0].strftime("%Y-%m-%d"),
+                "in_sample_end": (window[1] - timedelta(days=1)).strftime("%Y-%m-%d"),
+                "out_sample_start": window[1].strftime("%Y-%m-%d"),
+                "out_sample_end": (window[2] - timedelta(days=1)).strftime("%Y-%m-%d"),
+                "fast": fast,
+                "slow": slow,
+                "in_sample": best,
+                "out_sample": crossover_stats(pnl, drawdown, multiplier),
+            }, (b, c, equity, pnl)
+
+        # NumPy releases the GIL on the slice passes, so windows run side by side on the shared arrays
+        with ThreadPoolExecutor(max_workers=SWEEP_WORKERS) as executor:
+            evaluated = [w for w in executor.map(evaluate_window, windows) if w is not None]
+
+        # Stitch the out-of-sample slices: each continues from the previous slice's last equity
+        # (its closed PnL, as the slice ends flat)
+        index, curve, pnls = [], [], []
+        offset = 0.0
+        for _, (b, c, equity, pnl) in evaluated:
+            index.append(np.arange(b, c))
+            curve.append(equity + offset)
+            pnls.append(pnl)
+            offset += equity[-1]
+        index = np.concatenate(index) if index else np.zeros(0, dtype=np.int64)
+        curve = np.concatenate(curve) if curve else np.zeros(0)
+        pnls = np.concatenate(pnls) if pnls else np.zeros(0)
+        drawdown = (np.maximum.accumulate(curve) - curve).max() if len(curve) else 0.0
+
+        times = iso_times(df["time"].gather(index))
+        return {
+            "symbol": symbol,
+            "period_start": start_date,
+            "period_end": end_date,
+            "in_sample_days": in_sample_days,
+            "out_sample_days": out_sample_days,
+            "objective": objective,
+            "bars": len(close),
+            "elapsed_sec": round(time_module.perf_counter() - started, 3),
+            "windows": [w for w, _ in evaluated],
+            "out_of_sample": crossover_stats(pnls, drawdown, multiplier),
+            "equity": series_points(times, curve * multiplier, 2, epoch[index].astype(np.float64), max_points),
         }
 
     except Exception as e:
@@ -0,0 +1,95 @@
+"""
+Indicator columns as one Polars plan with shared intermediate nodes.
+
+Every node (an SMA, an EMA, a rolling sum of gains, ...) is keyed by what it
+computes, so asking for MACD(12, 26) and EMA(12) adds the 12-period EMA
+once. Nodes are grouped into levels by dependency depth and each level is a
+single with_columns, so `IndicatorGraph.apply(q)` stays one lazy plan.
+
+The definitions match the chart pane in frontend/main.js: Bollinger bands use
+the population standard deviation, RSI sums the gains/losses of the last
+`length` bars, and EMAs are seeded with the first value (adjust=False).
+"""
+import polars as pl
+
+# Columns of the price frame that indicators can be computed from
+PRICE_COLUMNS = ("open", "high", "low", "close")
+
+
+class IndicatorGraph:
+    """Collects indicator nodes; each distinct node becomes one hidden column."""
+
+    def __init__(self):
+        self.levels = {name: 0 for name in PRICE_COLUMNS}
+        self.nodes = {}       # key -> column name
+        self.exprs = []       # [{column name: expr}] per level (level 1 first)
+
+    def add(self, key, build, deps):
+        """
+        Column for `key`, adding it on first use.
+
+        Args:
+            key: hashable description of the node (e.g. ("sma", "close", 20))
+            build: function of the dependency columns (pl.col) returning the expression
+            deps: column names the node reads (price columns or other nodes)
+        """
+        if key in self.nodes:
+            return self.nodes[key]
+        for dep in deps:
+            if dep not in self.levels:
+                raise ValueError(f"Unknown source column: {dep}")
+        name = "_" + "_".join(str(part) for part in key)
+        level = 1 + max(self.levels[dep] for dep in deps)
+        while len(self.exprs) < level:
+            self.exprs.append({})
+        self.exprs[level - 1][name] = build(*(pl.col(dep) for dep in deps)).alias(name)
+        self.levels[name] = level
+        self.nodes[key] = name
+        return name
+
+    def apply(self, q):
+        """Add every node column to the lazy frame q, one with_columns per level."""
+        for level in self.exprs:
+            q = q.with_columns(list(level.values()))
+        return q
+
+
+def sma(graph, src, length):
+    return graph.add(("sma", src, length), lambda s: s.rolling_mean(window_size=length), [src])
+
+
+def ema(graph, src, length):
+    return graph.add(("ema", src, length), lambda s: s.ewm_mean(span=length, adjust=False), [src])
+
+
+def stdev(graph, src, length):
+    return graph.add(("std", src, length), lambda s: s.rolling_std(window_size=length, ddof=0), [src])
+
+
+def rsi(graph, src, length):
+    gains = graph.add(("gains", src, length),
+                      lambda s: s.diff().clip(lower_bound=0).rolling_sum(window_size=length), [src])
+    losses = graph.add(("losses", src, length),
+                       lambda s: (-s.diff()).clip(lower_bound=0).rolling_sum(window_size=length), [src])
+    # Same guard as the chart for windows without a losing bar
+    return graph.add(("rsi", src, length),
+                     lambda g, l: 100 - 100 / (1 + g / pl.when(l == 0).then(0.001).otherwise(l)),
+                     [gains, losses])
+
+
+def macd(graph, src, fast, slow, signal):
+    """{"": MACD line, "signal": signal line, "hist": histogram}"""
+    line = graph.add(("macd", src, fast, slow), lambda f, s: f - s,
+                     [ema(graph, src, fast), ema(graph, src, slow)])
+    sig = ema(graph, line, signal)
+    hist = graph.add(("macdhist", src, fast, slow, signal), lambda m, s: m - s, [line, sig])
+    return {"": line, "signal": sig, "hist": hist}
+
+
+def bollinger(graph, src, length, mult):
+    """{"upper", "middle", "lower"} bands"""
+    middle = sma(graph, src, length)
+    sd = stdev(graph, src, length)
+    upper = graph.add(("bbupper", src, length, mult), lambda m, s: m + mult * s, [middle, sd])
+    lower = graph.add(("bblower", src, length, mult), lambda m, s: m - mult * s, [middle, sd])
+    return {"upper": upper, "middle": middle, "lower": lower}
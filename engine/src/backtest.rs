@@ -0,0 +1,110 @@
+//! Position simulation shared by the CLI and the Python extension.
+//!
+//! Mirrors `simulate_positions` in engine.py: a position is opened at the close
+//! of the first bar and of every bar whose target differs from the previous one,
+//! and closed at the next such bar. PnL and equity are in price units; callers
+//! convert to pips with the instrument's pip multiplier.
+
+use polars::prelude::*;
+
+pub struct Trade {
+    /// Bar index of the entry / exit close
+    pub entry: usize,
+    pub exit: usize,
+    /// 1 long, -1 short
+    pub direction: i8,
+    pub pnl: f64,
+}
+
+pub struct Book {
+    pub trades: Vec<Trade>,
+    /// Realized + floating PnL at every bar
+    pub equity: Vec<f64>,
+}
+
+impl Book {
+    pub fn realized_pnl(&self) -> f64 {
+        self.trades.iter().map(|t| t.pnl).sum()
+    }
+
+    pub fn wins(&self) -> usize {
+        self.trades.iter().filter(|t| t.pnl > 0.0).count()
+    }
+
+    /// Gross profit / gross loss of the closed trades (None without losing trades)
+    pub fn profit_factor(&self) -> Option<f64> {
+        let profit: f64 = self.trades.iter().filter(|t| t.pnl > 0.0).map(|t| t.pnl).sum();
+        let loss: f64 = -self.trades.iter().filter(|t| t.pnl < 0.0).map(|t| t.pnl).sum::<f64>();
+        if loss > 0.0 { Some(profit / loss) } else { None }
+    }
+}
+
+/// Target position per bar from the fast > slow signal (short while it is null).
+pub fn crossover_target<I: IntoIterator<Item = Option<bool>>>(bullish: I) -> Vec<i8> {
+    bullish
+        .into_iter()
+        .map(|b| if b == Some(true) { 1 } else { -1 })
+        .collect()
+}
+
+/// Step through `target` (1 long, -1 short, 0 flat) over the closing prices.
+pub fn simulate(close: &[f64], target: &[i8]) -> Book {
+    let n = close.len().min(target.len());
+    let mut trades = Vec::new();
+    let mut equity = Vec::with_capacity(n);
+    let mut position: i8 = 0;
+    let mut entry = 0usize;
+    let mut entry_price = 0.0;
+    let mut realized = 0.0;
+
+    for i in 0..n {
+        let price = close[i];
+        if i == 0 || target[i] != position {
+            if i > 0 && position != 0 {
+                let pnl = if position == 1 { price - entry_price } else { entry_price - price };
+                realized += pnl;
+                trades.push(Trade { entry, exit: i, direction: position, pnl });
+            }
+            position = target[i];
+            entry = i;
+            entry_price = price;
+        }
+
+        let floating = match position {
+            1 => price - entry_price,
+            -1 => -(price - entry_price),
+            _ => 0.0,
+        };
+        equity.push(realized + floating);
+    }
+
+    Book { trades, equity }
+}
+
+/// Run `simulate` on a frame with `close` (f64) and `bullish` (bool) columns.
+///
+/// A single-chunk `close` column without nulls is read in place; otherwise it
+/// is gathered into a contiguous buffer first.
+pub fn simulate_frame(df: &DataFrame) -> PolarsResult<Book> {
+    let close = df.column("close")?.f64()?;
+    let owned: Vec<f64>;
+    let prices = match close.cont_slice() {
+        Ok(slice) => slice,
+        Err(_) => {
+            owned = close.into_iter().map(|v| v.unwrap_or(f64::NAN)).collect();
+            &owned
+        }
+    };
+    let target = crossover_target(df.column("bullish")?.bool()?.into_iter());
+    Ok(simulate(prices, &target))
+}
+
+/// Closed trades as a frame: entry, exit (bar indices), direction, pnl.
+pub fn trades_frame(book: &Book) -> PolarsResult<DataFrame> {
+    DataFrame::new(vec![
+        Series::new("entry", book.trades.iter().map(|t| t.entry as i64).collect::<Vec<_>>()),
+        Series::new("exit", book.trades.iter().map(|t| t.exit as i64).collect::<Vec<_>>()),
+        Series::new("direction", book.trades.iter().map(|t| t.direction as i32).collect::<Vec<_>>()),
+        Series::new("pnl", book.trades.iter().map(|t| t.pnl).collect::<Vec<_>>()),
+    ])
+}
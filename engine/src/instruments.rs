@@ -0,0 +1,46 @@
+//! Per-symbol instrument table (mirrors backend/instruments.py).
+
+#[allow(dead_code)] // contract_size/precision are not used by the CLI yet
+pub struct Instrument {
+    /// bi5 integer price divisor (price = points / point_divisor)
+    pub point_divisor: f64,
+    /// Price distance of one pip
+    pub pip_size: f64,
+    /// Units per standard lot
+    pub contract_size: f64,
+    /// Price decimals
+    pub precision: u32,
+}
+
+const FIVE_DIGIT: Instrument = Instrument { point_divisor: 100_000.0, pip_size: 0.0001, contract_size: 100_000.0, precision: 5 };
+const JPY_QUOTED: Instrument = Instrument { point_divisor: 1_000.0, pip_size: 0.01, contract_size: 100_000.0, precision: 3 };
+
+/// Known symbols; anything else is derived from the quote currency.
+const INSTRUMENTS: &[(&str, &Instrument)] = &[
+    ("EURUSD", &FIVE_DIGIT),
+    ("GBPUSD", &FIVE_DIGIT),
+    ("AUDUSD", &FIVE_DIGIT),
+    ("NZDUSD", &FIVE_DIGIT),
+    ("USDCAD", &FIVE_DIGIT),
+    ("USDCHF", &FIVE_DIGIT),
+    ("EURGBP", &FIVE_DIGIT),
+    ("USDJPY", &JPY_QUOTED),
+    ("EURJPY", &JPY_QUOTED),
+    ("GBPJPY", &JPY_QUOTED),
+    ("AUDJPY", &JPY_QUOTED),
+];
+
+pub fn get_instrument(symbol: &str) -> &'static Instrument {
+    let symbol = symbol.to_ascii_uppercase();
+    if let Some((_, instrument)) = INSTRUMENTS.iter().find(|(name, _)| *name == symbol) {
+        return instrument;
+    }
+    if symbol.ends_with("JPY") { &JPY_QUOTED } else { &FIVE_DIGIT }
+}
+
+impl Instrument {
+    /// Factor converting a price difference to pips (1 / pip_size)
+    pub fn pip_multiplier(&self) -> f64 {
+        (1.0 / self.pip_size).round()
+    }
+}
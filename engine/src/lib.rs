@@ -0,0 +1,52 @@
+//! fxlab_engine: backtest core shared by the CLI and the Python extension module.
+//!
+//! Built with `--features python` (see pyproject.toml / maturin) the crate is an
+//! importable `fxlab_engine` module. Polars frames cross the boundary through the
+//! Arrow C data interface, so the price columns are not copied or serialized.
+
+pub mod backtest;
+pub mod instruments;
+
+#[cfg(feature = "python")]
+mod python {
+    use pyo3::exceptions::PyValueError;
+    use pyo3::prelude::*;
+    use pyo3_polars::PyDataFrame;
+
+    use crate::backtest::{simulate_frame as simulate_df, trades_frame};
+    use crate::instruments::get_instrument;
+
+    /// simulate_frame(frame) -> (trades, equity)
+    ///
+    /// `frame` needs `close` (Float64) and `bullish` (Boolean, null = short).
+    /// Returns the closed trades (entry, exit, direction, pnl) and a one-column
+    /// `equity` frame (price units), matching engine.simulate_positions.
+    #[pyfunction]
+    fn simulate_frame(py: Python<'_>, frame: PyDataFrame) -> PyResult<(PyDataFrame, PyDataFrame)> {
+        let df = frame.0;
+        // The simulation never touches Python objects; let other requests run meanwhile
+        let result = py.allow_threads(|| {
+            let book = simulate_df(&df)?;
+            let trades = trades_frame(&book)?;
+            let equity = polars::prelude::DataFrame::new(vec![
+                polars::prelude::Series::new("equity", book.equity),
+            ])?;
+            Ok::<_, polars::prelude::PolarsError>((trades, equity))
+        });
+        let (trades, equity) = result.map_err(|e| PyValueError::new_err(e.to_string()))?;
+        Ok((PyDataFrame(trades), PyDataFrame(equity)))
+    }
+
+    /// pip_multiplier(symbol) -> float, from the same table as the CLI
+    #[pyfunction]
+    fn pip_multiplier(symbol: &str) -> f64 {
+        get_instrument(symbol).pip_multiplier()
+    }
+
+    #[pymodule]
+    fn fxlab_engine(_py: Python<'_>, m: &PyModule) -> PyResult<()> {
+        m.add_function(wrap_pyfunction!(simulate_frame, m)?)?;
+        m.add_function(wrap_pyfunction!(pip_multiplier, m)?)?;
+        Ok(())
+    }
+}
@@ -1,8 +1,11 @@
 use anyhow::{Context, Result};
+use chrono::{DateTime, Datelike, NaiveDate};
 use clap::Parser;
+use fxlab_engine::backtest::{crossover_target, simulate};
+use fxlab_engine::instruments::get_instrument;
 use polars::prelude::*;
 use serde::Serialize;
-use std::path::PathBuf;
+use std::path::{Path, PathBuf};
 
 #[derive(Parser, Debug)]
 #[command(author, version, about, long_about = None)]
@@ -21,96 +24,194 @@ struct Args {
 
     #[arg(long, default_value = "50")]
     slow_period: usize,
+
+    /// Root of the monthly files ({symbol}/{year}/{MM}.parquet, MM 0-indexed)
+    #[arg(long, default_value = "../parquet_data")]
+    data_dir: PathBuf,
 }
 
+// Output mirrors engine.run_backtest (same keys, rounding and time format)
+
 #[derive(Serialize)]
-struct BacktestResult {
+struct Point {
+    time: String,
+    value: f64,
+}
+
+#[derive(Serialize)]
+struct TradeRecord {
+    entry_time: String,
+    exit_time: String,
+    entry_price: f64,
+    exit_price: f64,
+    #[serde(rename = "type")]
+    kind: &'static str,
+    pnl: f64,
+}
+
+#[derive(Serialize)]
+struct Stats {
     total_trades: usize,
-    total_pnl: f64,
     win_rate: f64,
+    total_pnl_pips: f64,
+    profit_factor: Option<f64>,
 }
 
-fn main() -> Result<()> {
-    let args = Args::parse();
-    
-    // Parquet file path discovery (Simplified glob optimization)
-    // Looking for files in ../parquet_data/{symbol}/{year}/{month}/{day}.parquet
-    let base_path = format!("../parquet_data/{}/**/*.parquet", args.symbol);
-    
-    // Create ScanArgs
-    let scan_args = ScanArgsParquet::default();
-
-    // Lazy load
-    let lf = LazyFrame::scan_parquet(&base_path, scan_args)?
-        .with_columns(vec![
-            col("time").cast(DataType::Datetime(TimeUnit::Nanoseconds, None)),
-        ])
-        .filter(
-            col("time").gt_eq(lit(NaiveDate::parse_from_str(&args.start, "%Y-%m-%d")?.and_hms_opt(0, 0, 0).unwrap()))
-            .and(col("time").lt_eq(lit(NaiveDate::parse_from_str(&args.end, "%Y-%m-%d")?.and_hms_opt(23, 59, 59).unwrap())))
-        )
-        .sort("time", Default::default());
-
-    // Strategy Execution (Vectorized)
-    // 1. Calc SMAs
-    // 2. Determine Signal
-    let strategy_lf = lf
-        .with_columns(vec![
-            col("close").rolling_mean(RollingOptions { window_size: Duration::new(args.fast_period as i64), min_periods: args.fast_period, ..Default::default() }).alias("fast_sma"),
-            col("close").rolling_mean(RollingOptions { window_size: Duration::new(args.slow_period as i64), min_periods: args.slow_period, ..Default::default() }).alias("slow_sma"),
-        ])
-        .with_columns(vec![
-            (col("fast_sma").gt(col("slow_sma"))).alias("bullish"),
-        ])
-        .with_columns(vec![
-            (col("bullish").neq(col("bullish").shift(1))).alias("crossover"),
-        ])
-        .filter(col("crossover"))
-        .select(vec![
-            col("time"),
-            col("close"),
-            col("bullish"), // True = Golden Cross (Buy), False = Dead Cross (Sell)
-        ]);
-
-    // Collect result processing in memory (Usually minimal result set)
-    let df = strategy_lf.collect()?;
-    
-    // Simple PnL Calculation (FIFO in memory iterate)
-    // For simplicity: Always in market. Buy at Golden, Sell at Dead.
-    let closes = df.column("close")?.f64()?;
-    let bullish = df.column("bullish")?.bool()?;
-    
-    let mut balance = 0.0;
-    let mut position = 0; // 0: None, 1: Long, -1: Short
-    let mut entry_price = 0.0;
-    let mut winning_trades = 0;
-    let mut total_trades = 0;
-
-    for i in 0..df.height() {
-        let price = closes.get(i).unwrap();
-        let is_buy_signal = bullish.get(i).unwrap();
-        
-        // Close existing
-        if position != 0 {
-            let pnl = if position == 1 { price - entry_price } else { entry_price - price };
-            balance += pnl * 10000.0; // 1 lot = 100k, mini 10k? Let's say 10k units
-            if pnl > 0.0 { winning_trades += 1; }
-            total_trades += 1;
+#[derive(Serialize)]
+struct Indicators {
+    fast_sma: Vec<Point>,
+    slow_sma: Vec<Point>,
+}
+
+#[derive(Serialize)]
+struct BacktestResult {
+    symbol: String,
+    period_start: String,
+    period_end: String,
+    stats: Stats,
+    trades: Vec<TradeRecord>,
+    equity: Vec<Point>,
+    indicators: Indicators,
+}
+
+/// Files overlapping [start, end], same as bi5_reader.month_partitions: the monthly
+/// file ({MM}.parquet) when it exists, otherwise the month's daily files ({MM}/{DD}.parquet)
+fn month_partitions(data_dir: &Path, symbol: &str, start: NaiveDate, end: NaiveDate) -> Vec<PathBuf> {
+    let mut files = Vec::new();
+    let (mut year, mut month) = (start.year(), start.month0());
+    while (year, month) <= (end.year(), end.month0()) {
+        let year_dir = data_dir.join(symbol).join(year.to_string());
+        let path = year_dir.join(format!("{:02}.parquet", month));
+        let month_dir = year_dir.join(format!("{:02}", month));
+        if path.exists() {
+            files.push(path);
+        } else if let Ok(entries) = std::fs::read_dir(&month_dir) {
+            let first_day = if (year, month) == (start.year(), start.month0()) { start.day() } else { 1 };
+            let last_day = if (year, month) == (end.year(), end.month0()) { end.day() } else { 31 };
+            let mut days: Vec<PathBuf> = entries
+                .filter_map(|e| e.ok().map(|e| e.path()))
+                .filter(|p| p.extension().is_some_and(|ext| ext == "parquet"))
+                .filter(|p| {
+                    p.file_stem()
+                        .and_then(|s| s.to_str())
+                        .and_then(|s| s.parse::<u32>().ok())
+                        .is_some_and(|day| first_day <= day && day <= last_day)
+                })
+                .collect();
+            days.sort();
+            files.extend(days);
         }
-        
-        // Open new
-        if is_buy_signal {
-            position = 1;
+        if month == 11 {
+            year += 1;
+            month = 0;
         } else {
-            position = -1;
+            month += 1;
         }
-        entry_price = price;
     }
+    files
+}
+
+/// Python's round(x, digits): round on the exact decimal expansion
+fn round_to(x: f64, digits: usize) -> f64 {
+    format!("{:.*}", digits, x).parse().unwrap_or(x)
+}
+
+/// Same format as engine.iso_times (e.g. 2025-01-02T03:04:00+00:00)
+fn iso_time(ms: i64) -> String {
+    DateTime::from_timestamp_millis(ms)
+        .map(|t| t.format("%Y-%m-%dT%H:%M:%S+00:00").to_string())
+        .unwrap_or_default()
+}
+
+fn series_points(times: &[String], values: &[Option<f64>], digits: usize) -> Vec<Point> {
+    times
+        .iter()
+        .zip(values)
+        .filter_map(|(time, v)| v.map(|v| Point { time: time.clone(), value: round_to(v, digits) }))
+        .collect()
+}
+
+fn main() -> Result<()> {
+    let args = Args::parse();
+
+    let start = NaiveDate::parse_from_str(&args.start, "%Y-%m-%d").context("invalid --start")?;
+    let end = NaiveDate::parse_from_str(&args.end, "%Y-%m-%d").context("invalid --end")?;
+    let files = month_partitions(&args.data_dir, &args.symbol, start, end);
+    if files.is_empty() {
+        println!("{}", serde_json::json!({ "error": format!("No data found for {}", args.symbol) }));
+        return Ok(());
+    }
+
+    let start_ms = start.and_hms_opt(0, 0, 0).unwrap().and_utc().timestamp_millis();
+    let end_ms = end.and_hms_opt(23, 59, 59).unwrap().and_utc().timestamp_millis();
+
+    // Monthly files differ in extra columns and time unit: scan each, keep epoch ms + close
+    let frames = files
+        .iter()
+        .map(|f| {
+            Ok(LazyFrame::scan_parquet(f, ScanArgsParquet::default())?.select([
+                col("time").dt().timestamp(TimeUnit::Milliseconds).alias("ts"),
+                col("close").cast(DataType::Float64),
+            ]))
+        })
+        .collect::<PolarsResult<Vec<_>>>()?;
+
+    // Every bar is kept: the equity curve and indicators cover the whole range
+    let rolling = |n: usize| RollingOptions { window_size: Duration::new(n as i64), min_periods: n, ..Default::default() };
+    let df = concat(&frames, UnionArgs::default())?
+        .filter(col("ts").gt_eq(lit(start_ms)).and(col("ts").lt_eq(lit(end_ms))))
+        .sort("ts", Default::default())
+        .with_columns(vec![
+            col("close").rolling_mean(rolling(args.fast_period)).alias("fast_sma"),
+            col("close").rolling_mean(rolling(args.slow_period)).alias("slow_sma"),
+        ])
+        .collect()?;
+
+    let ts: Vec<i64> = df.column("ts")?.i64()?.into_no_null_iter().collect();
+    let close: Vec<f64> = df.column("close")?.f64()?.into_no_null_iter().collect();
+    let fast: Vec<Option<f64>> = df.column("fast_sma")?.f64()?.into_iter().collect();
+    let slow: Vec<Option<f64>> = df.column("slow_sma")?.f64()?.into_iter().collect();
+    let times: Vec<String> = ts.iter().map(|&ms| iso_time(ms)).collect();
+
+    // Long while fast > slow, short otherwise (also before both averages exist)
+    let bullish = fast.iter().zip(&slow).map(|(f, s)| Some((*f)? > (*s)?));
+    let book = simulate(&close, &crossover_target(bullish));
+
+    // Pip conversion from the instrument table (JPY crosses: 0.01, others: 0.0001)
+    let pip_multiplier = get_instrument(&args.symbol).pip_multiplier();
+
+    let trades = book
+        .trades
+        .iter()
+        .map(|t| TradeRecord {
+            entry_time: times[t.entry].clone(),
+            exit_time: times[t.exit].clone(),
+            entry_price: close[t.entry],
+            exit_price: close[t.exit],
+            kind: if t.direction == 1 { "LONG" } else { "SHORT" },
+            pnl: t.pnl,
+        })
+        .collect::<Vec<_>>();
+
+    let count = trades.len();
+    let equity = book.equity.iter().map(|&e| Some(e * pip_multiplier)).collect::<Vec<_>>();
 
     let result = BacktestResult {
-        total_trades,
-        total_pnl: balance,
-        win_rate: if total_trades > 0 { winning_trades as f64 / total_trades as f64 } else { 0.0 },
+        symbol: args.symbol.clone(),
+        period_start: args.start.clone(),
+        period_end: args.end.clone(),
+        stats: Stats {
+            total_trades: count,
+            win_rate: round_to(if count > 0 { book.wins() as f64 / count as f64 } else { 0.0 }, 4),
+            total_pnl_pips: round_to(book.realized_pnl() * pip_multiplier, 2),
+            profit_factor: book.profit_factor().map(|pf| round_to(pf, 4)),
+        },
+        trades,
+        equity: series_points(&times, &equity, 2),
+        indicators: Indicators {
+            fast_sma: series_points(&times, &fast, 5),
+            slow_sma: series_points(&times, &slow, 5),
+        },
     };
 
     println!("{}", serde_json::to_string(&result)?);
@@ -0,0 +1,228 @@
+"""
+JSON strategy specs compiled into a single Polars lazy plan.
+
+A spec names indicator nodes and combines them into entry/exit rules:
+
+    {
+      "indicators": {
+        "rsi":  {"type": "rsi", "length": 14},
+        "bb":   {"type": "bollinger", "length": 20, "mult": 2},
+        "macd": {"type": "macd", "fast": 12, "slow": 26, "signal": 9}
+      },
+      "long":  {"entry": {"all": [{"cross_above": ["close", "bb.lower"]}, {"lt": ["rsi", 30]}]},
+                "exit":  {"gt": ["close", "bb.middle"]}},
+      "short": {"entry": {"cross_below": ["macd", "macd.signal"]},
+                "exit":  {"cross_above": ["macd", "macd.signal"]}}
+    }
+
+Indicator types: sma/ema (length, source), rsi (length, source), macd (fast,
+slow, signal, source; outputs NAME, NAME.signal, NAME.hist) and bollinger
+(length, mult, source; outputs NAME.upper, NAME.middle, NAME.lower). source is
+a price column (default "close") or an earlier indicator.
+
+Rules: gt/lt [a, b], cross_above/cross_below [a, b] (a crosses b on this
+bar), all/any [rules...], not rule. Operands are indicator outputs, price
+columns or numbers.
+
+Positions: an entry opens (or reverses into) its side at the bar's close and
+the position is held until that side's exit rule fires or the other side's
+entry does. A long entry wins when both entries fire on the same bar. Sides
+without an entry rule are never taken; a missing exit rule means the position
+is only closed by a reversal.
+
+Indicators and rule columns are nodes of an IndicatorGraph keyed by their
+parameters, so an indicator (or a cross) used by several rules is computed
+once, and the position target is derived with window expressions in the same
+plan.
+"""
+import json
+
+import polars as pl
+
+import indicators as ind
+
+# Indicator types drawn on the price chart; the others are oscillators
+OVERLAY_TYPES = {"sma", "ema", "bollinger"}
+
+
+class StrategyError(ValueError):
+    """Invalid strategy spec."""
+
+
+def _length(params, key, default=None):
+    value = params.get(key, default)
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise StrategyError(f"'{key}' must be a positive integer")
+    return value
+
+
+class StrategyPlan:
+    """
+    Compiled spec.
+
+    Attributes:
+        graph: IndicatorGraph with every indicator and rule column
+        target: expression of the position per bar (1 long, -1 short, 0 flat)
+        overlays / oscillators: {display name: column} of the indicator outputs
+    """
+
+    def __init__(self, spec):
+        if not isinstance(spec, dict):
+            raise StrategyError("strategy must be a JSON object")
+        self.graph = ind.IndicatorGraph()
+        self.outputs = {}       # operand name -> column
+        self.overlays = {}
+        self.oscillators = {}
+        self._rules = {}
+
+        for name, params in (spec.get("indicators") or {}).items():
+            self._add_indicator(name, params)
+
+        sides = {}
+        for side in ("long", "short"):
+            rules = spec.get(side) or {}
+            if not isinstance(rules, dict):
+                raise StrategyError(f"'{side}' must be an object with 'entry'/'exit' rules")
+            sides[side] = {
+                key: self._rule(rules[key]) if rules.get(key) is not None else None
+                for key in ("entry", "exit")
+            }
+        if sides["long"]["entry"] is None and sides["short"]["entry"] is None:
+            raise StrategyError("at least one of long.entry / short.entry is required")
+        self.target = self._target(sides)
+
+    def apply(self, q):
+        """Add the indicator/rule columns and `target` to the lazy price frame q."""
+        return self.graph.apply(q).with_columns(self.target.alias("target"))
+
+    @property
+    def display_columns(self):
+        return list(dict.fromkeys([*self.overlays.values(), *self.oscillators.values()]))
+
+    def _source(self, params):
+        source = params.get("source", "close")
+        if source in ind.PRICE_COLUMNS:
+            return source, True
+        if source not in self.outputs:
+            raise StrategyError(f"unknown source '{source}' (define it before use)")
+        return self.outputs[source], source in self.overlays
+
+    def _add_indicator(self, name, params):
+        if not isinstance(params, dict) or "type" not in params:
+            raise StrategyError(f"indicator '{name}' needs a 'type'")
+        if name in ind.PRICE_COLUMNS or name in self.outputs:
+            raise StrategyError(f"indicator name '{name}' is already used")
+        kind = params["type"]
+        src, on_price = self._source(params)
+
+        if kind == "sma":
+            outputs = {"": ind.sma(self.graph, src, _length(params, "length"))}
+        elif kind == "ema":
+            outputs = {"": ind.ema(self.graph, src, _length(params, "length"))}
+        elif kind == "rsi":
+            outputs = {"": ind.rsi(self.graph, src, _length(params, "length", 14))}
+        elif kind == "macd":
+            outputs = ind.macd(self.graph, src, _length(params, "fast", 12), _length(params, "slow", 26),
+                               _length(params, "signal", 9))
+        elif kind == "bollinger":
+            mult = params.get("mult", 2)
+            if not isinstance(mult, (int, float)) or isinstance(mult, bool):
+                raise StrategyError(f"'mult' of '{name}' must be a number")
+            outputs = ind.bollinger(self.graph, src, _length(params, "length", 20), mult)
+        else:
+            raise StrategyError(f"unknown indicator type '{kind}'")
+
+        display = self.overlays if kind in OVERLAY_TYPES and on_price else self.oscillators
+        for suffix, column in outputs.items():
+            label = f"{name}.{suffix}" if suffix else name
+            self.outputs[label] = column
+            display[label] = column
+
+    def _operand(self, value):
+        """(column, None) for indicator outputs and price columns, (None, number) for constants"""
+        if isinstance(value, bool):
+            raise StrategyError("operands must be indicator names, price columns or numbers")
+        if isinstance(value, (int, float)):
+            return None, float(value)
+        if not isinstance(value, str):
+            raise StrategyError(f"unknown operand {value!r}")
+        if value in ind.PRICE_COLUMNS:
+            return value, None
+        if value in self.outputs:
+            return self.outputs[value], None
+        raise StrategyError(f"unknown operand '{value}'")
+
+    def _rule(self, rule):
+        """Column of a rule (bool per bar); identical rules share one column."""
+        if not isinstance(rule, dict) or len(rule) != 1:
+            raise StrategyError(f"a rule is an object with exactly one operator: {rule!r}")
+        key = json.dumps(rule, sort_keys=True)
+        if key in self._rules:
+            return self._rules[key]
+        (op, args), = rule.items()
+
+        if op in ("all", "any", "not"):
+            parts = [args] if op == "not" else args
+            if not isinstance(parts, list) or not parts:
+                raise StrategyError(f"'{op}' needs a list of rules")
+            deps = [self._rule(part) for part in parts]
+            combine = {
+                "all": lambda *cols: pl.all_horizontal(cols),
+                "any": lambda *cols: pl.any_horizontal(cols),
+                "not": lambda col: ~col,
+            }[op]
+        elif op in ("gt", "lt", "cross_above", "cross_below"):
+            if not isinstance(args, list) or len(args) != 2:
+                raise StrategyError(f"'{op}' needs two operands")
+            operands = [self._operand(arg) for arg in args]
+            if all(column is None for column, _ in operands):
+                raise StrategyError(f"'{op}' needs at least one non-constant operand")
+            # Column operands are dependencies of the rule node, constants are baked in
+            deps = [column for column, _ in operands if column is not None]
+
+            def combine(*cols, operands=operands, op=op):
+                refs = iter(cols)
+                # (this bar, previous bar) of each operand; a constant is the same on both
+                # (shifting a literal gives null, which would never cross)
+                terms = []
+                for column, value in operands:
+                    expr = next(refs) if column is not None else pl.lit(value)
+                    terms.append((expr, expr.shift(1) if column is not None else expr))
+                (a, a_prev), (b, b_prev) = terms
+                if op in ("lt", "cross_below"):
+                    (a, a_prev), (b, b_prev) = (b, b_prev), (a, a_prev)
+                if op.startswith("cross"):
+                    # a moves from at or below b to above it on this bar
+                    return (a > b) & (a_prev <= b_prev)
+                return a > b
+        else:
+            raise StrategyError(f"unknown rule operator '{op}'")
+
+        column = self.graph.add(("rule", len(self._rules)), lambda *cols: combine(*cols).fill_null(False), deps)
+        self._rules[key] = column
+        return column
+
+    def _target(self, sides):
+        """Position per bar from the entry/exit rule columns (see module docstring)."""
+        never = pl.lit(False)
+        rule = lambda column: pl.col(column) if column is not None else never
+        long_entry, short_entry = rule(sides["long"]["entry"]), rule(sides["short"]["entry"])
+        long_exit, short_exit = rule(sides["long"]["exit"]), rule(sides["short"]["exit"])
+
+        entry = pl.when(long_entry).then(1).when(short_entry).then(-1).otherwise(None)
+        side = entry.forward_fill().fill_null(0)
+        # Exit of the side currently held; an entry on the same bar takes priority
+        exits = (entry.is_null() & (((side == 1) & long_exit) | ((side == -1) & short_exit))).cast(pl.Int8)
+        # Flat from the first exit after the latest entry until the next entry
+        flat = exits.cum_max().over(entry.is_not_null().cum_sum())
+        return pl.when(flat == 1).then(0).otherwise(side).cast(pl.Int8)
+
+
+def compile_strategy(spec):
+    """Compile a spec (dict or JSON text) into a StrategyPlan; raises StrategyError."""
+    if isinstance(spec, str):
+        try:
+            spec = json.loads(spec)
+        except ValueError as e:
+            raise StrategyError(f"not valid JSON: {e}") from None
+    return StrategyPlan(spec)
@@ -0,0 +1,161 @@
+"""
+Regression check: run_backtest against the original per-bar Python loop.
+
+The legacy loop below is the implementation run_backtest used before trades and
+equity were computed columnar. Both must return identical results (trades,
+every equity point, indicators and stats) for each case. When the fxlab_engine
+extension is installed, run_backtest(native=True) is checked the same way.
+
+Usage:
+    python verify_engine.py
+    python verify_engine.py --symbol USDJPY --start 2025-01-01 --end 2025-03-31 --fast 10 --slow 30
+"""
+import argparse
+import sys
+import time
+
+import polars as pl
+
+import engine
+from engine import run_backtest, scan_prices
+
+DEFAULT_CASES = [
+    ("EURUSD", "2025-01-01", "2025-01-31", 20, 50),
+    ("EURUSD", "2024-01-01", "2024-12-31", 20, 50),
+    ("USDJPY", "2025-03-01", "2025-03-31", 5, 200),
+    ("GBPJPY", "2024-06-01", "2024-06-30", 50, 51),
+    ("EURGBP", "2023-02-01", "2023-02-02", 3, 7),
+]
+
+
+def legacy_run_backtest(symbol, start_date, end_date, fast_sma, slow_sma):
+    """The original implementation (bar loop over full_data.rows())."""
+    q = scan_prices(symbol, start_date, end_date)
+    if q is None:
+        return {"error": f"No data found for {symbol}"}
+
+    q = q.with_columns([
+        pl.col("close").rolling_mean(window_size=fast_sma).alias("fast"),
+        pl.col("close").rolling_mean(window_size=slow_sma).alias("slow"),
+    ])
+    q = q.with_columns((pl.col("fast") > pl.col("slow")).alias("bullish"))
+    full_data = q.select(["time", "close", "bullish", "fast", "slow"]).collect()
+
+    trades = []
+    equity_curve = []
+    position = 0
+    entry_price = 0.0
+    entry_time = None
+    realized_pnl = 0.0
+    wins = 0
+    count = 0
+    gross_profit = gross_loss = 0.0
+    multiplier = 100 if "JPY" in symbol else 10000
+
+    for row in full_data.rows(named=True):
+        price = row['close']
+        bar_time = row['time']
+        signal_target = 1 if row['bullish'] else -1
+
+        if position != signal_target:
+            if position != 0:
+                pnl = price - entry_price if position == 1 else entry_price - price
+                realized_pnl += pnl
+                if pnl > 0: wins += 1
+                if pnl > 0: gross_profit += pnl
+                if pnl < 0: gross_loss -= pnl
+                count += 1
+                trades.append({
+                    "entry_time": entry_time.isoformat(),
+                    "exit_time": bar_time.isoformat(),
+                    "entry_price": entry_price,
+                    "exit_price": price,
+                    "type": "LONG" if position == 1 else "SHORT",
+                    "pnl": pnl
+                })
+            position = signal_target
+            entry_price = price
+            entry_time = bar_time
+
+        floating_pnl = 0.0
+        if position == 1:
+            floating_pnl = price - entry_price
+        elif position == -1:
+            floating_pnl = entry_price - price
+        equity_curve.append({
+            "time": bar_time.isoformat(),
+            "value": round((realized_pnl + floating_pnl) * multiplier, 2)
+        })
+
+    indicators = {
+        "fast_sma": [{"time": row['time'].isoformat(), "value": round(row['fast'], 5)} for row in full_data.rows(named=True) if row['fast'] is not None],
+        "slow_sma": [{"time": row['time'].isoformat(), "value": round(row['slow'], 5)} for row in full_data.rows(named=True) if row['slow'] is not None]
+    }
+
+    return {
+        "symbol": symbol,
+        "period_start": start_date,
+        "period_end": end_date,
+        "stats": {
+            "total_trades": count,
+            "win_rate": round(wins / count if count > 0 else 0, 4),
+            "total_pnl_pips": round(realized_pnl * multiplier, 2),
+            "profit_factor": round(gross_profit / gross_loss, 4) if gross_loss > 0 else None
+        },
+        "trades": trades,
+        "equity": equity_curve,
+        "indicators": indicators
+    }
+
+
+def first_difference(expected, actual):
+    """Describe the first mismatching key/index, or None when equal."""
+    for key in expected:
+        if expected[key] == actual.get(key):
+            continue
+        if isinstance(expected[key], list):
+            for i, (a, b) in enumerate(zip(expected[key], actual[key])):
+                if a != b:
+                    return f"{key}[{i}]: {a} != {b}"
+            return f"{key}: length {len(expected[key])} != {len(actual[key])}"
+        if isinstance(expected[key], dict):
+            return first_difference(expected[key], actual[key]) or key
+        return f"{key}: {expected[key]} != {actual.get(key)}"
+    return None
+
+
+def check(symbol, start, end, fast, slow):
+    started = time.perf_counter()
+    expected = legacy_run_backtest(symbol, start, end, fast, slow)
+    legacy_sec = time.perf_counter() - started
+
+    started = time.perf_counter()
+    actual = run_backtest(symbol, start, end, fast, slow, native=engine.fxlab_engine is not None)
+    new_sec = time.perf_counter() - started
+
+    label = f"{symbol} {start}..{end} {fast}/{slow} [{'rust' if engine.fxlab_engine else 'numpy'}]"
+    if "error" in expected:
+        print(f"SKIP {label}: {expected['error']}")
+        return True
+
+    diff = first_difference(expected, actual)
+    status = "OK  " if diff is None else "FAIL"
+    print(f"{status} {label}: {len(expected['equity'])} bars, {expected['stats']['total_trades']} trades, "
+          f"loop {legacy_sec:.2f}s -> {new_sec:.2f}s")
+    if diff is not None:
+        print(f"     first difference: {diff}")
+    return diff is None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare run_backtest with the legacy bar loop")
+    parser.add_argument("--symbol")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--fast", type=int, default=20)
+    parser.add_argument("--slow", type=int, default=50)
+    args = parser.parse_args()
+
+    cases = [(args.symbol, args.start, args.end, args.fast, args.slow)] if args.symbol else DEFAULT_CASES
+    ok = all([check(*case) for case in cases])
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,119 @@
+"""
+Golden-file check: both engines must reproduce the stored run_backtest output.
+
+Each golden file under golden/ is the full run_backtest response (stats,
+trades, every equity point and both indicators) for a sample month, written
+by the Python engine with --update. A check compares, per case:
+
+- run_backtest on the NumPy path
+- run_backtest through the fxlab_engine extension (if installed)
+- the Rust CLI (if built; cargo build --release)
+
+Usage:
+    python verify_golden.py
+    python verify_golden.py --update
+    python verify_golden.py --cli /tmp/target/release/fxlab_engine
+    python verify_golden.py --require-native   # fail unless the extension and the CLI both ran
+"""
+import argparse
+import gzip
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import engine
+from engine import run_backtest
+from verify_engine import first_difference
+
+ENGINE_DIR = Path(__file__).resolve().parent
+GOLDEN_DIR = ENGINE_DIR / "golden"
+DEFAULT_CLI = ENGINE_DIR / "target" / "release" / "fxlab_engine"
+
+GOLDEN_CASES = [
+    ("EURUSD", "2025-01-01", "2025-01-31", 20, 50),
+    ("USDJPY", "2025-03-01", "2025-03-31", 5, 200),
+]
+
+
+def golden_file(symbol, start, end, fast, slow):
+    return GOLDEN_DIR / f"{symbol}_{start}_{end}_{fast}_{slow}.json.gz"
+
+
+def load_golden(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_golden(path, result):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # mtime=0 keeps the file byte-identical when the output does not change
+    with open(path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+        f.write(json.dumps(result, separators=(",", ":")).encode("utf-8"))
+
+
+def run_cli(cli, symbol, start, end, fast, slow):
+    """run_backtest output from the Rust binary (run from engine/ like the server)"""
+    proc = subprocess.run(
+        [str(cli), "--symbol", symbol, "--start", start, "--end", end,
+         "--fast-period", str(fast), "--slow-period", str(slow)],
+        cwd=ENGINE_DIR, capture_output=True, text=True, check=True,
+    )
+    return json.loads(proc.stdout)
+
+
+def engines(cli):
+    """(name, callable) for every engine available here"""
+    found = [("numpy", lambda *case: run_backtest(*case, native=False))]
+    if engine.fxlab_engine is not None:
+        found.append(("rust-ext", lambda *case: run_backtest(*case, native=True)))
+    if cli.exists():
+        found.append(("rust-cli", lambda *case: run_cli(cli, *case)))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare both engines with the golden run_backtest outputs")
+    parser.add_argument("--update", action="store_true", help="Rewrite the golden files from the Python engine")
+    parser.add_argument("--cli", type=Path, default=DEFAULT_CLI, help="Path to the fxlab_engine binary")
+    parser.add_argument("--require-native", action="store_true",
+                        help="Fail when the extension or the CLI is not available instead of skipping it")
+    args = parser.parse_args()
+
+    if args.update:
+        for case in GOLDEN_CASES:
+            result = run_backtest(*case, native=False)
+            if "error" in result:
+                print(f"FAIL {case}: {result['error']}")
+                return 1
+            save_golden(golden_file(*case), result)
+            print(f"wrote {golden_file(*case).name}: {len(result['equity'])} bars, "
+                  f"{result['stats']['total_trades']} trades")
+        return 0
+
+    available = engines(args.cli)
+    print(f"engines: {', '.join(name for name, _ in available)}")
+    if not args.cli.exists():
+        print(f"     (no CLI at {args.cli}, skipping rust-cli)")
+    missing = {"rust-ext", "rust-cli"} - {name for name, _ in available}
+    if args.require_native and missing:
+        print(f"FAIL not available: {', '.join(sorted(missing))}")
+        return 1
+
+    ok = True
+    for case in GOLDEN_CASES:
+        expected = load_golden(golden_file(*case))
+        label = "{} {}..{} {}/{}".format(*case)
+        for name, run in available:
+            # Compare through JSON so both sides have the same types as the HTTP response
+            actual = json.loads(json.dumps(run(*case)))
+            diff = first_difference(expected, actual)
+            print(f"{'OK  ' if diff is None else 'FAIL'} {label} [{name}]")
+            if diff is not None:
+                print(f"     first difference: {diff}")
+                ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Regression check: strategy spec rules and position targets on small hand-made price series.
+
+Each case compiles a spec, runs its plan on a few closes and compares the
+`target` column (1 long, -1 short, 0 flat) with the expected positions worked
+out by hand from the rules in strategy.py's docstring. The cases cover
+crosses against constants (a literal operand is the same on every bar, it
+must not be shifted), which real price data rarely exercises on purpose.
+
+Usage:
+    python verify_strategy.py
+"""
+import sys
+
+import polars as pl
+
+from strategy import compile_strategy
+
+CASES = [
+    (
+        "close crosses above a constant",
+        [10, 20, 40, 20, 40, 50],
+        {"long": {"entry": {"cross_above": ["close", 30]}}},
+        [0, 0, 1, 1, 1, 1],
+    ),
+    (
+        "constant crosses above close (close crosses below it)",
+        [10, 20, 40, 20, 40, 50],
+        {"short": {"entry": {"cross_above": [30, "close"]}}},
+        [0, 0, 0, -1, -1, -1],
+    ),
+    (
+        # sma(2): null, 15, 30, 30, 15, 25, 45 -> above 25 on bars 2 and 6, below on bar 4
+        "indicator crosses a constant both ways",
+        [10, 20, 40, 20, 10, 40, 50],
+        {
+            "indicators": {"fast": {"type": "sma", "length": 2}},
+            "long": {"entry": {"cross_above": ["fast", 25]}},
+            "short": {"entry": {"cross_below": ["fast", 25]}},
+        },
+        [0, 0, 1, 1, -1, -1, 1],
+    ),
+    (
+        "exit on a constant threshold",
+        [10, 20, 40, 45, 30, 20, 40],
+        {
+            "long": {"entry": {"cross_above": ["close", 30]}, "exit": {"lt": ["close", 35]}},
+        },
+        [0, 0, 1, 1, 0, 0, 1],
+    ),
+]
+
+
+def target_of(spec, closes):
+    prices = pl.DataFrame({c: pl.Series(closes, dtype=pl.Float64) for c in ("open", "high", "low", "close")})
+    plan = compile_strategy(spec)
+    return plan.apply(prices.lazy()).collect()["target"].to_list()
+
+
+def check(label, closes, spec, expected):
+    actual = target_of(spec, closes)
+    ok = actual == expected
+    print(f"{'OK  ' if ok else 'FAIL'} {label}")
+    if not ok:
+        print(f"     expected {expected}\n     actual   {actual}")
+    return ok
+
+
+if __name__ == "__main__":
+    ok = all([check(*case) for case in CASES])
+    sys.exit(0 if ok else 1)
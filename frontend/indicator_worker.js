@@ -0,0 +1,339 @@
+/**
+ * FX Lab - chart computations off the main thread
+ *
+ * Runs as the Web Worker behind each chart pane (ChartWorker in main.js) and is
+ * also loaded as a plain script, so the same functions serve as a synchronous
+ * fallback where workers are unavailable (file://).
+ *
+ * Everything works on Float64Array columns in a single pass: rolling windows
+ * keep running sums and swing detection uses monotonic deques, so each call is
+ * O(n) in the number of bars whatever the periods.
+ *
+ * The worker keeps the pane's bars (ChartState) as append/prepend-only chunks:
+ *   {type: 'reset', id, cols, tf, prefs, indicators, swings} -> {id, bars, dow?, ind?}
+ *   {type: 'extend', id, side: 'past'|'future', cols} -> {id, side, bars, replaced, dow?, ind?, indTime, indReplaced}
+ * An extend returns only the bars it added plus the `replaced` loaded bars at the seam
+ * that changed, and indicators only for the new bars and the loaded ones they affect.
+ * Indicators (ind) and swings (dow) are only computed when the reset asked for them, i.e.
+ * when /indicators or /swings is unreachable. dow is {time, value, type (1 high / -1 low),
+ * label} as returned by /swings; ind maps ChartPane.series keys to Float64Array (NaN = no value).
+ */
+
+const BAR_FIELDS = ['time', 'open', 'high', 'low', 'close'];
+
+// EMA warmup before a seam, in spans (same as EMA_WARMUP_SPANS of the server's indicator cache)
+const EMA_WARMUP_SPANS = 10;
+
+function nanCol(n) {
+    return new Float64Array(n).fill(NaN);
+}
+
+// Views of bars [from, to) of columns
+function subCols(cols, from, to) {
+    const out = { length: to - from };
+    BAR_FIELDS.forEach(f => { out[f] = cols[f].subarray(from, to); });
+    return out;
+}
+
+// Bar columns as a list of chunks in time order; prepending/appending never copies loaded bars
+class ChunkedCols {
+    constructor(cols) {
+        this.chunks = [];
+        this.length = 0;
+        if (cols) this.append(cols);
+    }
+
+    get firstTime() {
+        return this.length ? this.chunks[0].time[0] : null;
+    }
+
+    get lastTime() {
+        if (!this.length) return null;
+        const c = this.chunks[this.chunks.length - 1];
+        return c.time[c.length - 1];
+    }
+
+    prepend(cols) {
+        if (!cols.length) return;
+        this.chunks.unshift(cols);
+        this.length += cols.length;
+    }
+
+    append(cols) {
+        if (!cols.length) return;
+        this.chunks.push(cols);
+        this.length += cols.length;
+    }
+
+    // Contiguous copy of bars [from, to)
+    slice(from = 0, to = this.length) {
+        const out = { length: to - from };
+        BAR_FIELDS.forEach(f => { out[f] = new Float64Array(out.length); });
+        let offset = 0;
+        for (const c of this.chunks) {
+            const lo = Math.max(from - offset, 0), hi = Math.min(to - offset, c.length);
+            if (hi > lo) BAR_FIELDS.forEach(f => out[f].set(c[f].subarray(lo, hi), offset + lo - from));
+            offset += c.length;
+            if (offset >= to) break;
+        }
+        return out;
+    }
+}
+
+function aggregateCols(cols, tf) {
+    const n = cols.length, step = tf * 60;
+    const out = {};
+    BAR_FIELDS.forEach(f => { out[f] = new Float64Array(n); });
+    let k = -1;
+    for (let i = 0; i < n; i++) {
+        const bt = Math.floor(cols.time[i] / step) * step;
+        if (k < 0 || out.time[k] !== bt) {
+            k++;
+            out.time[k] = bt;
+            out.open[k] = cols.open[i];
+            out.high[k] = cols.high[i];
+            out.low[k] = cols.low[i];
+        } else {
+            if (cols.high[i] > out.high[k]) out.high[k] = cols.high[i];
+            if (cols.low[i] < out.low[k]) out.low[k] = cols.low[i];
+        }
+        out.close[k] = cols.close[i];
+    }
+    out.length = k + 1;
+    BAR_FIELDS.forEach(f => { out[f] = out[f].slice(0, out.length); });
+    return out;
+}
+
+function smaCol(x, len) {
+    const out = nanCol(x.length);
+    let sum = 0;
+    for (let i = 0; i < x.length; i++) {
+        sum += x[i];
+        if (i >= len) sum -= x[i - len];
+        if (i >= len - 1) out[i] = sum / len;
+    }
+    return out;
+}
+
+// Population standard deviation, like the chart always used
+function bollingerCols(x, len, dev) {
+    const n = x.length, upper = nanCol(n), middle = nanCol(n), lower = nanCol(n);
+    // Sums of offsets from the first close keep the running sum of squares well conditioned
+    const x0 = n ? x[0] : 0;
+    let s = 0, s2 = 0;
+    for (let i = 0; i < n; i++) {
+        const d = x[i] - x0;
+        s += d; s2 += d * d;
+        if (i >= len) {
+            const o = x[i - len] - x0;
+            s -= o; s2 -= o * o;
+        }
+        if (i >= len - 1) {
+            const m = s / len, sd = Math.sqrt(Math.max(0, s2 / len - m * m));
+            middle[i] = x0 + m;
+            upper[i] = middle[i] + dev * sd;
+            lower[i] = middle[i] - dev * sd;
+        }
+    }
+    return { upper, middle, lower };
+}
+
+// Sums of the gains/losses of the last len bars; 0.001 stands in for a window without a losing bar
+function rsiCol(x, len) {
+    const n = x.length, out = nanCol(n);
+    let g = 0, l = 0, gainers = 0, losers = 0;
+    for (let i = 1; i < n; i++) {
+        const df = x[i] - x[i - 1];
+        if (df >= 0) { g += df; gainers++; } else { l -= df; losers++; }
+        if (i > len) {
+            const od = x[i - len] - x[i - len - 1];
+            if (od >= 0) { g -= od; gainers--; } else { l += od; losers--; }
+        }
+        // Counts reset the sums to exactly 0, so rounding residue never replaces the guard
+        if (!gainers) g = 0;
+        if (!losers) l = 0;
+        if (i >= len) out[i] = 100 - (100 / (1 + (g / (l || 0.001))));
+    }
+    return out;
+}
+
+// Seeded with the first value
+function emaCol(x, len) {
+    const out = new Float64Array(x.length), k = 2 / (len + 1);
+    let cur = x[0];
+    for (let i = 0; i < x.length; i++) {
+        cur = (x[i] * k) + (cur * (1 - k));
+        out[i] = cur;
+    }
+    return out;
+}
+
+function macdCols(x, fast, slow, signal) {
+    const f = emaCol(x, fast), s = emaCol(x, slow);
+    const line = new Float64Array(x.length);
+    for (let i = 0; i < x.length; i++) line[i] = f[i] - s[i];
+    const sig = emaCol(line, signal), hist = new Float64Array(x.length);
+    for (let i = 0; i < x.length; i++) hist[i] = line[i] - sig[i];
+    return { line, sig, hist };
+}
+
+// Bars before a seam that the indicators after it depend on (EMA_WARMUP_SPANS spans for the MACD EMAs)
+function indicatorWarmup(p) {
+    let w = 0;
+    if (p.sma1) w = Math.max(w, p.sma1_len);
+    if (p.sma2) w = Math.max(w, p.sma2_len);
+    if (p.bb) w = Math.max(w, p.bb_period);
+    if (p.rsi) w = Math.max(w, p.rsi_len + 1);
+    if (p.macd) w = Math.max(w, EMA_WARMUP_SPANS * (p.macd_slow + p.macd_sig));
+    if (p.macd2) w = Math.max(w, EMA_WARMUP_SPANS * (p.macd2_slow + p.macd2_sig));
+    return w;
+}
+
+function calcIndicators(close, p) {
+    const ind = {};
+    if (p.sma1) ind.sma1 = smaCol(close, p.sma1_len);
+    if (p.sma2) ind.sma2 = smaCol(close, p.sma2_len);
+    if (p.bb) {
+        const bb = bollingerCols(close, p.bb_period, p.bb_dev);
+        ind.bbUpper = bb.upper; ind.bbMiddle = bb.middle; ind.bbLower = bb.lower;
+    }
+    if (p.rsi) ind.rsi = rsiCol(close, p.rsi_len);
+    if (p.macd) {
+        const m = macdCols(close, p.macd_fast, p.macd_slow, p.macd_sig);
+        ind.macd = m.line; ind.macdSig = m.sig; ind.macdHist = m.hist;
+    }
+    if (p.macd2) {
+        const m = macdCols(close, p.macd2_fast, p.macd2_slow, p.macd2_sig);
+        ind.macd2 = m.line; ind.macd2Sig = m.sig; ind.macd2Hist = m.hist;
+    }
+    return ind;
+}
+
+// Max (or min) of a[k - len + 1 .. k] for every k, from a monotonic deque of indices
+function windowExtreme(a, len, isMax) {
+    const n = a.length, out = new Float64Array(n), dq = new Int32Array(n);
+    let head = 0, tail = 0;
+    for (let k = 0; k < n; k++) {
+        while (tail > head && (isMax ? a[dq[tail - 1]] <= a[k] : a[dq[tail - 1]] >= a[k])) tail--;
+        dq[tail++] = k;
+        if (dq[head] <= k - len) head++;
+        out[k] = a[dq[head]];
+    }
+    return out;
+}
+
+// Swing highs/lows with p bars on each side (equal highs/lows on the left disqualify, on the right they do not),
+// alternating high/low with the more extreme point kept, labelled against the previous swing of the same type
+function calcDow(bars, p) {
+    const n = bars.length, time = [], value = [], type = [];
+    const maxH = windowExtreme(bars.high, p, true), minL = windowExtreme(bars.low, p, false);
+    for (let i = p; i < n - p; i++) {
+        const ch = bars.high[i], cl = bars.low[i], last = type.length - 1;
+        // Window maxima ending at i - 1 and at i + p cover the p bars before and after i
+        const isH = maxH[i - 1] < ch && maxH[i + p] <= ch;
+        const isL = minL[i - 1] > cl && minL[i + p] >= cl;
+        if (isH && (last < 0 || type[last] === -1 || ch > value[last])) {
+            if (type[last] === 1) { time.pop(); value.pop(); type.pop(); }
+            time.push(bars.time[i]); value.push(ch); type.push(1);
+        } else if (isL && (last < 0 || type[last] === 1 || cl < value[last])) {
+            if (type[last] === -1) { time.pop(); value.pop(); type.pop(); }
+            time.push(bars.time[i]); value.push(cl); type.push(-1);
+        }
+    }
+
+    const label = new Array(type.length);
+    let prevHigh = null, prevLow = null;
+    for (let i = 0; i < type.length; i++) {
+        if (type[i] === 1) {
+            label[i] = prevHigh === null ? 'H' : (value[i] > prevHigh ? 'HH' : 'LH');
+            prevHigh = value[i];
+        } else {
+            label[i] = prevLow === null ? 'L' : (value[i] < prevLow ? 'LL' : 'HL');
+            prevLow = value[i];
+        }
+    }
+    return { time: Float64Array.from(time), value: Float64Array.from(value), type: Int8Array.from(type), label };
+}
+
+function sliceInd(ind, from) {
+    const out = {};
+    Object.entries(ind).forEach(([key, col]) => { out[key] = col.slice(from); });
+    return out;
+}
+
+class ChartState {
+    handle(msg) {
+        return msg.type === 'extend' ? this.extend(msg) : this.reset(msg);
+    }
+
+    reset(msg) {
+        this.tf = msg.tf;
+        this.prefs = msg.prefs;
+        this.indicators = msg.indicators;
+        this.swings = msg.swings;
+        this.bars = new ChunkedCols(aggregateCols(msg.cols, msg.tf));
+
+        const bars = this.bars.slice();
+        const out = { id: msg.id, bars };
+        if (this.swings && this.prefs.dow) out.dow = calcDow(bars, this.prefs.dow_p);
+        if (this.indicators) out.ind = calcIndicators(bars.close, this.prefs);
+        return out;
+    }
+
+    extend(msg) {
+        const bars = this.bars, past = msg.side === 'past';
+        let add = aggregateCols(msg.cols, this.tf), merged = 0;
+
+        // A new bar in the bucket of the bar at the seam is merged into that bar
+        if (add.length && bars.length) {
+            if (past && add.time[add.length - 1] === bars.firstTime) {
+                const c = bars.chunks[0], k = add.length - 1;
+                c.open[0] = add.open[k];
+                c.high[0] = Math.max(c.high[0], add.high[k]);
+                c.low[0] = Math.min(c.low[0], add.low[k]);
+                add = subCols(add, 0, k);
+                merged = 1;
+            } else if (!past && add.time[0] === bars.lastTime) {
+                const c = bars.chunks[bars.chunks.length - 1], j = c.length - 1;
+                c.high[j] = Math.max(c.high[j], add.high[0]);
+                c.low[j] = Math.min(c.low[j], add.low[0]);
+                c.close[j] = add.close[0];
+                add = subCols(add, 1, add.length);
+                merged = 1;
+            }
+        }
+        if (past) bars.prepend(add); else bars.append(add);
+
+        const count = add.length + merged;
+        const from = past ? 0 : bars.length - count;
+        const out = { id: msg.id, side: msg.side, replaced: merged, bars: bars.slice(from, from + count) };
+        // The zigzag depends on every swing before it, so it is rebuilt over all bars
+        if (this.swings && this.prefs.dow) out.dow = calcDow(bars.slice(), this.prefs.dow_p);
+
+        if (this.indicators) {
+            // Appended bars continue from the warmup bars before them. Prepended bars become the
+            // start of the loaded indicators, so the first warmup loaded bars are recomputed as well.
+            const warm = indicatorWarmup(this.prefs);
+            const lo = past ? 0 : Math.max(0, from - warm);
+            const hi = past ? Math.min(bars.length, count + warm) : bars.length;
+            const ctx = bars.slice(lo, hi), skip = from - lo;
+            out.ind = sliceInd(calcIndicators(ctx.close, this.prefs), skip);
+            out.indTime = ctx.time.slice(skip);
+            out.indReplaced = past ? hi - add.length : merged;
+        }
+        return out;
+    }
+}
+
+if (typeof WorkerGlobalScope !== 'undefined' && self instanceof WorkerGlobalScope) {
+    const state = new ChartState();
+    self.onmessage = e => {
+        const out = state.handle(e.data);
+        // Hand the result buffers over instead of copying them (none of them is kept in the state)
+        const transfer = BAR_FIELDS.map(f => out.bars[f].buffer);
+        if (out.dow) transfer.push(out.dow.time.buffer, out.dow.value.buffer, out.dow.type.buffer);
+        if (out.ind) Object.values(out.ind).forEach(col => transfer.push(col.buffer));
+        if (out.indTime) transfer.push(out.indTime.buffer);
+        self.postMessage(out, transfer);
+    };
+}
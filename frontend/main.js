@@ -6,6 +6,15 @@
 const API_BASE = (window.location.protocol === 'file:') ? 'http://127.0.0.1:8000' : '';
 console.log("FX Lab Main.js v20260127 Loaded");
 
+// Bars per page when scrolling past either end of a chart (/ohlc/cursor)
+const SCROLL_PAGE_BARS = 1000;
+// Pages up to this many bars are added to the end of a series with update() instead of setData()
+const SERIES_UPDATE_MAX_BARS = 200;
+// Equity/indicator points requested from /lab/run (downsampled server-side, trades stay exact)
+const LAB_MAX_POINTS = 2000;
+// Lab indicator line colors in creation order (fast/slow SMA keep blue/amber)
+const LAB_LINE_COLORS = ['#3b82f6', '#f59e0b', '#a855f7', '#10b981', '#ef4444', '#06b6d4', '#eab308', '#ec4899'];
+
 // --- Global Symbols ---
 let availableSymbols = ['EURUSD', 'USDJPY', 'GBPUSD', 'EURJPY', 'EURGBP', 'GBPJPY'];
 
@@ -84,6 +93,199 @@ function hideConnBanner() {
     if (b) b.style.display = 'none';
 }
 
+// --- Columnar OHLC ---
+// /ohlc?format=binary: [uint32 count][uint32 priceCols] + Int64 time (epoch sec) + Float64 open/high/low/close
+const OHLC_FIELDS = ['open', 'high', 'low', 'close'];
+
+function decodeOHLC(buf) {
+    const view = new DataView(buf);
+    const n = view.getUint32(0, true);
+    const t64 = new BigInt64Array(buf, 8, n);
+    const cols = { length: n, time: new Float64Array(n) };
+    for (let i = 0; i < n; i++) cols.time[i] = Number(t64[i]);
+    OHLC_FIELDS.forEach((f, k) => { cols[f] = new Float64Array(buf, 8 + 8 * n * (k + 1), n); });
+    return cols;
+}
+
+// tf is served from the pre-aggregated bar pyramid (1, 5, 15, 60, 240, 1440 minutes)
+async function fetchOHLC(symbol, start, end, tf = 1) {
+    const res = await fetch(`${API_BASE}/ohlc?symbol=${symbol}&start_date=${start}&end_date=${end}&tf=${tf}&format=binary`);
+    if (!res.ok) throw new Error('HTTP ' + res.status);
+    return decodeOHLC(await res.arrayBuffer());
+}
+
+// Next `limit` bars strictly before or after a bar time; cursor is { before: t } or { after: t }
+async function fetchBars(symbol, tf, cursor, limit) {
+    const [side, t] = Object.entries(cursor)[0];
+    const res = await fetch(`${API_BASE}/ohlc/cursor?symbol=${symbol}&tf=${tf}&${side}=${t}&limit=${limit}&format=binary`);
+    if (!res.ok) throw new Error('HTTP ' + res.status);
+    return decodeOHLC(await res.arrayBuffer());
+}
+
+function utcDay(t) {
+    return new Date(t * 1000).toISOString().split('T')[0];
+}
+
+// /swings: {time, value, type (1 high / -1 low), label} of the Dow swings with p bars on each side
+async function fetchSwings(symbol, start, end, tf, p) {
+    const res = await fetch(`${API_BASE}/swings?symbol=${symbol}&start_date=${start}&end_date=${end}&tf=${tf}&p=${p}`);
+    if (!res.ok) throw new Error('HTTP ' + res.status);
+    return res.json();
+}
+
+// Swings with from <= time <= to
+function swingsWithin(sw, from, to) {
+    const keep = [];
+    sw.time.forEach((t, i) => { if (t >= from && t <= to) keep.push(i); });
+    const pick = col => keep.map(i => col[i]);
+    return { time: pick(sw.time), value: pick(sw.value), type: pick(sw.type), label: pick(sw.label) };
+}
+
+// /indicators: {time: [epoch sec], series: {"sma:20": [value|null], "bb:20:2.upper": [...], ...}}
+async function fetchIndicators(symbol, start, end, tf, specs) {
+    const ind = specs.map(s => `&ind=${encodeURIComponent(s)}`).join('');
+    const res = await fetch(`${API_BASE}/indicators?symbol=${symbol}&start_date=${start}&end_date=${end}&tf=${tf}${ind}`);
+    if (!res.ok) throw new Error('HTTP ' + res.status);
+    return res.json();
+}
+
+// Indicator specs for the enabled chart indicators (same names as the /indicators series)
+function indicatorSpecs(p) {
+    const specs = [];
+    if (p.sma1) specs.push(`sma:${p.sma1_len}`);
+    if (p.sma2) specs.push(`sma:${p.sma2_len}`);
+    if (p.bb) specs.push(`bb:${p.bb_period}:${p.bb_dev}`);
+    if (p.rsi) specs.push(`rsi:${p.rsi_len}`);
+    if (p.macd) specs.push(`macd:${p.macd_fast}:${p.macd_slow}:${p.macd_sig}`);
+    if (p.macd2) specs.push(`macd:${p.macd2_fast}:${p.macd2_slow}:${p.macd2_sig}`);
+    return specs;
+}
+
+// /indicators series as columns keyed like ChartPane.series (null becomes NaN)
+function serverIndicatorCols(res, p) {
+    const ind = {};
+    const put = (key, name) => {
+        const v = res.series[name];
+        if (v) ind[key] = Float64Array.from(v, x => x === null ? NaN : x);
+    };
+    if (p.sma1) put('sma1', `sma:${p.sma1_len}`);
+    if (p.sma2) put('sma2', `sma:${p.sma2_len}`);
+    if (p.bb) {
+        const bb = `bb:${p.bb_period}:${p.bb_dev}`;
+        put('bbUpper', `${bb}.upper`); put('bbMiddle', `${bb}.middle`); put('bbLower', `${bb}.lower`);
+    }
+    if (p.rsi) put('rsi', `rsi:${p.rsi_len}`);
+    [['macd', p.macd, p.macd_fast, p.macd_slow, p.macd_sig], ['macd2', p.macd2, p.macd2_fast, p.macd2_slow, p.macd2_sig]]
+        .forEach(([key, on, fast, slow, sig]) => {
+            if (!on) return;
+            const spec = `macd:${fast}:${slow}:${sig}`;
+            put(key, spec); put(`${key}Sig`, `${spec}.signal`); put(`${key}Hist`, `${spec}.hist`);
+        });
+    return ind;
+}
+
+// Builds bar objects (the shape lightweight-charts expects) only at the target timeframe
+function aggregateBars(cols, tf) {
+    const res = [], step = tf * 60; let cur = null;
+    for (let i = 0; i < cols.length; i++) {
+        const bt = Math.floor(cols.time[i] / step) * step;
+        if (!cur || cur.time !== bt) {
+            if (cur) res.push(cur);
+            cur = { time: bt, open: cols.open[i], high: cols.high[i], low: cols.low[i], close: cols.close[i] };
+        } else {
+            cur.high = Math.max(cur.high, cols.high[i]);
+            cur.low = Math.min(cur.low, cols.low[i]);
+            cur.close = cols.close[i];
+        }
+    }
+    if (cur) res.push(cur);
+    return res;
+}
+
+function candlePoints(bars) {
+    const out = new Array(bars.length);
+    for (let i = 0; i < bars.length; i++) {
+        out[i] = { time: bars.time[i], open: bars.open[i], high: bars.high[i], low: bars.low[i], close: bars.close[i] };
+    }
+    return out;
+}
+
+// Line points from a time column and a value column (NaN becomes a whitespace point); hist colors by sign
+function columnPoints(time, values, hist = false) {
+    const out = new Array(time.length);
+    for (let i = 0; i < time.length; i++) {
+        const v = values[i];
+        if (Number.isNaN(v)) out[i] = { time: time[i] };
+        else if (hist) out[i] = { time: time[i], value: v, color: v >= 0 ? '#10b981' : '#ef4444' };
+        else out[i] = { time: time[i], value: v };
+    }
+    return out;
+}
+
+// ChartState (indicator_worker.js) in a Web Worker. cancel() terminates a running computation and resolves
+// its promises with null, as does a failure; the state is then lost and the next request must be a reset.
+// Without worker support the state lives on the main thread.
+class ChartWorker {
+    constructor() {
+        this.pending = new Map();
+        this.nextId = 0;
+        this.spawn();
+    }
+
+    spawn() {
+        try {
+            this.worker = new Worker('indicator_worker.js');
+        } catch (e) {
+            console.warn("ChartWorker: Web Worker unavailable, computing on the main thread:", e);
+            this.worker = null;
+            this.state = new ChartState();
+            return;
+        }
+        this.worker.onmessage = e => {
+            const job = this.pending.get(e.data.id);
+            if (!job) return;
+            this.pending.delete(e.data.id);
+            job.resolve(e.data);
+        };
+        this.worker.onerror = e => {
+            console.error("ChartWorker: computation failed:", e.message);
+            this.restart();
+        };
+    }
+
+    run(msg) {
+        if (!this.worker) {
+            try {
+                return Promise.resolve(this.state.handle(msg));
+            } catch (e) {
+                console.error("ChartWorker: computation failed:", e);
+                this.state = new ChartState();
+                return Promise.resolve(null);
+            }
+        }
+        return new Promise(resolve => {
+            const id = ++this.nextId;
+            this.pending.set(id, { resolve });
+            this.worker.postMessage({ ...msg, id });
+        });
+    }
+
+    cancel() {
+        if (this.pending.size) this.restart();
+    }
+
+    restart() {
+        this.terminate();
+        this.spawn();
+    }
+
+    terminate() {
+        if (this.worker) this.worker.terminate();
+        this.pending.forEach(job => job.resolve(null));
+        this.pending.clear();
+    }
+}
+
 // --- Market Dashboard ---
 class MarketOverview {
     constructor() {
@@ -93,6 +295,7 @@ class MarketOverview {
         if (this.container) this.refreshAll();
     }
 
+    // One /overview request: last price, change and trend pills of every symbol, computed server-side
     async refreshAll() {
         this.container.innerHTML = '';
         for (const symbol of this.symbols) {
@@ -101,76 +304,41 @@ class MarketOverview {
             card.id = `card-${symbol}`;
             card.innerHTML = `<div class="card-symbol">${symbol}</div><div class="card-price">Loading...</div>`;
             this.container.appendChild(card);
-
-            try {
-                // Use a date range where data is known to exist (Dec 2025)
-                const res = await fetch(`${API_BASE}/ohlc?symbol=${symbol}&start_date=2025-12-01&end_date=2025-12-10`);
-                if (!res.ok) throw new Error('HTTP ' + res.status);
-                const data = await res.json();
-                if (data?.length) {
-                    const fmt = data.map(i => ({
-                        time: Math.floor(new Date(i.time).getTime() / 1000),
-                        open: i.open, high: i.high, low: i.low, close: i.close
-                    })).filter(d => !isNaN(d.time)).sort((a, b) => a.time - b.time);
-                    this.updateCard(symbol, fmt);
-                    hideConnBanner();
-                }
-            } catch (e) { showConnBanner('Backend Error: ' + e.message); }
         }
+
+        try {
+            // Use a date range where data is known to exist (Dec 2025)
+            const tfs = this.timeframes.map(tf => `&tf=${tf}`).join('');
+            const symbols = this.symbols.map(s => `&symbols=${s}`).join('');
+            const res = await fetch(`${API_BASE}/overview?start_date=2025-12-01&end_date=2025-12-10${symbols}${tfs}`);
+            if (!res.ok) throw new Error('HTTP ' + res.status);
+            (await res.json()).forEach(o => this.updateCard(o));
+            hideConnBanner();
+        } catch (e) { showConnBanner('Backend Error: ' + e.message); }
     }
 
-    updateCard(symbol, data) {
-        const card = document.getElementById(`card-${symbol}`);
-        if (!card || !data.length) return;
-        const last = data[data.length - 1];
-        const color = last.close >= (data[data.length - 2]?.close || 0) ? 'var(--price-up)' : 'var(--price-down)';
+    updateCard(o) {
+        const card = document.getElementById(`card-${o.symbol}`);
+        if (!card || o.last === null) return;
+        const color = o.last >= (o.prev ?? 0) ? 'var(--price-up)' : 'var(--price-down)';
 
         let trends = '';
         this.timeframes.forEach(tf => {
-            const trend = this.calcTrend(this.aggregate(data, tf));
+            const trend = o.trends[tf];
             const cls = trend === 'UP' ? 'trend-up' : (trend === 'DOWN' ? 'trend-down' : '');
             trends += `<div class="tf-pill ${cls}">${tf}m</div>`;
         });
 
-        card.innerHTML = `<div class="card-symbol">${symbol}</div><div class="card-price" style="color:${color}">${last.close.toFixed(5)}</div><div class="trend-labels">${trends}</div>`;
+        card.innerHTML = `<div class="card-symbol">${o.symbol}</div><div class="card-price" style="color:${color}">${o.last.toFixed(5)}</div><div class="trend-labels">${trends}</div>`;
         card.onclick = () => {
             document.querySelector('.nav-item[data-page="charts"]')?.click();
             if (window.panes?.[0]) {
-                window.panes[0].symbolSelect.value = symbol;
-                window.panes[0].symbol = symbol;
+                window.panes[0].symbolSelect.value = o.symbol;
+                window.panes[0].symbol = o.symbol;
                 window.panes[0].fetchData();
             }
         };
     }
-
-    aggregate(data, tf) {
-        if (tf === 1) return data;
-        const res = [], s = tf * 60; let cur = null;
-        for (const i of data) {
-            const bt = Math.floor(i.time / s) * s;
-            if (!cur || cur.time !== bt) { if (cur) res.push(cur); cur = { ...i, time: bt }; }
-            else { cur.high = Math.max(cur.high, i.high); cur.low = Math.min(cur.low, i.low); cur.close = i.close; }
-        }
-        if (cur) res.push(cur); return res;
-    }
-
-    calcTrend(data) {
-        if (data.length < 10) return 'FLAT';
-        const p = 5, zig = []; let lp = null;
-        for (let i = p; i < data.length - p; i++) {
-            const ch = data[i].high, cl = data[i].low; let isH = true, isL = true;
-            for (let j = 1; j <= p; j++) { if (data[i - j].high >= ch || data[i + j].high > ch) isH = false; if (data[i - j].low <= cl || data[i + j].low < cl) isL = false; }
-            if (isH && (!lp || lp.type === 'low' || ch > lp.value)) { if (lp?.type === 'high') zig.pop(); lp = { value: ch, type: 'high' }; zig.push(lp); }
-            else if (isL && (!lp || lp.type === 'high' || cl < lp.value)) { if (lp?.type === 'low') zig.pop(); lp = { value: cl, type: 'low' }; zig.push(lp); }
-        }
-        if (zig.length < 4) return 'FLAT';
-        const last = zig.slice(-4), h = last.filter(z => z.type === 'high'), l = last.filter(z => z.type === 'low');
-        if (h.length >= 2 && l.length >= 2) {
-            if (h[1].value > h[0].value && l[1].value > l[0].value) return 'UP';
-            if (h[1].value < h[0].value && l[1].value < l[0].value) return 'DOWN';
-        }
-        return 'FLAT';
-    }
 }
 
 // --- Chart Pane System ---
@@ -215,11 +383,14 @@ document.addEventListener('DOMContentLoaded', () => {
             this.symbol = config.symbol || 'EURUSD';
             this.tf = config.tf || 5;
             this.isSync = config.isSync || false;
-            this.data = [];
+            this.data = new ChunkedCols();
+            this.points = {};
             this.charts = {};
             this.series = {};
             this.anchor = config.anchor ? new Date(config.anchor + 'T00:00:00Z') : new Date('2025-12-01T00:00:00Z');
             this.isLoading = false;
+            this.barCount = 0;
+            this.compute = new ChartWorker();
 
             this.createUI();
             this.initCharts();
@@ -348,11 +519,8 @@ document.addEventListener('DOMContentLoaded', () => {
                         }
                     }
                     // Infinite scroll: load more data when near edges
-                    if (!this.isLoading && range.from < 50) this.loadMorePast();
-                    if (!this.isLoading && this.data.length > 0) {
-                        const tfData = this.aggregate(this.data, this.tf);
-                        if (range.to > tfData.length - 50) this.loadMoreFuture();
-                    }
+                    if (!this.isLoading && range.from < 50) this.loadMore('past');
+                    if (!this.isLoading && this.barCount > 0 && range.to > this.barCount - 50) this.loadMore('future');
                     isSyncing = false;
                 });
             });
@@ -360,7 +528,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
         bindEvents() {
             this.symbolSelect.onchange = () => { this.symbol = this.symbolSelect.value; this.fetchData(); saveState(); };
-            this.tfSelect.onchange = () => { this.tf = parseInt(this.tfSelect.value); this.refresh(); saveState(); };
+            this.tfSelect.onchange = () => { this.tf = parseInt(this.tfSelect.value); this.fetchData(); saveState(); };
             this.datePicker.onchange = () => { if (this.datePicker.value) { this.anchor = new Date(this.datePicker.value + 'T00:00:00Z'); this.fetchData(); saveState(); } };
             this.syncCheck.onchange = () => { this.isSync = this.syncCheck.checked; saveState(); };
             this.el.querySelector('.remove-pane-btn').onclick = () => this.destroy();
@@ -372,48 +540,25 @@ document.addEventListener('DOMContentLoaded', () => {
             isSyncing = false;
         }
 
-        async loadMorePast() {
-            if (this.isLoading || !this.data.length) return;
-            const oldestTime = this.data[0].time;
-            const oldestDate = new Date(oldestTime * 1000);
-            const startDate = new Date(oldestDate); startDate.setDate(startDate.getDate() - 3);
-            const endDate = new Date(oldestDate); endDate.setDate(endDate.getDate() - 1);
-
-            this.isLoading = true;
-            try {
-                const res = await fetch(`${API_BASE}/ohlc?symbol=${this.symbol}&start_date=${startDate.toISOString().split('T')[0]}&end_date=${endDate.toISOString().split('T')[0]}`);
-                if (res.ok) {
-                    const raw = await res.json();
-                    if (raw?.length) {
-                        const fmt = raw.map(i => ({ time: Math.floor(new Date(i.time).getTime() / 1000), open: i.open, high: i.high, low: i.low, close: i.close }))
-                            .filter(d => !isNaN(d.time) && d.open && d.high && d.low && d.close);
-                        this.data = [...fmt, ...this.data].sort((a, b) => a.time - b.time);
-                        this.refresh();
-                    }
-                }
-            } catch (e) { }
-            finally { this.isLoading = false; }
+        // Higher timeframes load proportionally longer ranges so the bar count stays similar
+        spanDays(base) {
+            return Math.max(base, Math.ceil(base * this.tf / 15));
         }
 
-        async loadMoreFuture() {
+        // Scrolling past either end loads the next page of bars from the cursor API and adds it as a chunk
+        async loadMore(side) {
             if (this.isLoading || !this.data.length) return;
-            const newestTime = this.data[this.data.length - 1].time;
-            const newestDate = new Date(newestTime * 1000);
-            const startDate = new Date(newestDate); startDate.setDate(startDate.getDate() + 1);
-            const endDate = new Date(newestDate); endDate.setDate(endDate.getDate() + 3);
+            const seq = this.refreshSeq;
+            const cursor = side === 'past' ? { before: this.data.firstTime } : { after: this.data.lastTime };
 
             this.isLoading = true;
             try {
-                const res = await fetch(`${API_BASE}/ohlc?symbol=${this.symbol}&start_date=${startDate.toISOString().split('T')[0]}&end_date=${endDate.toISOString().split('T')[0]}`);
-                if (res.ok) {
-                    const raw = await res.json();
-                    if (raw?.length) {
-                        const fmt = raw.map(i => ({ time: Math.floor(new Date(i.time).getTime() / 1000), open: i.open, high: i.high, low: i.low, close: i.close }))
-                            .filter(d => !isNaN(d.time) && d.open && d.high && d.low && d.close);
-                        this.data = [...this.data, ...fmt].sort((a, b) => a.time - b.time);
-                        this.refresh();
-                    }
-                }
+                const cols = await fetchBars(this.symbol, this.tf, cursor, SCROLL_PAGE_BARS);
+                if (!cols.length) return;
+                if (side === 'past') this.data.prepend(cols); else this.data.append(cols);
+                // A refresh started meanwhile did not see the new chunk
+                if (seq !== this.refreshSeq) this.refresh();
+                else await this.extend(side, cols, seq);
             } catch (e) { }
             finally { this.isLoading = false; }
         }
@@ -423,20 +568,15 @@ document.addEventListener('DOMContentLoaded', () => {
             this.isLoading = true;
             this.loader.style.display = 'flex';
 
-            const s = new Date(this.anchor); s.setDate(s.getDate() - 7);
-            const e = new Date(this.anchor); e.setDate(e.getDate() + 7);
+            const s = new Date(this.anchor); s.setDate(s.getDate() - this.spanDays(7));
+            const e = new Date(this.anchor); e.setDate(e.getDate() + this.spanDays(7));
 
             try {
-                const res = await fetch(`${API_BASE}/ohlc?symbol=${this.symbol}&start_date=${s.toISOString().split('T')[0]}&end_date=${e.toISOString().split('T')[0]}`);
-                if (!res.ok) throw new Error('Backend offline');
-                const raw = await res.json();
+                const cols = await fetchOHLC(this.symbol, s.toISOString().split('T')[0], e.toISOString().split('T')[0], this.tf)
+                    .catch(() => { throw new Error('Backend offline'); });
 
-                if (raw?.length) {
-                    this.data = raw.map(i => ({
-                        time: Math.floor(new Date(i.time).getTime() / 1000),
-                        open: i.open, high: i.high, low: i.low, close: i.close
-                    })).filter(d => !isNaN(d.time) && d.open && d.high && d.low && d.close)
-                        .sort((a, b) => a.time - b.time);
+                if (cols.length) {
+                    this.data = new ChunkedCols(cols);
 
                     this.refresh();
                     this.center();
@@ -450,6 +590,8 @@ document.addEventListener('DOMContentLoaded', () => {
             }
         }
 
+        // Bars are aggregated in the pane's worker, indicators and swings come from the server (or the worker
+        // when it is unreachable); a newer refresh cancels the computation of the previous one.
         refresh() {
             if (!this.data || !this.data.length) return;
             if (!this.series || !this.series.candle) {
@@ -457,176 +599,181 @@ document.addEventListener('DOMContentLoaded', () => {
                 return;
             }
 
-            const tfData = this.aggregate(this.data, this.tf);
-            const p = getPrefs();
+            const p = this.prefs = getPrefs();
+            const seq = this.refreshSeq = (this.refreshSeq || 0) + 1;
+            // What the worker computes because the server endpoint failed (retried on every refresh)
+            this.local = { indicators: false, swings: false };
+            this.compute.cancel();
+            this.showIndicatorPanes(p);
+
+            this.compute.run(this.resetMessage()).then(res => {
+                if (res && seq === this.refreshSeq) this.applyBars(res);
+            });
+            this.updateIndicators(seq);
+            this.updateSwings(seq);
+        }
+
+        resetMessage() {
+            return { type: 'reset', cols: this.data.slice(), tf: this.tf, prefs: this.prefs, ...this.local };
+        }
+
+        applyBars(res) {
             try {
-                this.series.candle.setData(tfData);
+                this.setSeries('candle', candlePoints(res.bars));
             } catch (err) {
                 console.error("ChartPane: Error setting candle data:", err);
             }
+            this.barCount = res.bars.length;
+            this.badge.innerText = `${this.barCount} BARS LOADED`;
+            this.resize();
+        }
 
-            const closes = tfData.map(d => d.close);
-            const times = tfData.map(d => d.time);
-
-            // SMA
-            const calcSMA = (len) => tfData.map((d, i) => {
-                if (i < len - 1) return { time: d.time };
-                let sum = 0;
-                for (let j = 0; j < len; j++) sum += tfData[i - j].close;
-                return { time: d.time, value: sum / len };
-            });
-
-            this.series.sma1.setData(p.sma1 ? calcSMA(p.sma1_len) : []);
-            this.series.sma2.setData(p.sma2 ? calcSMA(p.sma2_len) : []);
-
-            // Bollinger Bands
-            if (p.bb) {
-                const period = p.bb_period, dev = p.bb_dev;
-                const bb = tfData.map((d, i) => {
-                    if (i < period - 1) return { time: d.time };
-                    const slice = tfData.slice(i - period + 1, i + 1);
-                    const avg = slice.reduce((acc, x) => acc + x.close, 0) / period;
-                    const variance = slice.reduce((acc, x) => acc + Math.pow(x.close - avg, 2), 0) / period;
-                    const std = Math.sqrt(variance);
-                    return { time: d.time, upper: avg + (dev * std), middle: avg, lower: avg - (dev * std) };
+        // Dow swings come from /swings (linear time, cached per month on the server) for the loaded days,
+        // computed in the worker only when it fails
+        updateSwings(seq) {
+            const p = this.prefs;
+            if (!p.dow) {
+                this.applyDow(null);
+                return;
+            }
+            fetchSwings(this.symbol, utcDay(this.data.firstTime), utcDay(this.data.lastTime), this.tf, p.dow_p)
+                .then(sw => { if (seq === this.refreshSeq) this.applyDow(swingsWithin(sw, this.data.firstTime, this.data.lastTime)); })
+                .catch(err => {
+                    if (seq !== this.refreshSeq) return;
+                    console.warn("ChartPane: /swings failed, computing locally:", err);
+                    this.local.swings = true;
+                    this.compute.run(this.resetMessage()).then(res => {
+                        if (res && seq === this.refreshSeq) this.applyDow(res.dow);
+                    });
                 });
-                this.series.bbUpper.setData(bb.map(b => b.upper ? { time: b.time, value: b.upper } : { time: b.time }));
-                this.series.bbMiddle.setData(bb.map(b => b.middle ? { time: b.time, value: b.middle } : { time: b.time }));
-                this.series.bbLower.setData(bb.map(b => b.lower ? { time: b.time, value: b.lower } : { time: b.time }));
+        }
+
+        // Dow with markers for HH/HL/LH/LL
+        applyDow(dow) {
+            if (dow) {
+                this.series.dow.setData(columnPoints(dow.time, dow.value));
+                const markers = dow.label.map((text, i) => ({
+                    time: dow.time[i],
+                    position: dow.type[i] === 1 ? 'aboveBar' : 'belowBar',
+                    color: dow.type[i] === 1 ? '#8b5cf6' : '#06b6d4',
+                    shape: dow.type[i] === 1 ? 'arrowDown' : 'arrowUp',
+                    text,
+                    size: 1
+                }));
+                this.series.candle.setMarkers(markers);
             } else {
-                this.series.bbUpper.setData([]);
-                this.series.bbMiddle.setData([]);
-                this.series.bbLower.setData([]);
+                this.series.dow.setData([]);
+                this.series.candle.setMarkers([]);
             }
+        }
 
-            // RSI
+        showIndicatorPanes(p) {
             this.el.querySelector('.rsi-chart-wrapper').style.display = p.rsi ? 'block' : 'none';
-            if (p.rsi) {
-                const len = p.rsi_len;
-                const rsi = tfData.map((d, i) => {
-                    if (i < len) return { time: d.time };
-                    let g = 0, l = 0;
-                    for (let j = i - (len - 1); j <= i; j++) {
-                        const df = tfData[j].close - tfData[j - 1].close;
-                        if (df >= 0) g += df; else l -= df;
-                    }
-                    return { time: d.time, value: 100 - (100 / (1 + (g / (l || 0.001)))) };
-                });
-                this.series.rsi.setData(rsi);
-            }
-
-            // MACD 1
             this.el.querySelector('.macd-chart-wrapper').style.display = p.macd ? 'block' : 'none';
-            if (p.macd) {
-                const ema = (src, len) => {
-                    const k = 2 / (len + 1);
-                    let cur = src[0];
-                    return src.map(v => { cur = (v * k) + (cur * (1 - k)); return cur; });
-                };
-                const f = ema(closes, p.macd_fast), s = ema(closes, p.macd_slow);
-                const m = f.map((v, i) => v - s[i]);
-                const sig = ema(m, p.macd_sig);
-                this.series.macd.setData(m.map((v, i) => ({ time: times[i], value: v })));
-                this.series.macdSig.setData(sig.map((v, i) => ({ time: times[i], value: v })));
-                this.series.macdHist.setData(m.map((v, i) => ({
-                    time: times[i],
-                    value: v - sig[i],
-                    color: v - sig[i] >= 0 ? '#10b981' : '#ef4444'
-                })));
+            this.el.querySelector('.macd2-chart-wrapper').style.display = p.macd2 ? 'block' : 'none';
+        }
+
+        // Indicators come from /indicators (O(n), cached per month on the server); computed in the worker only
+        // when it fails. Results of an older refresh are dropped.
+        updateIndicators(seq) {
+            const p = this.prefs, specs = indicatorSpecs(p);
+            if (!specs.length) {
+                this.applyIndicators([], {});
+                return;
             }
+            fetchIndicators(this.symbol, utcDay(this.data.firstTime), utcDay(this.data.lastTime), this.tf, specs)
+                .then(res => { if (seq === this.refreshSeq) this.applyIndicators(res.time, serverIndicatorCols(res, p)); })
+                .catch(err => {
+                    if (seq !== this.refreshSeq) return;
+                    console.warn("ChartPane: /indicators failed, computing locally:", err);
+                    this.localIndicators(seq);
+                });
+        }
 
-            // MACD 2
-            this.el.querySelector('.macd2-chart-wrapper').style.display = p.macd2 ? 'block' : 'none';
-            if (p.macd2) {
-                const ema = (src, len) => {
-                    const k = 2 / (len + 1);
-                    let cur = src[0];
-                    return src.map(v => { cur = (v * k) + (cur * (1 - k)); return cur; });
-                };
-                const f = ema(closes, p.macd2_fast), s = ema(closes, p.macd2_slow);
-                const m = f.map((v, i) => v - s[i]);
-                const sig = ema(m, p.macd2_sig);
-                this.series.macd2.setData(m.map((v, i) => ({ time: times[i], value: v })));
-                this.series.macd2Sig.setData(sig.map((v, i) => ({ time: times[i], value: v })));
-                this.series.macd2Hist.setData(m.map((v, i) => ({
-                    time: times[i],
-                    value: v - sig[i],
-                    color: v - sig[i] >= 0 ? '#10b981' : '#ef4444'
-                })));
+        // From here on the worker also extends the indicators with each loaded chunk
+        localIndicators(seq) {
+            this.local.indicators = true;
+            this.compute.run(this.resetMessage()).then(res => {
+                if (res && seq === this.refreshSeq) this.applyIndicators(res.bars.time, res.ind);
+            });
+        }
+
+        applyIndicators(time, ind) {
+            ['sma1', 'sma2', 'bbUpper', 'bbMiddle', 'bbLower'].forEach(key => {
+                if (!ind[key]) this.setSeries(key, []);
+            });
+            Object.entries(ind).forEach(([key, values]) => {
+                this.setSeries(key, columnPoints(time, values, key.endsWith('Hist')));
+            });
+        }
+
+        // Adds a chunk already stored in this.data: the worker returns only the new bars (and the bar at the
+        // seam when they share it), and each series gets only their points spliced in
+        async extend(side, cols, seq) {
+            const res = await this.compute.run({ type: 'extend', side, cols });
+            if (seq !== this.refreshSeq) return;
+            if (!res) {
+                // The worker lost its state
+                this.refresh();
+                return;
             }
+            if (!res.bars.length) return;
 
-            // Dow with markers
-            if (p.dow) {
-                const dowPoints = this.calcDow(tfData, p.dow_p);
-                this.series.dow.setData(dowPoints);
-
-                // Add markers for HH/HL/LH/LL
-                const markers = [];
-                for (let i = 0; i < dowPoints.length; i++) {
-                    const curr = dowPoints[i];
-                    const prevSame = dowPoints.slice(0, i).reverse().find(z => z.type === curr.type);
-                    let label = curr.type === 'high' ? 'H' : 'L';
-                    if (prevSame) {
-                        if (curr.type === 'high') label = curr.value > prevSame.value ? 'HH' : 'LH';
-                        else label = curr.value < prevSame.value ? 'LL' : 'HL';
-                    }
-                    markers.push({
-                        time: curr.time,
-                        position: curr.type === 'high' ? 'aboveBar' : 'belowBar',
-                        color: curr.type === 'high' ? '#8b5cf6' : '#06b6d4',
-                        shape: curr.type === 'high' ? 'arrowDown' : 'arrowUp',
-                        text: label,
-                        size: 1
-                    });
-                }
-                this.series.candle.setMarkers(markers);
-            } else {
-                this.series.dow.setData([]);
-                this.series.candle.setMarkers([]);
+            this.spliceSeries('candle', candlePoints(res.bars), side, res.replaced);
+            // Swings are not local to the seam; /swings answers for the whole loaded range from its cache
+            if (res.dow) this.applyDow(res.dow);
+            else this.updateSwings(seq);
+            this.barCount += res.bars.length - res.replaced;
+            this.badge.innerText = `${this.barCount} BARS LOADED`;
+
+            if (res.ind) {
+                this.spliceIndicators(res.indTime, res.ind, side, res.indReplaced);
+                return;
+            }
+            const specs = indicatorSpecs(this.prefs);
+            if (!specs.length) return;
+            // /indicators values do not depend on the requested range, so the loaded ones stay as they are
+            const t0 = res.bars.time[0], t1 = res.bars.time[res.bars.length - 1];
+            try {
+                const ir = await fetchIndicators(this.symbol, utcDay(t0), utcDay(t1), this.tf, specs);
+                if (seq !== this.refreshSeq) return;
+                const lo = ir.time.findIndex(t => t >= t0);
+                const hi = lo < 0 ? -1 : ir.time.findIndex(t => t > t1);
+                const time = lo < 0 ? [] : ir.time.slice(lo, hi < 0 ? ir.time.length : hi);
+                if (time.length !== res.bars.length) throw new Error('indicator bars do not match the chart bars');
+                const ind = serverIndicatorCols(ir, this.prefs);
+                Object.keys(ind).forEach(key => { ind[key] = ind[key].subarray(lo, lo + time.length); });
+                this.spliceIndicators(time, ind, side, res.replaced);
+            } catch (err) {
+                if (seq !== this.refreshSeq) return;
+                console.warn("ChartPane: /indicators failed, computing locally:", err);
+                this.localIndicators(seq);
             }
+        }
 
-            this.badge.innerText = `${tfData.length} BARS LOADED`;
-            this.resize();
+        spliceIndicators(time, ind, side, replaced) {
+            Object.entries(ind).forEach(([key, values]) => {
+                this.spliceSeries(key, columnPoints(time, values, key.endsWith('Hist')), side, replaced);
+            });
         }
 
-        calcDow(data, p) {
-            const res = []; let lp = null;
-            for (let i = p; i < data.length - p; i++) {
-                const ch = data[i].high, cl = data[i].low;
-                let isH = true, isL = true;
-                for (let j = 1; j <= p; j++) {
-                    if (data[i - j].high >= ch || data[i + j].high > ch) isH = false;
-                    if (data[i - j].low <= cl || data[i + j].low < cl) isL = false;
-                }
-                if (isH && (!lp || lp.type === 'low' || ch > lp.value)) {
-                    if (lp?.type === 'high') res.pop();
-                    lp = { time: data[i].time, value: ch, type: 'high' };
-                    res.push(lp);
-                } else if (isL && (!lp || lp.type === 'high' || cl < lp.value)) {
-                    if (lp?.type === 'low') res.pop();
-                    lp = { time: data[i].time, value: cl, type: 'low' };
-                    res.push(lp);
-                }
-            }
-            return res;
+        setSeries(key, points) {
+            this.points[key] = points;
+            this.series[key].setData(points);
         }
 
-        aggregate(data, tf) {
-            if (tf === 1) return data;
-            const res = [], step = tf * 60; let cur = null;
-            for (const i of data) {
-                const bt = Math.floor(i.time / step) * step;
-                if (!cur || cur.time !== bt) {
-                    if (cur) res.push(cur);
-                    cur = { ...i, time: bt };
-                } else {
-                    cur.high = Math.max(cur.high, i.high);
-                    cur.low = Math.min(cur.low, i.low);
-                    cur.close = i.close;
-                }
+        // Replaces the `replaced` loaded points at the seam with the first/last of `points` and adds the rest;
+        // small pages at the end go through update(), which only touches the last bars
+        spliceSeries(key, points, side, replaced) {
+            const old = this.points[key] || [];
+            if (side === 'future' && old.length && points.length <= SERIES_UPDATE_MAX_BARS) {
+                old.splice(old.length - replaced, replaced, ...points);
+                points.forEach(pt => this.series[key].update(pt));
+                return;
             }
-            if (cur) res.push(cur);
-            return res;
+            this.setSeries(key, side === 'past'
+                ? points.concat(old.slice(replaced))
+                : old.slice(0, old.length - replaced).concat(points));
         }
 
         resize() {
@@ -642,11 +789,10 @@ document.addEventListener('DOMContentLoaded', () => {
         center() {
             setTimeout(() => {
                 try {
-                    const tfData = this.aggregate(this.data, this.tf);
-                    if (tfData.length > 0) {
+                    if (this.data.length > 0) {
                         // If we have data, try to show the latest portion
-                        const last = tfData[tfData.length - 1].time;
-                        const first = tfData[0].time;
+                        const step = this.tf * 60;
+                        const last = Math.floor(this.data.lastTime / step) * step;
                         const count = 100;
                         const r = count * this.tf * 60;
                         this.charts.main.timeScale().setVisibleRange({ from: last - r, to: last + (r * 0.1) });
@@ -662,6 +808,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
         destroy() {
             console.log("Destroying pane:", this.id);
+            this.compute.terminate();
             if (this.resizeObserver) {
                 this.resizeObserver.unobserve(this.el);
                 this.resizeObserver.disconnect();
@@ -688,7 +835,9 @@ document.addEventListener('DOMContentLoaded', () => {
             this.chartContainer = document.getElementById('lab-main-chart');
             this.equityContainer = document.getElementById('lab-equity-chart');
 
-            this.runBtn.onclick = () => this.run();
+            // Running backtest job ({ id, events }); the run button cancels it
+            this.job = null;
+            this.runBtn.onclick = () => this.job ? this.cancel() : this.run();
             this.initCharts();
         }
 
@@ -705,9 +854,9 @@ document.addEventListener('DOMContentLoaded', () => {
             this.candleSeries = this.chart.addCandlestickSeries({ upColor: '#10b981', downColor: '#ef4444', borderVisible: false, wickUpColor: '#10b981', wickDownColor: '#ef4444' });
             this.equitySeries = this.equityChart.addAreaSeries({ lineColor: '#3b82f6', topColor: 'rgba(59, 130, 246, 0.4)', bottomColor: 'rgba(59, 130, 246, 0.0)', lineWidth: 2 });
 
-            // SMA Indicators
-            this.fastSmaSeries = this.chart.addLineSeries({ color: '#3b82f6', lineWidth: 1, lastValueVisible: false, priceLineVisible: false });
-            this.slowSmaSeries = this.chart.addLineSeries({ color: '#f59e0b', lineWidth: 1, lastValueVisible: false, priceLineVisible: false });
+            // Indicator lines by response name, created on first use (oscillators get their own scale at the bottom)
+            this.indicatorSeries = {};
+            this.chart.priceScale('osc').applyOptions({ scaleMargins: { top: 0.75, bottom: 0 } });
 
             // Trade Connections (Dashed Lines)
             this.tradeLineSeries = this.chart.addLineSeries({
@@ -718,9 +867,16 @@ document.addEventListener('DOMContentLoaded', () => {
                 priceLineVisible: false
             });
 
-            // Sync
-            this.chart.timeScale().subscribeVisibleLogicalRangeChange(r => this.equityChart.timeScale().setVisibleLogicalRange(r));
-            this.equityChart.timeScale().subscribeVisibleLogicalRangeChange(r => this.chart.timeScale().setVisibleLogicalRange(r));
+            // Sync by time (the equity curve is downsampled, so bar indices differ between the charts)
+            let syncing = false;
+            const syncTo = target => r => {
+                if (!r || syncing) return;
+                syncing = true;
+                try { target.timeScale().setVisibleRange(r); } catch (e) { /* range outside target data */ }
+                syncing = false;
+            };
+            this.chart.timeScale().subscribeVisibleTimeRangeChange(syncTo(this.equityChart));
+            this.equityChart.timeScale().subscribeVisibleTimeRangeChange(syncTo(this.chart));
 
             // Resize observer
             new ResizeObserver(() => {
@@ -733,41 +889,81 @@ document.addEventListener('DOMContentLoaded', () => {
             const txt = this.input.value.trim();
             if (!txt) return alert('Please enter a strategy description.');
 
-            this.runBtn.innerText = 'Running...';
-            this.runBtn.disabled = true;
+            this.runBtn.innerText = 'Starting...';
 
             try {
-                // Parse "Simple" logic for demo: "SMA 20 50" -> Extract numbers
-                const nums = txt.match(/\d+/g);
-                const fast = nums ? parseInt(nums[0]) : 20;
-                const slow = nums ? parseInt(nums[1]) : 50;
-
                 const payload = {
                     symbol: this.symbol.value,
                     start: this.start.value,
                     end: this.end.value,
-                    fast: fast,
-                    slow: slow
+                    max_points: LAB_MAX_POINTS
                 };
 
-                const res = await fetch(`${API_BASE}/lab/run`, {
+                // A JSON object is a strategy spec (indicators + entry/exit rules, see engine/strategy.py)
+                let spec = null;
+                try { spec = JSON.parse(txt); } catch (e) { /* free text */ }
+                if (spec && typeof spec === 'object' && !Array.isArray(spec)) {
+                    payload.strategy = spec;
+                } else {
+                    // Parse "Simple" logic for demo: "SMA 20 50" -> Extract numbers
+                    const nums = txt.match(/\d+/g);
+                    payload.fast = nums ? parseInt(nums[0]) : 20;
+                    payload.slow = nums && nums[1] ? parseInt(nums[1]) : 50;
+                }
+
+                // Runs as a background job: progress and the equity so far stream in over SSE
+                const res = await fetch(`${API_BASE}/jobs`, {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
                     body: JSON.stringify(payload)
                 });
-
                 if (!res.ok) throw new Error('Run failed');
-                const result = await res.json();
+                const job = await res.json();
+                const final = await this.follow(job.id);
+                if (final.status === 'cancelled') return;
+                if (final.status !== 'done') throw new Error(final.error || 'Run failed');
+
+                const result = await fetch(`${API_BASE}/jobs/${job.id}/result`).then(r => r.json());
                 this.render(result);
 
             } catch (e) {
                 alert('Error: ' + e.message);
             } finally {
+                this.job = null;
                 this.runBtn.innerText = 'Run Backtest';
-                this.runBtn.disabled = false;
             }
         }
 
+        // Resolves with the job's final summary; shows progress and the partial equity meanwhile
+        follow(id) {
+            return new Promise((resolve, reject) => {
+                const events = new EventSource(`${API_BASE}/jobs/${id}/events`);
+                this.job = { id, events };
+                events.addEventListener('progress', e => {
+                    const s = JSON.parse(e.data);
+                    const { done, total } = s.progress;
+                    this.runBtn.innerText = s.status === 'queued' ? 'Queued (Cancel)'
+                        : `Running ${total ? Math.round(100 * done / total) : 0}% (Cancel)`;
+                    if (s.equity.length > 0) {
+                        this.equitySeries.setData(s.equity.map(p => ({ time: Math.floor(new Date(p.time).getTime() / 1000), value: p.value })));
+                    }
+                });
+                events.addEventListener('done', e => {
+                    events.close();
+                    resolve(JSON.parse(e.data));
+                });
+                events.onerror = () => {
+                    // EventSource reconnects on its own unless the server is gone
+                    if (events.readyState === EventSource.CLOSED) reject(new Error('Lost connection to the job'));
+                };
+            });
+        }
+
+        async cancel() {
+            this.runBtn.innerText = 'Cancelling...';
+            await fetch(`${API_BASE}/jobs/${this.job.id}/cancel`, { method: 'POST' }).catch(() => {});
+        }
+
         render(data) {
             // Update Stats
             if (data.stats) {
@@ -775,15 +971,33 @@ document.addEventListener('DOMContentLoaded', () => {
                 document.getElementById('res-winrate').innerText = (data.stats.win_rate * 100).toFixed(2) + '%';
                 document.getElementById('res-pnl').innerText = data.stats.total_pnl_pips;
                 document.getElementById('res-pnl').style.color = data.stats.total_pnl_pips >= 0 ? '#10b981' : '#ef4444';
-                document.getElementById('res-pf').innerText = data.stats.profit_factor.toFixed(2);
+                document.getElementById('res-pf').innerText = data.stats.profit_factor != null ? data.stats.profit_factor.toFixed(2) : '-';
             }
 
             // Update Charts
             // Need OHLC data for the period to render main chart
-            this.loadCharts(data.symbol, this.start.value, this.end.value, data.trades || [], data.equity || [], data.indicators || {});
+            this.loadCharts(data.symbol, this.start.value, this.end.value, data.trades || [], data.equity || [], data.indicators || {}, data.oscillators || {});
+        }
+
+        setIndicatorLines(indicators, oscillators) {
+            const lines = { ...indicators, ...oscillators };
+            Object.keys(this.indicatorSeries).forEach(name => {
+                if (!(name in lines)) this.indicatorSeries[name].setData([]);
+            });
+            Object.entries(lines).forEach(([name, points]) => {
+                if (!this.indicatorSeries[name]) {
+                    const color = LAB_LINE_COLORS[Object.keys(this.indicatorSeries).length % LAB_LINE_COLORS.length];
+                    this.indicatorSeries[name] = this.chart.addLineSeries({
+                        color, lineWidth: 1, lastValueVisible: false, priceLineVisible: false,
+                        priceScaleId: name in oscillators ? 'osc' : 'right'
+                    });
+                }
+                const data = points.map(v => ({ time: Math.floor(new Date(v.time).getTime() / 1000), value: v.value })).sort((a, b) => a.time - b.time);
+                this.indicatorSeries[name].setData(data);
+            });
         }
 
-        async loadCharts(symbol, start, end, trades, equity, indicators) {
+        async loadCharts(symbol, start, end, trades, equity, indicators, oscillators = {}) {
             console.log("Loading Charts...", { symbol, start, end, trades: trades?.length, equity: equity?.length });
 
             try {
@@ -792,18 +1006,14 @@ document.addEventListener('DOMContentLoaded', () => {
                 this.equityChart.resize(this.equityContainer.clientWidth || 800, this.equityContainer.clientHeight || 150);
 
                 // Fetch OHLC for context
-                const res = await fetch(`${API_BASE}/ohlc?symbol=${symbol}&start_date=${start}&end_date=${end}`);
-                if (!res.ok) throw new Error("Could not fetch OHLC data");
-                const ohlc = await res.json();
-                if (!ohlc || ohlc.length === 0) {
+                const ohlc = await fetchOHLC(symbol, start, end)
+                    .catch(() => { throw new Error("Could not fetch OHLC data"); });
+                if (ohlc.length === 0) {
                     showConnBanner("No price data found for " + symbol + " in this period.");
                     return;
                 }
 
-                const candles = ohlc.map(d => ({
-                    time: Math.floor(new Date(d.time).getTime() / 1000),
-                    open: d.open, high: d.high, low: d.low, close: d.close
-                })).sort((a, b) => a.time - b.time);
+                const candles = aggregateBars(ohlc, 1);
 
                 if (this.candleSeries) {
                     this.candleSeries.setData(candles);
@@ -855,19 +1065,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 }
 
                 // Indicators
-                if (indicators.fast_sma) {
-                    const fData = indicators.fast_sma.map(v => ({ time: Math.floor(new Date(v.time).getTime() / 1000), value: v.value })).sort((a, b) => a.time - b.time);
-                    this.fastSmaSeries.setData(fData);
-                } else {
-                    this.fastSmaSeries.setData([]);
-                }
-
-                if (indicators.slow_sma) {
-                    const sData = indicators.slow_sma.map(v => ({ time: Math.floor(new Date(v.time).getTime() / 1000), value: v.value })).sort((a, b) => a.time - b.time);
-                    this.slowSmaSeries.setData(sData);
-                } else {
-                    this.slowSmaSeries.setData([]);
-                }
+                this.setIndicatorLines(indicators, oscillators);
 
                 this.chart.timeScale().fitContent();
             } catch (err) {